@@ -21,12 +21,16 @@
     # 或指定 URL
     uv run python examples/extract_article.py "https://mp.weixin.qq.com/s/xxx"
 
+    # 多个 URL 并发提取（每篇文章独立会话）
+    uv run python examples/extract_article.py URL1 URL2 URL3
+
 确保:
     1. 已配置认证（ANTHROPIC_API_KEY）
     2. 已安装 news-extractor skill 到 ~/.claude/skills/news-extractor/
 """
 
 import sys
+import time
 from pathlib import Path
 
 # 添加 src 目录到 Python 路径
@@ -46,6 +50,18 @@ from langchain_skills import LangChainSkillsAgent
 console = Console()
 
 
+def build_prompt(url: str) -> str:
+    """构造提取请求"""
+    return f"""
+请提取这篇文章的内容：
+{url}
+
+请输出：
+1. JSON 格式到 ./output 目录
+2. Markdown 格式到 ./output 目录
+"""
+
+
 def extract_article(url: str):
     """使用 news-extractor Skill 提取文章"""
 
@@ -63,14 +79,7 @@ def extract_article(url: str):
     agent = LangChainSkillsAgent()
 
     # 构造请求
-    prompt = f"""
-请提取这篇文章的内容：
-{url}
-
-请输出：
-1. JSON 格式到 ./output 目录
-2. Markdown 格式到 ./output 目录
-"""
+    prompt = build_prompt(url)
 
     console.print(f"[bold green]请求:[/bold green]")
     console.print(Markdown(prompt))
@@ -95,9 +104,46 @@ def extract_article(url: str):
         console.print("[yellow]提示: 请确保已正确配置 ANTHROPIC_API_KEY[/yellow]")
 
 
+def extract_articles(urls: list[str], max_concurrency: int = 4, timeout: float = 300):
+    """并发提取多篇文章，按完成顺序显示结果"""
+    agent = LangChainSkillsAgent()
+    console.print(f"[bold cyan]并发提取 {len(urls)} 篇文章（并发 {max_concurrency}）[/bold cyan]\n")
+
+    results = []
+    started = time.perf_counter()
+    for item in agent.batch_as_completed(
+        [build_prompt(url) for url in urls],
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+    ):
+        results.append(item)
+        url = urls[item.index]
+        if item.success:
+            console.print(f"[green]✓[/green] {url} [dim]({item.latency:.1f}s)[/dim]")
+            console.print(Markdown(item.response))
+        else:
+            console.print(f"[red]✗[/red] {url}: {item.error}")
+        console.print()
+
+    from langchain_skills.batch import BatchStats
+
+    stats = BatchStats.from_results(results, time.perf_counter() - started).to_dict()
+    console.print(Panel(
+        f"成功 {stats['succeeded']} / {stats['total']}，超时 {stats['timed_out']}\n"
+        f"耗时 {stats['wall_time']}s，吞吐 {stats['throughput']} 篇/s\n"
+        f"延迟 p50 {stats['latency_p50']}s · p95 {stats['latency_p95']}s",
+        title="批量提取结果"
+    ))
+
+
 def main():
     """主函数"""
 
+    # 多个 URL：并发提取
+    if len(sys.argv) > 2:
+        extract_articles(sys.argv[1:])
+        return
+
     # 获取 URL 参数
     if len(sys.argv) > 1:
         url = sys.argv[1]
@@ -75,9 +75,52 @@ def my_tool(arg: str, runtime: ToolRuntime[MyContext]) -> str:
 ```
 """
 
-from .agent import LangChainSkillsAgent, create_skills_agent
-from .skill_loader import SkillLoader, SkillMetadata, SkillContent, discover_skills, get_skill_content
-from .tools import load_skill, bash, read_file, write_file, ALL_TOOLS, SkillAgentContext
+import importlib
+
+# 公开名称 -> 所在子模块；首次访问时才导入（langchain / langgraph 导入较慢）
+_LAZY_IMPORTS = {
+    "LangChainSkillsAgent": ".agent",
+    "create_skills_agent": ".agent",
+    "SkillLoader": ".skill_loader",
+    "SkillMetadata": ".skill_loader",
+    "SkillContent": ".skill_loader",
+    "discover_skills": ".skill_loader",
+    "get_skill_content": ".skill_loader",
+    "load_skill": ".tools",
+    "bash": ".tools",
+    "read_file": ".tools",
+    "write_file": ".tools",
+    "ALL_TOOLS": ".tools",
+    "SkillAgentContext": ".tools",
+    "SqliteCheckpointSaver": ".checkpoint",
+    "CheckpointLimits": ".checkpoint",
+    "create_checkpointer": ".checkpoint",
+    "ModelRegistry": ".model_registry",
+    "HttpPoolConfig": ".model_registry",
+    "get_model_registry": ".model_registry",
+    "close_model_registry": ".model_registry",
+    "StreamRecorder": ".recording",
+    "Recording": ".recording",
+    "load_recording": ".recording",
+    "BatchResult": ".batch",
+    "BatchItemResult": ".batch",
+    "BatchStats": ".batch",
+    "TurnBudget": ".budget",
+    "CancellationToken": ".cancellation",
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
 
 __version__ = "0.1.0"
 
@@ -99,4 +142,25 @@ __all__ = [
     "ALL_TOOLS",
     # Context
     "SkillAgentContext",
+    # Checkpoint
+    "SqliteCheckpointSaver",
+    "CheckpointLimits",
+    "create_checkpointer",
+    # Model registry
+    "ModelRegistry",
+    "HttpPoolConfig",
+    "get_model_registry",
+    "close_model_registry",
+    # Recording
+    "StreamRecorder",
+    "Recording",
+    "load_recording",
+    # Batch
+    "BatchResult",
+    "BatchItemResult",
+    "BatchStats",
+    # Budget
+    "TurnBudget",
+    # Cancellation
+    "CancellationToken",
 ]
@@ -13,28 +13,68 @@ LangChain Skills Agent 主体
 流式输出支持：
 - 支持 Extended Thinking 显示模型思考过程
 - 事件级流式输出 (thinking / text / tool_call / tool_result)
+- 同步 (invoke / stream / stream_events) 与异步 (ainvoke / astream / astream_events) 接口
+
+启动开销：
+- langchain / langgraph 导入较慢，这里延迟到首次创建模型 / 编译 Agent 时导入
+- 构造 Agent 只扫描 Skills 并构建 system prompt，模型和 LangGraph Agent 在首次调用时创建
 """
 
+import asyncio
 import os
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Iterator
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional, Sequence, Union
 
 from dotenv import load_dotenv
-from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
-from langchain_core.messages import AIMessage, AIMessageChunk
-from langgraph.checkpoint.memory import InMemorySaver
 
 from .skill_loader import SkillLoader
-from .tools import ALL_TOOLS, SkillAgentContext
-from .stream import StreamEventEmitter, ToolCallTracker, is_success, DisplayLimits
+from .fs import DEFAULT_EXCLUDES, FileContentCache
+from .metrics import ToolMetricsRecorder, instrument_tools
+from .execution import OrderedResultBuffer, ToolExecutionPolicy, apply_execution_policy
+from .model_registry import ModelRegistry, get_model_registry
+from .batch import DEFAULT_BATCH_CONCURRENCY
+from .env import env_number
+from .stream import (
+    StreamEventEmitter,
+    ToolCallTracker,
+    is_success,
+    DisplayLimits,
+    DEFAULT_OUTPUT_TOKEN_BUDGET,
+)
+
+
+if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
+    from .batch import BatchItemResult, BatchResult
+    from .budget import BudgetTracker, TurnBudget
+    from .cancellation import CancellationToken
+    from .compaction import CompactionPolicy
+    from .recording import Recording, StreamRecorder
+    from .tools import SkillAgentContext
 
 
 # 加载环境变量（override=True 确保 .env 文件覆盖系统环境变量）
 load_dotenv(override=True)
 
 
+def init_chat_model(model: str, **kwargs):
+    """初始化聊天模型（首次调用时才导入 langchain.chat_models）"""
+    from langchain.chat_models import init_chat_model as _init_chat_model
+
+    return _init_chat_model(model, **kwargs)
+
+
+def create_agent(**kwargs):
+    """创建 LangGraph Agent（首次调用时才导入 langchain.agents）"""
+    from langchain.agents import create_agent as _create_agent
+
+    return _create_agent(**kwargs)
+
+
 # 默认配置
 DEFAULT_PROVIDER = "anthropic"
 DEFAULT_ANTHROPIC_MODEL = "claude-sonnet-4-5-20250929"
@@ -44,6 +84,9 @@ DEFAULT_TEMPERATURE = 1.0  # Extended Thinking 要求温度为 1.0
 DEFAULT_THINKING_BUDGET = 10000
 DEFAULT_OPENAI_REASONING_EFFORT = "medium"
 
+# fake: 按脚本流式输出的离线模型（压测 / 剖析用，见 fake_model.py）
+SUPPORTED_PROVIDERS = ("anthropic", "openai", "fake")
+
 
 @dataclass(frozen=True)
 class ModelConfig:
@@ -67,6 +110,7 @@ def _normalize_provider(provider: str | None) -> str | None:
         "claude": "anthropic",
         "openai": "openai",
         "gpt": "openai",
+        "fake": "fake",
     }
     return aliases.get(normalized, normalized)
 
@@ -79,6 +123,12 @@ def _parse_bool_env(name: str, default: bool) -> bool:
     return raw_value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _parse_list_env(name: str) -> tuple[str, ...]:
+    """解析逗号分隔的环境变量"""
+    raw_value = os.getenv(name, "")
+    return tuple(item.strip() for item in raw_value.split(",") if item.strip())
+
+
 def _normalize_openai_base_url(base_url: str | None) -> str | None:
     """规范化 OpenAI SDK base_url，避免传入完整 endpoint 后被重复拼接。"""
     if not base_url:
@@ -102,7 +152,7 @@ def _split_provider_prefixed_model(model: str | None) -> tuple[str | None, str |
 
     raw_provider, raw_model = model.split(":", 1)
     provider = _normalize_provider(raw_provider)
-    if provider in ("anthropic", "openai") and raw_model:
+    if provider in SUPPORTED_PROVIDERS and raw_model:
         return provider, raw_model
     return None, model
 
@@ -144,7 +194,7 @@ def _resolve_requested_provider(model: str | None = None, model_provider: str |
         or DEFAULT_PROVIDER
     )
 
-    if provider not in ("anthropic", "openai"):
+    if provider not in SUPPORTED_PROVIDERS:
         raise ValueError(f"Unsupported model provider: {provider}")
 
     return provider
@@ -169,6 +219,10 @@ def _resolve_model_name(provider: str, requested_model: str | None = None) -> st
 
     if provider == "openai":
         return os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL)
+    if provider == "fake":
+        from .fake_model import DEFAULT_FAKE_MODEL
+
+        return DEFAULT_FAKE_MODEL
 
     return (
         os.getenv("ANTHROPIC_MODEL")
@@ -224,18 +278,41 @@ def resolve_model_config(model: str | None = None, model_provider: str | None =
         model=model_name,
         api_key=api_key,
         base_url=base_url,
-        supports_extended_thinking=(provider in {"anthropic", "openai"}),
+        supports_extended_thinking=(provider in {"anthropic", "openai", "fake"}),
     )
 
 
 def check_api_credentials(model: str | None = None, model_provider: str | None = None) -> bool:
-    """检查是否配置了当前 provider 的 API 认证"""
-    api_key, _ = _get_provider_credentials(
-        _resolve_requested_provider(model=model, model_provider=model_provider)
-    )
+    """检查是否配置了当前 provider 的 API 认证（fake provider 不需要认证）"""
+    provider = _resolve_requested_provider(model=model, model_provider=model_provider)
+    if provider == "fake":
+        return True
+    api_key, _ = _get_provider_credentials(provider)
     return api_key is not None
 
 
+def _event_message(event):
+    """messages 模式事件中的消息（事件可能是 (message, metadata) 或直接是消息）"""
+    if isinstance(event, tuple) and len(event) >= 2:
+        return event[0]
+    return event
+
+
+@dataclass
+class _EventStreamState:
+    """一次事件级流式输出的状态"""
+    emitter: StreamEventEmitter
+    tracker: ToolCallTracker
+    result_buffer: Optional[OrderedResultBuffer]
+    debug: bool = False
+    budget: Optional["BudgetTracker"] = None
+    cancel: Optional["CancellationToken"] = None
+    full_response: str = ""
+    reasoning_tokens: int = 0
+    thinking_seen: bool = False
+    usage: dict = field(default_factory=dict)
+
+
 class LangChainSkillsAgent:
     """
     基于 LangChain 1.0 的 Skills Agent
@@ -253,6 +330,10 @@ class LangChainSkillsAgent:
             response = agent.get_last_response(chunk)
             if response:
                 print(response)
+
+        # 异步事件流（同一事件循环上服务多个会话）
+        async for event in agent.astream_events("提取这篇公众号文章", thread_id="t1"):
+            print(event)
     """
 
     def __init__(
@@ -265,6 +346,11 @@ class LangChainSkillsAgent:
         temperature: Optional[float] = None,
         enable_thinking: bool = True,
         thinking_budget: int = DEFAULT_THINKING_BUDGET,
+        tool_policy: Optional[ToolExecutionPolicy] = None,
+        checkpointer: Optional["BaseCheckpointSaver"] = None,
+        compaction: Optional["CompactionPolicy"] = None,
+        model_registry: Optional[ModelRegistry] = None,
+        budget: Optional["TurnBudget"] = None,
     ):
         """
         初始化 Agent
@@ -278,6 +364,11 @@ class LangChainSkillsAgent:
             temperature: 温度参数 (启用 thinking 时强制为 1.0)
             enable_thinking: 是否启用 Extended Thinking
             thinking_budget: thinking 的 token 预算
+            tool_policy: 并行工具调用的执行策略，默认从环境变量读取
+            checkpointer: 会话检查点存储，默认按 SKILLS_CHECKPOINTER 创建（memory / sqlite）
+            compaction: 对话压缩策略，默认从环境变量读取
+            model_registry: 模型 / HTTP 连接池注册表，默认使用进程级共享注册表
+            budget: 默认的单轮预算（耗时 / 模型调用数 / token 数 / 工具调用数），默认从环境变量读取
         """
         self.model_config = resolve_model_config(model=model, model_provider=model_provider)
         self.model_provider = self.model_config.provider
@@ -288,14 +379,14 @@ class LangChainSkillsAgent:
         self.thinking_budget = thinking_budget
 
         # 配置 (Anthropic 启用 thinking 时温度必须为 1.0)
-        self.max_tokens = max_tokens or int(os.getenv("MAX_TOKENS", str(DEFAULT_MAX_TOKENS)))
+        self.max_tokens = max_tokens or env_number("MAX_TOKENS", DEFAULT_MAX_TOKENS)
         if self.enable_thinking:
             self.temperature = 1.0  # Anthropic 要求启用 thinking 时温度为 1.0
         else:
             self.temperature = (
                 temperature
                 if temperature is not None
-                else float(os.getenv("MODEL_TEMPERATURE", str(DEFAULT_TEMPERATURE)))
+                else env_number("MODEL_TEMPERATURE", DEFAULT_TEMPERATURE, float)
             )
         self.working_directory = working_directory or Path.cwd()
 
@@ -305,14 +396,85 @@ class LangChainSkillsAgent:
         # Level 1: 构建 system prompt（将 Skills 元数据注入）
         self.system_prompt = self._build_system_prompt()
 
-        # 创建上下文（供 tools 使用）
-        self.context = SkillAgentContext(
+        # 上下文参数（供 tools 使用，SkillAgentContext 在首次使用时创建）
+        self._context_kwargs = dict(
             skill_loader=self.skill_loader,
             working_directory=self.working_directory,
+            max_output_tokens=env_number("TOOL_OUTPUT_MAX_TOKENS", DEFAULT_OUTPUT_TOKEN_BUDGET),
+            use_trigram_index=_parse_bool_env("SKILLS_TRIGRAM_INDEX", False),
+            walk_excludes=DEFAULT_EXCLUDES + _parse_list_env("SKILLS_WALK_EXCLUDE"),
+            file_cache=FileContentCache(
+                max_bytes=env_number("SKILLS_FILE_CACHE_MB", 32) * 1024 * 1024
+            ),
         )
 
-        # 创建 LangChain Agent
-        self.agent = self._create_agent()
+        # 工具调用指标（耗时 / 字节数 / 异常），按会话聚合
+        self.metrics = ToolMetricsRecorder()
+
+        # 并行工具调用的执行策略（并发上限 / 单工具上限 / 结果顺序）
+        self.tool_policy = tool_policy or ToolExecutionPolicy.from_env()
+
+        # 会话记忆（默认进程内存；sqlite 持久化并按 TTL / LRU 淘汰闲置会话），未传入时首次使用时创建
+        self._checkpointer = checkpointer
+
+        # 对话压缩（超过阈值时替换较早的工具结果 / 摘要较早轮次，完整历史仍在 checkpointer 中）
+        # 中间件在编译 Agent 时创建
+        self._compaction_policy = compaction
+        self.compaction = None
+
+        # 单轮预算（超出时结束本轮并终止正在执行的 bash），中间件在编译 Agent 时创建
+        self._budget = budget
+        self.budget_guard = None
+
+        # 进行中的运行按 thread_id 登记取消令牌（agent.cancel(thread_id)），中间件在编译 Agent 时创建
+        self.cancellation = None
+
+        # 模型实例与 HTTP 连接池（配置相同的 Agent 共享，复用 keep-alive 连接）
+        self.model_registry = model_registry if model_registry is not None else get_model_registry()
+
+        # LangChain Agent 延迟到首次调用时创建（--list-skills / --show-prompt 不需要模型）
+        self._context: Optional["SkillAgentContext"] = None
+        self._agent = None
+        self._build_lock = threading.RLock()
+
+    @property
+    def agent(self):
+        """编译好的 LangChain Agent（首次访问时初始化模型并编译）"""
+        if self._agent is None:
+            with self._build_lock:
+                if self._agent is None:
+                    self._agent = self._create_agent()
+        return self._agent
+
+    @property
+    def context(self) -> "SkillAgentContext":
+        """工具上下文（首次访问时创建）"""
+        if self._context is None:
+            with self._build_lock:
+                if self._context is None:
+                    from .tools import SkillAgentContext
+
+                    self._context = SkillAgentContext(**self._context_kwargs)
+        return self._context
+
+    @property
+    def checkpointer(self) -> "BaseCheckpointSaver":
+        """会话检查点存储（未传入时按 SKILLS_CHECKPOINTER 创建）"""
+        if self._checkpointer is None:
+            with self._build_lock:
+                if self._checkpointer is None:
+                    from .checkpoint import create_checkpointer
+
+                    self._checkpointer = create_checkpointer()
+        return self._checkpointer
+
+    def build_agent(self):
+        """
+        立即初始化模型并编译 Agent
+
+        默认在首次 invoke / stream 时才创建；服务启动时可以提前调用，避免首个请求承担编译开销。
+        """
+        return self.agent
 
     def _build_system_prompt(self) -> str:
         """
@@ -342,7 +504,16 @@ When a user request matches a skill's description, use the load_skill tool to ge
         - tools: 工具列表
         - system_prompt: 系统提示（Level 1 注入 Skills 元数据）
         - context_schema: 上下文类型（供 ToolRuntime 使用）
-        - checkpointer: 会话记忆
+        - checkpointer: 会话记忆（self.checkpointer，可插拔）
+
+        工具执行策略（self.tool_policy）:
+        - 同一消息中的多个工具调用并发执行，max_concurrency 限制同时执行的调用数
+        - tool_limits 限制单个工具的并发数（默认同一工作目录下只跑一个 bash）
+        - 工具结果按调用顺序写回对话状态
+
+        对话压缩（self.compaction）:
+        - 发给模型的历史超过 token 阈值时，较早轮次的工具结果替换为占位，必要时整体摘要
+        - 只影响发给模型的请求，对话状态保留完整历史
 
         Extended Thinking 支持:
         - Anthropic: 使用 thinking budget 获取思考过程
@@ -353,6 +524,7 @@ When a user request matches a skill's description, use the load_skill tool to ge
         - 默认支持 Anthropic
         - 支持 OpenAI / OpenAI-compatible base_url
         - 支持 MODEL_* 通用变量和 provider 专属变量
+        - MODEL_PROVIDER=fake 使用离线脚本模型（无需认证，用于压测和剖析）
         """
         # 构建初始化参数
         init_kwargs = {
@@ -391,26 +563,64 @@ When a user request matches a skill's description, use the load_skill tool to ge
                 init_kwargs["reasoning_effort"] = reasoning_effort
                 base_url = _normalize_openai_base_url(base_url)
 
+        elif self.model_provider == "fake":
+            init_kwargs["emit_thinking"] = self.enable_thinking
+
         if base_url:
             init_kwargs["base_url"] = base_url
 
-        # 初始化模型
-        model = init_chat_model(
-            self.model_name,
-            **init_kwargs,
+        # 初始化模型（配置相同时复用已创建的模型和连接池）
+        if self.model_provider == "fake":
+            from .fake_model import create_fake_chat_model as factory
+        else:
+            factory = init_chat_model
+        model = self.model_registry.get_chat_model(
+            self.model_config,
+            init_kwargs,
+            factory=factory,
         )
 
         # 创建 Agent
+        from .tools import ALL_TOOLS, SkillAgentContext
+
         agent = create_agent(
             model=model,
-            tools=ALL_TOOLS,
+            tools=apply_execution_policy(instrument_tools(ALL_TOOLS, self.metrics), self.tool_policy),
             system_prompt=self.system_prompt,
             context_schema=SkillAgentContext,
-            checkpointer=InMemorySaver(),
+            checkpointer=self.checkpointer,
+            middleware=self._build_middleware(),
         )
 
         return agent
 
+    def _build_middleware(self) -> list:
+        """
+        构建模型调用中间件（列表中靠前的在外层）
+
+        - 取消：本轮被取消后不再调用模型 / 执行工具
+        - 单轮预算：超出预算时不再调用模型 / 执行工具
+        - 对话压缩：先裁剪较早的历史
+        - Anthropic prompt caching：在 system prompt 和工具定义末尾设置 cache_control 断点，
+          多步工具循环中这部分前缀只在首次调用时计费（SKILLS_PROMPT_CACHE=false 关闭）
+        """
+        from .budget import TurnBudgetMiddleware
+        from .cancellation import CancellationMiddleware
+        from .compaction import ConversationCompactionMiddleware
+
+        self.cancellation = CancellationMiddleware()
+        self.budget_guard = TurnBudgetMiddleware(self._budget)
+        self.compaction = ConversationCompactionMiddleware(self._compaction_policy)
+        middleware = [self.cancellation, self.budget_guard, self.compaction]
+        if self.model_provider == "anthropic" and _parse_bool_env("SKILLS_PROMPT_CACHE", True):
+            from langchain_anthropic.middleware import AnthropicPromptCachingMiddleware
+
+            middleware.append(AnthropicPromptCachingMiddleware(
+                ttl=os.getenv("SKILLS_PROMPT_CACHE_TTL", "5m"),
+                unsupported_model_behavior="ignore",
+            ))
+        return middleware
+
     def get_system_prompt(self) -> str:
         """
         获取当前 system prompt
@@ -435,27 +645,236 @@ When a user request matches a skill's description, use the load_skill tool to ge
             for s in skills
         ]
 
-    def invoke(self, message: str, thread_id: str = "default") -> dict:
+    def _build_config(self, thread_id: str, cancel: Optional["CancellationToken"] = None) -> dict:
+        """构建单次调用的 RunnableConfig（指定取消令牌时，取消后模型流在下一个 token 处中止）"""
+        config = {"configurable": {"thread_id": thread_id}}
+        if cancel is not None:
+            from .cancellation import CancellationCallbackHandler
+
+            config["callbacks"] = [CancellationCallbackHandler(cancel)]
+        return config
+
+    def invoke(self, message: str, thread_id: str = "default", budget: Optional["TurnBudget"] = None) -> dict:
         """
         同步调用 Agent
 
         Args:
             message: 用户消息
             thread_id: 会话 ID（用于多轮对话）
+            budget: 本轮预算，默认使用 Agent 的预算
 
         Returns:
-            Agent 响应
+            Agent 响应；超出预算时包含 budget_exceeded 字段（超出的预算项 / 上限 / 用量）
         """
-        config = {"configurable": {"thread_id": thread_id}}
+        config = self._build_config(thread_id)
+        tracker = self._start_budget(thread_id, budget)
 
-        result = self.agent.invoke(
-            {"messages": [{"role": "user", "content": message}]},
-            config=config,
-            context=self.context,
-        )
+        try:
+            result = self.agent.invoke(
+                self._build_input(message),
+                config=config,
+                context=self.context,
+            )
+        finally:
+            self._finish_budget(thread_id, tracker)
+
+        return self._with_budget_result(result, tracker)
+
+    async def ainvoke(
+        self, message: str, thread_id: str = "default", budget: Optional["TurnBudget"] = None
+    ) -> dict:
+        """
+        异步调用 Agent（工具使用异步实现）
 
+        Args:
+            message: 用户消息
+            thread_id: 会话 ID（用于多轮对话）
+            budget: 本轮预算，默认使用 Agent 的预算
+
+        Returns:
+            Agent 响应，格式同 invoke
+        """
+        config = self._build_config(thread_id)
+        tracker = self._start_budget(thread_id, budget)
+
+        try:
+            result = await self.agent.ainvoke(
+                self._build_input(message),
+                config=config,
+                context=self.context,
+            )
+        finally:
+            self._finish_budget(thread_id, tracker)
+
+        return self._with_budget_result(result, tracker)
+
+    def _start_budget(self, thread_id: str, budget: Optional["TurnBudget"]) -> Optional["BudgetTracker"]:
+        """登记本轮预算（没有任何预算时返回 None）"""
+        self.build_agent()
+        return self.budget_guard.start(thread_id, budget)
+
+    def _finish_budget(self, thread_id: str, tracker: Optional["BudgetTracker"]) -> None:
+        if tracker is not None:
+            self.budget_guard.finish(thread_id, tracker)
+
+    @staticmethod
+    def _with_budget_result(result: dict, tracker: Optional["BudgetTracker"]) -> dict:
+        if tracker is not None and tracker.exceeded is not None:
+            result["budget_exceeded"] = tracker.exceeded.to_dict()
         return result
 
+    def cancel(self, thread_id: str, reason: str = "cancelled") -> bool:
+        """
+        取消会话正在进行的 stream_events / astream_events
+
+        模型流在下一个 token 处中止，正在执行的 bash 命令连同子进程被终止，
+        对话状态在流结束时补全（可以在任意线程中调用）。
+
+        Returns:
+            是否有运行被取消
+        """
+        if self.cancellation is None:
+            return False
+        return self.cancellation.cancel(thread_id, reason)
+
+    def _start_run(self, thread_id: str, cancel: Optional["CancellationToken"]) -> "CancellationToken":
+        """登记本轮的取消令牌（未传入时创建）"""
+        from .cancellation import CancellationToken
+
+        self.build_agent()
+        token = cancel if cancel is not None else CancellationToken()
+        self.cancellation.start(thread_id, token)
+        return token
+
+    def _finish_run(self, thread_id: str, token: "CancellationToken") -> None:
+        """注销本轮的取消令牌"""
+        self.cancellation.finish(thread_id, token)
+
+    @staticmethod
+    def _cancelled_turn_updates(snapshot, token: "CancellationToken") -> list:
+        """
+        为被取消的一轮补全对话状态所需写入的消息
+
+        没有结果的工具调用补上 [FAILED] 结果并追加说明已取消的 AI 消息，
+        否则下一轮调用模型时工具调用与结果不配对会被 provider 拒绝。
+        """
+        from .cancellation import cancelled_turn_repair
+
+        updates = cancelled_turn_repair(snapshot.values.get("messages", []), token.reason)
+        if not updates:
+            return []
+        # 中断的步骤中已完成的任务结果（例如被终止的 bash 的结果）尚未提交，随补全一起写入
+        pending = [
+            message
+            for task in snapshot.tasks
+            if isinstance(task.result, dict)
+            for message in task.result.get("messages", [])
+        ]
+        return pending + updates
+
+    def _repair_cancelled_thread(self, thread_id: str, token: "CancellationToken") -> None:
+        """补全被取消的一轮的对话状态（失败时抛出，由调用方报告）"""
+        config = self._build_config(thread_id)
+        updates = self._cancelled_turn_updates(self.agent.get_state(config), token)
+        if updates:
+            self.agent.update_state(config, {"messages": updates}, as_node="model")
+
+    async def _aclose_and_repair(self, stream, thread_id: str, token: "CancellationToken") -> None:
+        """关闭中断的图执行流后补全对话状态"""
+        await stream.aclose()
+        await self._arepair_cancelled_thread(thread_id, token)
+
+    async def _arepair_cancelled_thread(self, thread_id: str, token: "CancellationToken") -> None:
+        """_repair_cancelled_thread 的异步版本"""
+        config = self._build_config(thread_id)
+        updates = self._cancelled_turn_updates(await self.agent.aget_state(config), token)
+        if updates:
+            await self.agent.aupdate_state(config, {"messages": updates}, as_node="model")
+
+    def _repair_error(self, thread_id: str, error: Exception, state: "_EventStreamState") -> dict:
+        """补全失败时的错误事件（会话中可能留有没有结果的工具调用）"""
+        return self._stream_error(
+            RuntimeError(f"Failed to repair cancelled thread {thread_id!r}: {error}"), state
+        )
+
+    def batch(
+        self,
+        messages: Sequence[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        thread_ids: Optional[Sequence[str]] = None,
+    ) -> "BatchResult":
+        """
+        批量执行一组请求（每个请求使用独立的 thread_id）
+
+        Args:
+            messages: 用户消息列表
+            max_concurrency: 同时执行的请求数上限（<= 0 表示不限制）
+            timeout: 单个请求的超时（秒），超时的请求被取消并记为失败
+            thread_ids: 每个请求的 thread_id，默认自动生成
+
+        Returns:
+            BatchResult：按输入顺序排列的结果（单个失败不影响其他请求）和吞吐量 / 延迟统计
+        """
+        from .batch import BatchStats, BatchResult
+
+        started = time.perf_counter()
+        items = sorted(
+            self.batch_as_completed(messages, max_concurrency, timeout, thread_ids),
+            key=lambda item: item.index,
+        )
+        return BatchResult(items=items, stats=BatchStats.from_results(items, time.perf_counter() - started))
+
+    def batch_as_completed(
+        self,
+        messages: Sequence[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        thread_ids: Optional[Sequence[str]] = None,
+    ) -> Iterator["BatchItemResult"]:
+        """
+        批量执行，按完成顺序产出每个请求的结果
+
+        参数同 batch；提前停止迭代时取消尚未完成的请求。
+        """
+        from .batch import iterate_in_background
+
+        return iterate_in_background(
+            lambda: self.abatch_as_completed(messages, max_concurrency, timeout, thread_ids)
+        )
+
+    async def abatch(
+        self,
+        messages: Sequence[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        thread_ids: Optional[Sequence[str]] = None,
+    ) -> "BatchResult":
+        """batch 的异步版本"""
+        from .batch import collect_batch
+
+        return await collect_batch(self.abatch_as_completed(messages, max_concurrency, timeout, thread_ids))
+
+    def abatch_as_completed(
+        self,
+        messages: Sequence[str],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        thread_ids: Optional[Sequence[str]] = None,
+    ) -> AsyncIterator["BatchItemResult"]:
+        """batch_as_completed 的异步版本"""
+        from .batch import run_batch
+
+        self.build_agent()
+        return run_batch(
+            self.ainvoke,
+            messages,
+            extract_response=self.get_last_response,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            thread_ids=thread_ids,
+        )
+
     def stream(self, message: str, thread_id: str = "default") -> Iterator[dict]:
         """
         流式调用 Agent (state 级别)
@@ -467,109 +886,345 @@ When a user request matches a skill's description, use the load_skill tool to ge
         Yields:
             流式响应块 (完整状态更新)
         """
-        config = {"configurable": {"thread_id": thread_id}}
+        config = self._build_config(thread_id)
 
         for chunk in self.agent.stream(
-            {"messages": [{"role": "user", "content": message}]},
+            self._build_input(message),
+            config=config,
+            context=self.context,
+            stream_mode="values",
+        ):
+            yield chunk
+
+    async def astream(self, message: str, thread_id: str = "default") -> AsyncIterator[dict]:
+        """
+        异步流式调用 Agent (state 级别)
+
+        Args:
+            message: 用户消息
+            thread_id: 会话 ID
+
+        Yields:
+            流式响应块 (完整状态更新)
+        """
+        config = self._build_config(thread_id)
+
+        async for chunk in self.agent.astream(
+            self._build_input(message),
             config=config,
             context=self.context,
             stream_mode="values",
         ):
             yield chunk
 
-    def stream_events(self, message: str, thread_id: str = "default") -> Iterator[dict]:
+    def stream_events(
+        self,
+        message: str,
+        thread_id: str = "default",
+        record: Optional[Union[str, Path]] = None,
+        budget: Optional["TurnBudget"] = None,
+        cancel: Optional["CancellationToken"] = None,
+    ) -> Iterator[dict]:
         """
         事件级流式输出，支持 thinking 和 token 级流式
 
         Args:
             message: 用户消息
             thread_id: 会话 ID
+            record: 录制文件路径，指定时把原始流式消息写入 JSONL（见 recording 模块）
+            budget: 本轮预算，默认使用 Agent 的预算
+            cancel: 取消令牌；也可以调用 agent.cancel(thread_id) 取消。调用方关闭生成器
+                （包括 Ctrl+C）时同样会取消本轮：终止正在执行的 bash 并补全对话状态
 
         Yields:
             事件字典，格式如下:
             - {"type": "thinking", "content": "..."} - 思考内容片段
             - {"type": "text", "content": "..."} - 响应文本片段
             - {"type": "tool_call", "name": "...", "args": {...}} - 工具调用
-            - {"type": "tool_result", "name": "...", "content": "...", "success": bool} - 工具结果
-            - {"type": "done", "response": "..."} - 完成标记，包含完整响应
+            - {"type": "tool_result", "name": "...", "content": "...", "success": bool,
+               "metrics": {...}} - 工具结果（metrics 为耗时 / 字节数等指标）
+            - {"type": "budget_exceeded", "limit": "...", "value": ..., "used": ..., "message": "..."}
+              - 本轮预算耗尽（在 done 之前发出）
+            - {"type": "cancelled", "reason": "..."} - 本轮已取消（在 done 之前发出）
+            - {"type": "done", "response": "...", "usage": {...}} - 完成标记，包含完整响应；
+              usage 为本轮 token 用量（input / output / cache_read / cache_write），无用量信息时省略
         """
-        config = {"configurable": {"thread_id": thread_id}}
-        emitter = StreamEventEmitter()
-        tracker = ToolCallTracker()
-
-        full_response = ""
-        reasoning_tokens = 0
-        thinking_seen = False
-        debug = os.getenv("SKILLS_DEBUG", "").lower() in ("1", "true", "yes")
+        state = self._new_event_stream()
+        state.budget = self._start_budget(thread_id, budget)
+        token = state.cancel = self._start_run(thread_id, cancel)
+        recorder = self._open_recorder(record, message, thread_id)
 
         # 使用 messages 模式获取 token 级流式
+        stream = self.agent.stream(
+            self._build_input(message),
+            config=self._build_config(thread_id, token),
+            context=self.context,
+            stream_mode="messages",
+        )
         try:
-            for event in self.agent.stream(
-                {"messages": [{"role": "user", "content": message}]},
-                config=config,
-                context=self.context,
-                stream_mode="messages",
-            ):
-                # event 可能是 tuple(message, metadata) 或直接 message
-                if isinstance(event, tuple) and len(event) >= 2:
-                    chunk = event[0]
-                else:
-                    chunk = event
+            for event in stream:
+                if recorder is not None:
+                    recorder.write(_event_message(event))
+                yield from self._handle_stream_event(event, state)
+                if token.cancelled:
+                    break
+        except Exception as e:
+            # 取消时模型流在下一个 token 处中止，不作为错误处理
+            if not token.cancelled:
+                yield self._stream_error(e, state)
+                raise
+        except BaseException:
+            # Ctrl+C / 调用方关闭生成器：取消本轮，终止正在执行的子进程并补全对话状态
+            # （已无法发出事件，补全失败时直接抛出）
+            token.cancel("interrupted")
+            stream.close()
+            self._repair_cancelled_thread(thread_id, token)
+            raise
+        finally:
+            stream.close()
+            self._finish_run(thread_id, token)
+            self._finish_budget(thread_id, state.budget)
+            if recorder is not None:
+                recorder.close()
+
+        if token.cancelled:
+            try:
+                self._repair_cancelled_thread(thread_id, token)
+            except Exception as e:
+                yield self._repair_error(thread_id, e, state)
+        yield from self._finish_event_stream(state)
 
-                if debug:
-                    chunk_type = type(chunk).__name__
-                    print(f"[DEBUG] Event: {chunk_type}")
-
-                # 处理 AIMessageChunk / AIMessage
-                if isinstance(chunk, (AIMessageChunk, AIMessage)):
-                    reasoning_tokens += self._extract_reasoning_tokens(chunk)
-                    # 处理 content
-                    for ev in self._process_chunk_content(chunk, emitter, tracker):
-                        if ev.type == "thinking":
-                            thinking_seen = True
-                        if ev.type == "text":
-                            full_response += ev.data.get("content", "")
-                        if debug:
-                            print(f"[DEBUG] Yielding: {ev.type}")
-                        yield ev.data
-
-                    # 处理 tool_calls (有些情况下在 chunk.tool_calls 中)
-                    if hasattr(chunk, "tool_calls") and chunk.tool_calls:
-                        for ev in self._process_tool_calls(chunk.tool_calls, emitter, tracker):
-                            if debug:
-                                print(f"[DEBUG] Yielding from tool_calls: {ev.type}")
-                            yield ev.data
-
-                # 处理 ToolMessage (工具执行结果)
-                elif hasattr(chunk, "type") and chunk.type == "tool":
-                    if debug:
-                        tool_name = getattr(chunk, "name", "unknown")
-                        print(f"[DEBUG] Processing tool result: {tool_name}")
-                    for ev in self._process_tool_result(chunk, emitter, tracker):
-                        if debug:
-                            print(f"[DEBUG] Yielding: {ev.type}")
-                        yield ev.data
+    async def astream_events(
+        self,
+        message: str,
+        thread_id: str = "default",
+        record: Optional[Union[str, Path]] = None,
+        budget: Optional["TurnBudget"] = None,
+        cancel: Optional["CancellationToken"] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        异步事件级流式输出
 
-            if debug:
-                print("[DEBUG] Stream completed normally")
+        与 stream_events 产出相同的事件字典，运行在事件循环上（不占用线程），
+        适合在同一进程中服务大量并发会话。
 
+        Args:
+            message: 用户消息
+            thread_id: 会话 ID
+            record: 录制文件路径，指定时把原始流式消息写入 JSONL
+            budget: 本轮预算，默认使用 Agent 的预算
+            cancel: 取消令牌；任务被取消或生成器被关闭时同样会取消本轮
+
+        Yields:
+            事件字典，格式同 stream_events
+        """
+        state = self._new_event_stream()
+        state.budget = self._start_budget(thread_id, budget)
+        token = state.cancel = self._start_run(thread_id, cancel)
+        recorder = self._open_recorder(record, message, thread_id)
+
+        stream = self.agent.astream(
+            self._build_input(message),
+            config=self._build_config(thread_id, token),
+            context=self.context,
+            stream_mode="messages",
+        )
+        try:
+            async for event in stream:
+                if recorder is not None:
+                    recorder.write(_event_message(event))
+                for data in self._handle_stream_event(event, state):
+                    yield data
+                if token.cancelled:
+                    break
         except Exception as e:
-            if debug:
-                import traceback
-                print(f"[DEBUG] Stream error: {e}")
-                traceback.print_exc()
-            # 发送错误事件让用户知道发生了什么
-            yield emitter.error(str(e)).data
+            if not token.cancelled:
+                yield self._stream_error(e, state)
+                raise
+        except BaseException:
+            # 客户端断开（任务取消）/ 调用方关闭生成器：取消本轮，终止正在执行的子进程并补全对话状态。
+            # 补全放在独立任务中，等待它的协程再次被取消时补全仍会完成（失败时抛出）
+            token.cancel("interrupted")
+            await asyncio.shield(asyncio.ensure_future(self._aclose_and_repair(stream, thread_id, token)))
             raise
+        finally:
+            try:
+                await stream.aclose()
+            finally:
+                self._finish_run(thread_id, token)
+                self._finish_budget(thread_id, state.budget)
+                if recorder is not None:
+                    recorder.close()
+
+        if token.cancelled:
+            try:
+                await self._arepair_cancelled_thread(thread_id, token)
+            except Exception as e:
+                yield self._repair_error(thread_id, e, state)
 
-        if self.model_provider == "openai" and self.enable_thinking and reasoning_tokens > 0 and not thinking_seen:
+        for data in self._finish_event_stream(state):
+            yield data
+
+    def replay_events(self, recording: Union[str, Path, "Recording"], speed: float = 1.0) -> Iterator[dict]:
+        """
+        回放录制的模型流
+
+        录制的消息按原始节奏重新经过事件处理链路，产出与 stream_events 相同的事件字典；
+        不调用模型和工具，也不需要 API Key。
+
+        Args:
+            recording: 录制文件路径或 load_recording() 的结果
+            speed: 回放倍速（1.0 为原速，<= 0 表示不等待）
+        """
+        from .recording import load_recording, replay_messages
+
+        if not hasattr(recording, "messages"):
+            recording = load_recording(recording)
+        state = self._new_event_stream()
+        for chunk in replay_messages(recording, speed):
+            yield from self._handle_stream_event(chunk, state)
+        yield from self._finish_event_stream(state)
+
+    async def areplay_events(
+        self, recording: Union[str, Path, "Recording"], speed: float = 1.0
+    ) -> AsyncIterator[dict]:
+        """replay_events 的异步版本（等待期间不占用事件循环）"""
+        from .recording import areplay_messages, load_recording
+
+        if not hasattr(recording, "messages"):
+            recording = load_recording(recording)
+        state = self._new_event_stream()
+        async for chunk in areplay_messages(recording, speed):
+            for data in self._handle_stream_event(chunk, state):
+                yield data
+        for data in self._finish_event_stream(state):
+            yield data
+
+    def _open_recorder(
+        self, record: Optional[Union[str, Path]], message: str, thread_id: str
+    ) -> Optional["StreamRecorder"]:
+        """按需创建流录制器"""
+        if record is None:
+            return None
+        from .recording import StreamRecorder
+
+        return StreamRecorder(
+            record,
+            provider=self.model_provider,
+            model=self.model_name,
+            thread_id=thread_id,
+            message=message,
+        ).open()
+
+    def _build_input(self, message: str) -> dict:
+        """构建单轮输入"""
+        return {"messages": [{"role": "user", "content": message}]}
+
+    def _new_event_stream(self) -> "_EventStreamState":
+        """创建一次事件级流式输出的状态"""
+        return _EventStreamState(
+            emitter=StreamEventEmitter(),
+            tracker=ToolCallTracker(),
+            # 并发执行的工具按完成顺序返回，按调用顺序重新排列后再发出
+            result_buffer=OrderedResultBuffer() if self.tool_policy.ordered_results else None,
+            debug=os.getenv("SKILLS_DEBUG", "").lower() in ("1", "true", "yes"),
+        )
+
+    def _handle_stream_event(self, event, state: "_EventStreamState") -> Iterator[dict]:
+        """将 messages 模式的一个流式事件转换为事件字典（同步 / 异步共用）"""
+        emitter, tracker, debug = state.emitter, state.tracker, state.debug
+
+        # event 可能是 tuple(message, metadata) 或直接 message
+        chunk = _event_message(event)
+
+        if debug:
+            chunk_type = type(chunk).__name__
+            print(f"[DEBUG] Event: {chunk_type}")
+
+        # 处理 AIMessageChunk / AIMessage
+        from langchain_core.messages import AIMessage, AIMessageChunk
+
+        if isinstance(chunk, (AIMessageChunk, AIMessage)):
+            state.reasoning_tokens += self._extract_reasoning_tokens(chunk)
+            self._accumulate_usage(chunk, state.usage)
+            # 处理 content
+            for ev in self._process_chunk_content(chunk, emitter, tracker):
+                if ev.type == "thinking":
+                    state.thinking_seen = True
+                if ev.type == "text":
+                    state.full_response += ev.data.get("content", "")
+                if debug:
+                    print(f"[DEBUG] Yielding: {ev.type}")
+                yield ev.data
+
+            # 处理 tool_calls (有些情况下在 chunk.tool_calls 中)
+            if hasattr(chunk, "tool_calls") and chunk.tool_calls:
+                for ev in self._process_tool_calls(chunk.tool_calls, emitter, tracker):
+                    if debug:
+                        print(f"[DEBUG] Yielding from tool_calls: {ev.type}")
+                    yield ev.data
+
+        # 处理 ToolMessage (工具执行结果)
+        elif hasattr(chunk, "type") and chunk.type == "tool":
+            if debug:
+                tool_name = getattr(chunk, "name", "unknown")
+                print(f"[DEBUG] Processing tool result: {tool_name}")
+            events = list(self._process_tool_result(chunk, emitter, tracker))
+            if state.result_buffer is None:
+                batches = [events]
+            else:
+                batches = state.result_buffer.push(
+                    getattr(chunk, "tool_call_id", ""),
+                    events,
+                    [info.id for info in tracker.get_all()],
+                )
+            for batch in batches:
+                for ev in batch:
+                    if debug:
+                        print(f"[DEBUG] Yielding: {ev.type}")
+                    yield ev.data
+
+    def _stream_error(self, error: Exception, state: "_EventStreamState") -> dict:
+        """流式输出出错时的错误事件"""
+        if state.debug:
+            import traceback
+            print(f"[DEBUG] Stream error: {error}")
+            traceback.print_exc()
+        # 发送错误事件让用户知道发生了什么
+        return state.emitter.error(str(error)).data
+
+    def _finish_event_stream(self, state: "_EventStreamState") -> Iterator[dict]:
+        """流式输出正常结束：释放暂存的工具结果并发送完成事件"""
+        emitter = state.emitter
+
+        if state.result_buffer is not None:
+            for batch in state.result_buffer.flush():
+                for ev in batch:
+                    yield ev.data
+
+        if state.debug:
+            print("[DEBUG] Stream completed normally")
+
+        if (
+            self.model_provider == "openai"
+            and self.enable_thinking
+            and state.reasoning_tokens > 0
+            and not state.thinking_seen
+        ):
             yield emitter.thinking(
-                f"[OpenAI reasoning enabled: used {reasoning_tokens} reasoning tokens. "
+                f"[OpenAI reasoning enabled: used {state.reasoning_tokens} reasoning tokens. "
                 "This endpoint does not expose reasoning summary text in the stream.]"
             ).data
 
-        # 发送完成事件
-        yield emitter.done(full_response).data
+        if state.cancel is not None and state.cancel.cancelled:
+            yield emitter.cancelled(state.cancel.reason or "cancelled").data
+
+        if state.budget is not None and state.budget.exceeded is not None:
+            exceeded = state.budget.exceeded
+            yield emitter.budget_exceeded(exceeded.limit, exceeded.value, exceeded.used, exceeded.message).data
+
+        # 发送完成事件（附带本轮累计的 token 用量，含 prompt cache 读写）
+        yield emitter.done(state.full_response, usage=state.usage or None).data
 
     def _process_chunk_content(self, chunk, emitter: StreamEventEmitter, tracker: ToolCallTracker):
         """处理 chunk 的 content"""
@@ -699,7 +1354,27 @@ When a user request matches a skill's description, use the load_skill tool to ge
         # 基于内容判断是否成功（统一使用 is_success）
         success = is_success(content)
 
-        yield emitter.tool_result(name, content, success)
+        metrics = self.metrics.pop_call(getattr(chunk, "tool_call_id", ""))
+        yield emitter.tool_result(name, content, success, metrics=metrics.to_dict() if metrics else None)
+
+    def _accumulate_usage(self, chunk, usage: dict) -> None:
+        """
+        累加 chunk 的 usage_metadata
+
+        Anthropic 的 cache_read / cache_creation 位于 input_token_details 中；
+        流式 chunk 中的 usage 是增量，直接相加即为整轮用量。
+        """
+        usage_metadata = getattr(chunk, "usage_metadata", None) or {}
+        input_details = usage_metadata.get("input_token_details") or {}
+        counts = {
+            "input_tokens": usage_metadata.get("input_tokens", 0),
+            "output_tokens": usage_metadata.get("output_tokens", 0),
+            "cache_read_tokens": input_details.get("cache_read", 0),
+            "cache_write_tokens": input_details.get("cache_creation", 0),
+        }
+        for key, value in counts.items():
+            if isinstance(value, int) and value:
+                usage[key] = usage.get(key, 0) + value
 
     def _extract_reasoning_tokens(self, chunk) -> int:
         """从 OpenAI chunk 的 usage_metadata 中提取 reasoning token 数量"""
@@ -708,6 +1383,18 @@ When a user request matches a skill's description, use the load_skill tool to ge
         reasoning_tokens = output_details.get("reasoning", 0)
         return reasoning_tokens if isinstance(reasoning_tokens, int) else 0
 
+    def get_tool_metrics(self, thread_id: Optional[str] = None) -> dict[str, dict]:
+        """
+        获取按工具聚合的调用指标
+
+        Args:
+            thread_id: 会话 ID，None 表示汇总所有会话
+
+        Returns:
+            {tool_name: {"calls", "errors", "total_wall_ms", "mean_wall_ms", ...}}
+        """
+        return self.metrics.summary(thread_id)
+
     def get_last_response(self, result: dict) -> str:
         """
         从结果中提取最后的 AI 响应文本
@@ -718,6 +1405,8 @@ When a user request matches a skill's description, use the load_skill tool to ge
         Returns:
             AI 响应文本
         """
+        from langchain_core.messages import AIMessage
+
         messages = result.get("messages", [])
         for msg in reversed(messages):
             if isinstance(msg, AIMessage) and msg.content:
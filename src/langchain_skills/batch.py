@@ -0,0 +1,266 @@
+"""
+批量执行
+
+处理 N 个输入（例如 examples/extract_article.py 中的一组文章 URL）时，逐个调用
+agent.invoke 只能串行执行。这里在一个事件循环上并发运行 ainvoke：
+- max_concurrency: 同时执行的输入数上限
+- timeout: 单个输入的超时（秒），超时的调用会被取消
+- 失败隔离：单个输入出错或超时只记录在它自己的结果中，不影响其他输入
+- 每个输入使用独立的 thread_id，互不共享对话历史
+- 结果可以按完成顺序流式取得，结束后汇总吞吐量 / 延迟统计
+
+同步接口在进程级后台事件循环上运行，结果通过队列交给调用方。
+"""
+
+import asyncio
+import concurrent.futures
+import math
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional, Sequence
+
+# 默认同时执行的输入数
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+@dataclass
+class BatchItemResult:
+    """
+    单个输入的执行结果
+
+    Attributes:
+        index: 输入在批次中的下标
+        message: 用户消息
+        thread_id: 本次执行使用的会话 ID
+        response: 最终回复文本（失败时为空）
+        result: ainvoke 返回的完整状态（失败时为 None）
+        error: 错误信息（成功时为 None）
+        timed_out: 是否因超时被取消
+        latency: 执行耗时（秒，不含排队等待）
+    """
+    index: int
+    message: str
+    thread_id: str
+    response: str = ""
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    timed_out: bool = False
+    latency: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """最近秩百分位数（输入已排序）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class BatchStats:
+    """批次汇总统计"""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    wall_time: float = 0.0
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    @classmethod
+    def from_results(cls, results: Sequence[BatchItemResult], wall_time: float) -> "BatchStats":
+        return cls(
+            total=len(results),
+            succeeded=sum(1 for r in results if r.success),
+            failed=sum(1 for r in results if not r.success),
+            timed_out=sum(1 for r in results if r.timed_out),
+            wall_time=wall_time,
+            latencies=sorted(r.latency for r in results),
+        )
+
+    @property
+    def throughput(self) -> float:
+        """每秒完成的输入数"""
+        return self.total / self.wall_time if self.wall_time > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        latencies = self.latencies
+        return {
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "wall_time": round(self.wall_time, 3),
+            "throughput": round(self.throughput, 3),
+            "latency_mean": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "latency_p50": round(_percentile(latencies, 50), 3),
+            "latency_p95": round(_percentile(latencies, 95), 3),
+            "latency_max": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+
+@dataclass
+class BatchResult:
+    """
+    批次结果
+
+    Attributes:
+        items: 每个输入的结果（按输入顺序）
+        stats: 汇总统计
+    """
+    items: list[BatchItemResult]
+    stats: BatchStats
+
+    @property
+    def responses(self) -> list[str]:
+        return [item.response for item in self.items]
+
+
+def batch_thread_ids(count: int, prefix: str = "batch") -> list[str]:
+    """为批次中的每个输入生成独立的 thread_id（同一前缀的不同批次也不会复用历史）"""
+    run_id = uuid.uuid4().hex[:8]
+    return [f"{prefix}-{run_id}-{i}" for i in range(count)]
+
+
+async def run_batch(
+    invoke: Callable[[str, str], Awaitable[dict]],
+    messages: Sequence[str],
+    *,
+    extract_response: Callable[[dict], str],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    timeout: Optional[float] = None,
+    thread_ids: Optional[Sequence[str]] = None,
+) -> AsyncIterator[BatchItemResult]:
+    """
+    并发执行一组输入，按完成顺序产出结果
+
+    Args:
+        invoke: 异步调用函数，invoke(message, thread_id) -> 状态
+        messages: 用户消息列表
+        extract_response: 从状态中取最终回复文本
+        max_concurrency: 同时执行的输入数上限（<= 0 表示不限制）
+        timeout: 单个输入的超时（秒），None 表示不限制
+        thread_ids: 每个输入的 thread_id，默认自动生成
+    """
+    messages = list(messages)
+    thread_ids = list(thread_ids) if thread_ids is not None else batch_thread_ids(len(messages))
+    if len(thread_ids) != len(messages):
+        raise ValueError("thread_ids must have the same length as messages")
+    semaphore = asyncio.Semaphore(max_concurrency if max_concurrency > 0 else max(len(messages), 1))
+
+    async def run_one(index: int) -> BatchItemResult:
+        item = BatchItemResult(index=index, message=messages[index], thread_id=thread_ids[index])
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                item.result = await asyncio.wait_for(invoke(item.message, item.thread_id), timeout)
+                item.response = extract_response(item.result)
+            except asyncio.TimeoutError:
+                item.timed_out = True
+                item.error = f"Timed out after {timeout:g}s"
+            except Exception as e:
+                item.error = f"{type(e).__name__}: {e}"
+            item.latency = time.perf_counter() - started
+        return item
+
+    tasks = [asyncio.ensure_future(run_one(i)) for i in range(len(messages))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # 调用方提前停止迭代时取消剩余输入
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def collect_batch(results: AsyncIterator[BatchItemResult]) -> BatchResult:
+    """收集全部结果（按输入顺序）并汇总统计"""
+    started = time.perf_counter()
+    items = [item async for item in results]
+    items.sort(key=lambda item: item.index)
+    return BatchResult(items=items, stats=BatchStats.from_results(items, time.perf_counter() - started))
+
+
+_DONE = object()
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """
+    进程级后台事件循环（同步批量接口共用，首次使用时启动）
+
+    共享的异步 HTTP 连接池（见 model_registry）中的连接绑定创建它们的事件循环，
+    每次批量都新建并关闭事件循环会使下一次批量复用已关闭事件循环上的连接。
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            threading.Thread(target=run, name="skills-batch-loop", daemon=True).start()
+            ready.wait()
+            _background_loop = loop
+        return _background_loop
+
+
+def iterate_in_background(results: Callable[[], AsyncIterator[Any]]) -> Iterator[Any]:
+    """
+    在进程级后台事件循环上运行异步迭代器，同步产出它的结果
+
+    调用方提前停止迭代时取消异步迭代器；迭代器抛出的异常在调用方线程重新抛出。
+    """
+    output: queue.Queue = queue.Queue()
+    loop = background_loop()
+    finished = threading.Event()
+    started: "concurrent.futures.Future[asyncio.Task]" = concurrent.futures.Future()
+
+    async def drain():
+        iterator = results()
+        try:
+            async for value in iterator:
+                output.put((True, value))
+            output.put((True, _DONE))
+        except asyncio.CancelledError:
+            output.put((True, _DONE))
+            raise
+        except Exception as e:
+            output.put((False, e))
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def start():
+        task = loop.create_task(drain())
+        # 任务结束（包括迭代器清理完成）后才放行调用方
+        task.add_done_callback(lambda _: finished.set())
+        started.set_result(task)
+
+    loop.call_soon_threadsafe(start)
+    try:
+        while True:
+            ok, value = output.get()
+            if not ok:
+                raise value
+            if value is _DONE:
+                return
+            yield value
+    finally:
+        if not finished.is_set():
+            loop.call_soon_threadsafe(started.result().cancel)
+        finished.wait()
@@ -0,0 +1,330 @@
+"""
+单轮预算
+
+模型陷入工具循环时，一轮对话可以无限运行下去（每次 bash 最多 300 秒，模型调用次数不设上限），
+长期占用 worker。这里为每次 invoke / stream_events 设置预算：
+- max_wall_time: 本轮最长耗时（秒）
+- max_model_calls: 最多调用模型的次数
+- max_tokens: 最多消耗的 token 数（输入 + 输出）
+- max_tool_calls: 最多执行的工具调用数
+
+超出预算时：
+- 不再调用模型，改为追加一条说明预算耗尽的 AI 消息，本轮正常结束（对话状态保持完整，
+  每个工具调用都有结果，下一轮可以继续）
+- 超出工具调用数后的工具调用不执行，直接返回 [FAILED] 结果；模型还可以再调用一次，
+  根据已有结果作答（这一次仍请求工具时，本轮在下一次模型调用前结束）
+- 正在执行的 bash 命令在本轮截止时间到达时被终止（连同其子进程）
+- stream_events 发出 budget_exceeded 事件，invoke 的结果中包含 budget_exceeded 字段
+"""
+
+import contextvars
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+
+from .env import env_number
+
+BUDGET_EXCEEDED_PREFIX = "[Budget exceeded]"
+
+# 当前工具调用所属的预算（bash 据此计算截止时间）
+_current_tracker: contextvars.ContextVar[Optional["BudgetTracker"]] = contextvars.ContextVar(
+    "skills_budget_tracker", default=None
+)
+
+
+def _optional_int(name: str) -> Optional[int]:
+    value = env_number(name, 0)
+    return value if value > 0 else None
+
+
+@dataclass(frozen=True)
+class TurnBudget:
+    """
+    单轮预算（None 表示不限制）
+
+    Attributes:
+        max_wall_time: 本轮最长耗时（秒）
+        max_model_calls: 最多调用模型的次数
+        max_tokens: 最多消耗的 token 数（输入 + 输出，按模型返回的用量统计）
+        max_tool_calls: 最多执行的工具调用数
+    """
+    max_wall_time: Optional[float] = None
+    max_model_calls: Optional[int] = None
+    max_tokens: Optional[int] = None
+    max_tool_calls: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return any(value is not None for value in asdict(self).values())
+
+    @classmethod
+    def from_env(cls) -> "TurnBudget":
+        """
+        从环境变量读取预算（未设置或 <= 0 表示不限制）
+
+        - SKILLS_MAX_TURN_SECONDS: 本轮最长耗时（秒）
+        - SKILLS_MAX_MODEL_CALLS: 最多调用模型的次数
+        - SKILLS_MAX_TURN_TOKENS: 最多消耗的 token 数
+        - SKILLS_MAX_TOOL_CALLS: 最多执行的工具调用数
+        """
+        wall_time = env_number("SKILLS_MAX_TURN_SECONDS", 0.0, float)
+        return cls(
+            max_wall_time=wall_time if wall_time > 0 else None,
+            max_model_calls=_optional_int("SKILLS_MAX_MODEL_CALLS"),
+            max_tokens=_optional_int("SKILLS_MAX_TURN_TOKENS"),
+            max_tool_calls=_optional_int("SKILLS_MAX_TOOL_CALLS"),
+        )
+
+
+@dataclass
+class BudgetExceeded:
+    """超出的预算项"""
+    limit: str
+    value: float
+    used: float
+
+    @property
+    def message(self) -> str:
+        return (
+            f"{BUDGET_EXCEEDED_PREFIX} This turn stopped after reaching its {self.limit} budget "
+            f"({_format_number(self.used)} / {_format_number(self.value)}). "
+            "Send another message to continue."
+        )
+
+    def to_dict(self) -> dict:
+        return {"limit": self.limit, "value": self.value, "used": self.used, "message": self.message}
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.1f}" if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class BudgetTracker:
+    """
+    一轮对话的预算用量（线程安全，并行工具调用共用）
+
+    Attributes:
+        budget: 预算
+        model_calls / tokens / tool_calls: 已用量
+        exceeded: 第一个超出的预算项，未超出时为 None
+    """
+
+    def __init__(self, budget: TurnBudget):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.model_calls = 0
+        self.tokens = 0
+        self.tool_calls = 0
+        self.exceeded: Optional[BudgetExceeded] = None
+        self._final_answer_allowed = True
+        self._lock = threading.Lock()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """本轮截止时间（time.monotonic），不限时为 None"""
+        if self.budget.max_wall_time is None:
+            return None
+        return self.started + self.budget.max_wall_time
+
+    def remaining_time(self) -> Optional[float]:
+        deadline = self.deadline
+        return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+    def _exceed(self, limit: str, value: float, used: float) -> BudgetExceeded:
+        if self.exceeded is None:
+            self.exceeded = BudgetExceeded(limit=limit, value=value, used=used)
+        return self.exceeded
+
+    def check(self) -> Optional[BudgetExceeded]:
+        """检查是否还能继续调用模型"""
+        budget = self.budget
+        with self._lock:
+            if self.exceeded is not None:
+                # 工具调用数用满后允许模型再调用一次，根据已有结果（含被跳过的提示）作答
+                if self.exceeded.limit == "max_tool_calls" and self._final_answer_allowed:
+                    self._final_answer_allowed = False
+                    return None
+                return self.exceeded
+            elapsed = time.monotonic() - self.started
+            if budget.max_wall_time is not None and elapsed >= budget.max_wall_time:
+                return self._exceed("max_wall_time", budget.max_wall_time, round(elapsed, 1))
+            if budget.max_model_calls is not None and self.model_calls >= budget.max_model_calls:
+                return self._exceed("max_model_calls", budget.max_model_calls, self.model_calls)
+            if budget.max_tokens is not None and self.tokens >= budget.max_tokens:
+                return self._exceed("max_tokens", budget.max_tokens, self.tokens)
+            # 工具调用数在 acquire_tool_call 中检查
+            return None
+
+    def record_model_call(self, response: ModelResponse) -> None:
+        """记录一次模型调用及其 token 用量"""
+        tokens = 0
+        for message in response.result:
+            usage = getattr(message, "usage_metadata", None) or {}
+            tokens += int(usage.get("input_tokens", 0) or 0) + int(usage.get("output_tokens", 0) or 0)
+        with self._lock:
+            self.model_calls += 1
+            self.tokens += tokens
+
+    def acquire_tool_call(self) -> Optional[BudgetExceeded]:
+        """占用一次工具调用；超出工具调用数或截止时间时返回超出项"""
+        budget = self.budget
+        with self._lock:
+            if budget.max_wall_time is not None and time.monotonic() - self.started >= budget.max_wall_time:
+                return self._exceed("max_wall_time", budget.max_wall_time, round(time.monotonic() - self.started, 1))
+            if budget.max_tool_calls is not None and self.tool_calls >= budget.max_tool_calls:
+                return self._exceed("max_tool_calls", budget.max_tool_calls, self.tool_calls)
+            self.tool_calls += 1
+            return None
+
+    def time_exceeded(self) -> BudgetExceeded:
+        """工具执行到截止时间被终止"""
+        with self._lock:
+            return self._exceed(
+                "max_wall_time", self.budget.max_wall_time, round(time.monotonic() - self.started, 1)
+            )
+
+
+def current_tracker() -> Optional[BudgetTracker]:
+    """当前工具调用所属的预算（不在预算内执行时为 None）"""
+    return _current_tracker.get()
+
+
+def tool_timeout(default: float) -> tuple[float, bool]:
+    """
+    工具的有效超时
+
+    Returns:
+        (超时秒数, 是否受本轮截止时间限制)
+    """
+    tracker = current_tracker()
+    remaining = tracker.remaining_time() if tracker is not None else None
+    if remaining is not None and remaining < default:
+        return remaining, True
+    return default, False
+
+
+def runtime_thread_id(runtime) -> str:
+    """中间件请求所属的会话 ID"""
+    execution_info = getattr(runtime, "execution_info", None)
+    thread_id = getattr(execution_info, "thread_id", None)
+    if thread_id is None:
+        config = getattr(runtime, "config", None) or {}
+        thread_id = (config.get("configurable") or {}).get("thread_id")
+    return thread_id or ""
+
+
+class TurnBudgetMiddleware(AgentMiddleware):
+    """
+    按会话执行单轮预算
+
+    Agent 在每轮开始时调用 start(thread_id)，结束时调用 finish(thread_id, tracker)；
+    没有登记预算的会话不受限制。
+    """
+
+    def __init__(self, budget: Optional[TurnBudget] = None):
+        super().__init__()
+        self.budget = budget or TurnBudget.from_env()
+        self._trackers: dict[str, BudgetTracker] = {}
+        self._lock = threading.Lock()
+
+    def start(self, thread_id: str, budget: Optional[TurnBudget] = None) -> Optional[BudgetTracker]:
+        """
+        登记一轮对话的预算
+
+        Args:
+            thread_id: 会话 ID
+            budget: 本轮预算，默认使用中间件的预算；预算为空时不登记
+        """
+        budget = budget or self.budget
+        if not budget.enabled:
+            return None
+        tracker = BudgetTracker(budget)
+        with self._lock:
+            self._trackers[thread_id] = tracker
+        return tracker
+
+    def finish(self, thread_id: str, tracker: BudgetTracker) -> None:
+        """注销一轮对话的预算（同一会话上后开始的一轮已覆盖登记时保留它的预算）"""
+        with self._lock:
+            if self._trackers.get(thread_id) is tracker:
+                del self._trackers[thread_id]
+
+    def _tracker(self, runtime) -> Optional[BudgetTracker]:
+        with self._lock:
+            return self._trackers.get(runtime_thread_id(runtime))
+
+    @staticmethod
+    def _stop_response(exceeded: BudgetExceeded) -> ModelResponse:
+        from langchain_core.messages import AIMessage
+
+        return ModelResponse(result=[AIMessage(content=exceeded.message)])
+
+    @staticmethod
+    def _skipped_tool_result(request, exceeded: BudgetExceeded):
+        from langchain_core.messages import ToolMessage
+
+        return ToolMessage(
+            content=f"[FAILED] Tool call skipped: {exceeded.limit} budget exhausted for this turn.",
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+            status="error",
+        )
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        tracker = self._tracker(request.runtime)
+        if tracker is None:
+            return handler(request)
+        exceeded = tracker.check()
+        if exceeded is not None:
+            return self._stop_response(exceeded)
+        response = handler(request)
+        tracker.record_model_call(response)
+        return response
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        tracker = self._tracker(request.runtime)
+        if tracker is None:
+            return await handler(request)
+        exceeded = tracker.check()
+        if exceeded is not None:
+            return self._stop_response(exceeded)
+        response = await handler(request)
+        tracker.record_model_call(response)
+        return response
+
+    def wrap_tool_call(self, request, handler):
+        tracker = self._tracker(request.runtime)
+        if tracker is None:
+            return handler(request)
+        exceeded = tracker.acquire_tool_call()
+        if exceeded is not None:
+            return self._skipped_tool_result(request, exceeded)
+        token = _current_tracker.set(tracker)
+        try:
+            return handler(request)
+        finally:
+            _current_tracker.reset(token)
+
+    async def awrap_tool_call(self, request, handler):
+        tracker = self._tracker(request.runtime)
+        if tracker is None:
+            return await handler(request)
+        exceeded = tracker.acquire_tool_call()
+        if exceeded is not None:
+            return self._skipped_tool_result(request, exceeded)
+        token = _current_tracker.set(tracker)
+        try:
+            return await handler(request)
+        finally:
+            _current_tracker.reset(token)
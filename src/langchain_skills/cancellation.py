@@ -0,0 +1,267 @@
+"""
+协作式取消
+
+用户关闭浏览器或在 CLI 中按 Ctrl+C 时，正在运行的一轮对话需要尽快停下，且不能留下孤儿进程
+或不完整的对话状态。取消一轮对话时：
+- 模型流：在下一个 token 处中止（回调抛出 RunCancelled），之后不再调用模型
+- 工具：尚未开始的工具调用不执行；正在执行的 bash 命令连同子进程一起被终止
+- 对话状态：为没有结果的工具调用补上 [FAILED] 结果，并追加一条说明已取消的 AI 消息，
+  下一轮可以在同一 thread_id 上继续
+
+用法:
+    token = CancellationToken()
+    for event in agent.stream_events("...", thread_id="t1", cancel=token):
+        ...
+    # 在其他线程中
+    token.cancel()            # 或 agent.cancel("t1")
+"""
+
+import contextvars
+import itertools
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .budget import runtime_thread_id
+
+CANCELLED_PREFIX = "[Cancelled]"
+
+# 当前工具调用所属的取消令牌（bash 据此登记终止子进程的回调）
+_current_token: contextvars.ContextVar[Optional["CancellationToken"]] = contextvars.ContextVar(
+    "skills_cancel_token", default=None
+)
+
+
+class RunCancelled(Exception):
+    """运行已被取消（用于中止正在进行的模型流）"""
+
+
+class CancellationToken:
+    """
+    取消令牌（线程安全，可以在任意线程中取消）
+
+    Attributes:
+        reason: 取消原因，未取消时为 None
+    """
+
+    def __init__(self):
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: dict[int, Callable[[], Any]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """
+        取消并执行已登记的回调（例如终止子进程）
+
+        Returns:
+            是否为首次取消
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                # 单个回调失败不影响其他资源的释放
+                pass
+        return True
+
+    def add_callback(self, callback: Callable[[], Any]) -> Optional[int]:
+        """
+        登记取消时执行的回调；已经取消时立即执行
+
+        Returns:
+            用于 remove_callback 的编号（已经取消时为 None）
+        """
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = next(self._ids)
+                self._callbacks[callback_id] = callback
+                return callback_id
+        callback()
+        return None
+
+    def remove_callback(self, callback_id: Optional[int]) -> None:
+        if callback_id is None:
+            return
+        with self._lock:
+            self._callbacks.pop(callback_id, None)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise RunCancelled(self.reason)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待取消，返回是否已取消"""
+        return self._event.wait(timeout)
+
+
+def current_cancel_token() -> Optional[CancellationToken]:
+    """当前工具调用所属的取消令牌（不在可取消的运行中时为 None）"""
+    return _current_token.get()
+
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """取消后在下一个流式 token 处中止模型调用"""
+
+    raise_error = True
+    run_inline = True
+
+    def __init__(self, token: CancellationToken):
+        self.token = token
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.token.raise_if_cancelled()
+
+
+def cancelled_turn_repair(messages: list, reason: Optional[str] = None) -> list:
+    """
+    取消后补全本轮对话的消息
+
+    - 本轮中没有结果的工具调用补上 [FAILED] 结果（否则下一次调用模型会被 provider 拒绝）
+    - 本轮没有以不含工具调用的 AI 消息结束时，追加一条说明已取消的 AI 消息
+
+    Returns:
+        需要追加的消息（本轮已经完整结束时为空）
+    """
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    start = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            start = i
+            break
+    turn = messages[start:]
+    if not turn:
+        return []
+
+    answered = {m.tool_call_id for m in turn if isinstance(m, ToolMessage)}
+    updates = []
+    for message in turn:
+        if not isinstance(message, AIMessage):
+            continue
+        for call in message.tool_calls or []:
+            if call.get("id") and call["id"] not in answered:
+                updates.append(ToolMessage(
+                    content="[FAILED] Tool call cancelled before it finished.",
+                    tool_call_id=call["id"],
+                    name=call.get("name"),
+                    status="error",
+                ))
+
+    last = turn[-1]
+    if updates or not (isinstance(last, AIMessage) and not last.tool_calls):
+        updates.append(AIMessage(content=_cancelled_message(reason)))
+    return updates
+
+
+def _cancelled_message(reason: Optional[str]) -> str:
+    detail = f" ({reason})" if reason and reason != "cancelled" else ""
+    return f"{CANCELLED_PREFIX} This turn was cancelled before it finished{detail}."
+
+
+class CancellationMiddleware(AgentMiddleware):
+    """
+    按会话登记取消令牌
+
+    Agent 在每轮开始时调用 start(thread_id, token)，结束时调用 finish(thread_id)；
+    取消后不再调用模型（直接以说明已取消的 AI 消息结束本轮），也不再执行新的工具调用。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._tokens: dict[str, CancellationToken] = {}
+        self._lock = threading.Lock()
+
+    def start(self, thread_id: str, token: CancellationToken) -> None:
+        with self._lock:
+            self._tokens[thread_id] = token
+
+    def finish(self, thread_id: str, token: CancellationToken) -> None:
+        with self._lock:
+            if self._tokens.get(thread_id) is token:
+                del self._tokens[thread_id]
+
+    def cancel(self, thread_id: str, reason: str = "cancelled") -> bool:
+        """取消会话正在进行的运行，返回是否有运行被取消"""
+        with self._lock:
+            token = self._tokens.get(thread_id)
+        return token is not None and token.cancel(reason)
+
+    def _token(self, runtime) -> Optional[CancellationToken]:
+        with self._lock:
+            return self._tokens.get(runtime_thread_id(runtime))
+
+    @staticmethod
+    def _stop_response(token: CancellationToken) -> ModelResponse:
+        from langchain_core.messages import AIMessage
+
+        return ModelResponse(result=[AIMessage(content=_cancelled_message(token.reason))])
+
+    @staticmethod
+    def _skipped_tool_result(request):
+        from langchain_core.messages import ToolMessage
+
+        return ToolMessage(
+            content="[FAILED] Tool call skipped: the turn was cancelled.",
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+            status="error",
+        )
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        token = self._token(request.runtime)
+        if token is not None and token.cancelled:
+            return self._stop_response(token)
+        return handler(request)
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        token = self._token(request.runtime)
+        if token is not None and token.cancelled:
+            return self._stop_response(token)
+        return await handler(request)
+
+    def wrap_tool_call(self, request, handler):
+        token = self._token(request.runtime)
+        if token is None:
+            return handler(request)
+        if token.cancelled:
+            return self._skipped_tool_result(request)
+        context_token = _current_token.set(token)
+        try:
+            return handler(request)
+        finally:
+            _current_token.reset(context_token)
+
+    async def awrap_tool_call(self, request, handler):
+        token = self._token(request.runtime)
+        if token is None:
+            return await handler(request)
+        if token.cancelled:
+            return self._skipped_tool_result(request)
+        context_token = _current_token.set(token)
+        try:
+            return await handler(request)
+        finally:
+            _current_token.reset(context_token)
@@ -0,0 +1,560 @@
+"""
+会话检查点存储
+
+默认的 InMemorySaver 把每个会话的完整历史永久留在进程内存中，重启即丢失，
+长时间运行的 Web 进程内存会持续增长。这里提供可插拔的检查点配置：
+- memory: InMemorySaver（默认，与之前行为一致）
+- sqlite: 内置的 SQLite（WAL）检查点存储
+  - 每个会话只保留最近 N 个检查点 / 不超过指定字节数（至少保留最新一个）
+  - 闲置超过 TTL 的会话自动删除
+  - 会话总数超过上限时按最近访问时间（LRU）淘汰
+
+检查点整体序列化存储（与 langgraph-checkpoint-sqlite 相同）。Agent 的 messages
+通道使用 add_messages 归并，每个检查点都包含完整值，所以裁剪旧检查点不影响恢复。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from .env import env_number
+
+
+# 表结构版本，变化时重建
+SCHEMA_VERSION = 1
+
+# 本存储使用的表（按外键依赖的逆序）
+_TABLES = ("writes", "checkpoints", "threads")
+
+# 两次自动淘汰之间的最小间隔（秒）
+EVICTION_INTERVAL = 60.0
+
+
+def default_checkpoint_db() -> Path:
+    """检查点数据库：SKILLS_CHECKPOINT_DB 环境变量，否则 ~/.cache/langchain_skills/checkpoints.sqlite"""
+    raw = os.getenv("SKILLS_CHECKPOINT_DB")
+    if raw:
+        return Path(raw).expanduser()
+    return Path.home() / ".cache" / "langchain_skills" / "checkpoints.sqlite"
+
+
+@dataclass
+class CheckpointLimits:
+    """
+    检查点的保留策略（None 表示不限制）
+
+    Attributes:
+        thread_ttl: 会话闲置多少秒后删除
+        max_threads: 最多保留多少个会话（超出时淘汰最久未访问的）
+        max_checkpoints_per_thread: 每个会话最多保留多少个检查点
+        max_thread_bytes: 每个会话检查点的总字节数上限
+    """
+    thread_ttl: Optional[float] = None
+    max_threads: Optional[int] = None
+    max_checkpoints_per_thread: Optional[int] = None
+    max_thread_bytes: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> CheckpointLimits:
+        """
+        从环境变量读取（未设置或 <= 0 表示不限制）
+
+        - SKILLS_THREAD_TTL: 会话闲置 TTL（秒）
+        - SKILLS_MAX_THREADS: 会话数上限
+        - SKILLS_MAX_CHECKPOINTS_PER_THREAD: 每个会话的检查点数上限
+        - SKILLS_MAX_THREAD_MB: 每个会话的检查点大小上限（MB）
+        """
+        def read(name: str) -> Optional[float]:
+            value = env_number(name, 0.0, float)
+            return value if value > 0 else None
+
+        max_threads = read("SKILLS_MAX_THREADS")
+        max_checkpoints = read("SKILLS_MAX_CHECKPOINTS_PER_THREAD")
+        max_mb = read("SKILLS_MAX_THREAD_MB")
+        return cls(
+            thread_ttl=read("SKILLS_THREAD_TTL"),
+            max_threads=int(max_threads) if max_threads else None,
+            max_checkpoints_per_thread=int(max_checkpoints) if max_checkpoints else None,
+            max_thread_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+        )
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite（WAL）检查点存储，支持会话淘汰和单会话大小上限
+
+    用法:
+        saver = SqliteCheckpointSaver(db_path, CheckpointLimits(thread_ttl=86400, max_threads=500))
+        agent = create_agent(..., checkpointer=saver)
+        saver.evict()  # 手动触发淘汰（put 时也会按 EVICTION_INTERVAL 自动触发）
+    """
+
+    def __init__(self, db_path: Optional[Path] = None, limits: Optional[CheckpointLimits] = None, *, serde=None):
+        super().__init__(serde=serde)
+        self.db_path = Path(db_path) if db_path is not None else default_checkpoint_db()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.limits = limits or CheckpointLimits()
+
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+        self._conn = sqlite3.connect(os.fspath(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            self._init_schema()
+        except BaseException:
+            self._conn.close()
+            raise
+
+    def _init_schema(self) -> None:
+        """
+        创建表结构；本存储旧版本的表结构直接重建
+
+        user_version 为 0 但已有同名表的数据库不是本存储创建的（如其他 checkpointer 的文件），
+        更新版本创建的数据库也无法识别，两种情况都抛出 ValueError，不删除任何数据。
+        """
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > SCHEMA_VERSION:
+                raise ValueError(
+                    f"Checkpoint database {self.db_path} uses schema version {version}, "
+                    f"newer than the supported version {SCHEMA_VERSION}"
+                )
+            if version == 0:
+                existing = self._conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    f" AND name IN ({', '.join('?' * len(_TABLES))})",
+                    _TABLES,
+                ).fetchall()
+                if existing:
+                    names = ", ".join(sorted(row[0] for row in existing))
+                    raise ValueError(
+                        f"Checkpoint database {self.db_path} was not created by this saver "
+                        f"(found tables: {names}); point SKILLS_CHECKPOINT_DB at a new file"
+                    )
+            elif version < SCHEMA_VERSION:
+                for table in _TABLES:
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                " thread_id TEXT PRIMARY KEY,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS threads_access ON threads (last_access)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_checkpoint_id TEXT,"
+                " type TEXT NOT NULL,"
+                " checkpoint BLOB NOT NULL,"
+                " metadata_type TEXT NOT NULL,"
+                " metadata BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " type TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " task_path TEXT NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)) WITHOUT ROWID"
+            )
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> SqliteCheckpointSaver:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # 读取
+
+    def _touch(self, thread_id: str, now: Optional[float] = None) -> None:
+        """更新会话的最近访问时间，调用方需持有锁并处于事务中"""
+        self._conn.execute(
+            "INSERT INTO threads (thread_id, last_access) VALUES (?, ?)"
+            " ON CONFLICT(thread_id) DO UPDATE SET last_access = excluded.last_access",
+            (thread_id, time.time() if now is None else now),
+        )
+
+    def _load_tuple(self, row: tuple) -> CheckpointTuple:
+        """将 checkpoints 表的一行转换为 CheckpointTuple，调用方需持有锁"""
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    _SELECT = (
+        "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+        " type, checkpoint, metadata_type, metadata FROM checkpoints"
+    )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """读取指定检查点（未指定 checkpoint_id 时读取最新的）"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    self._SELECT + " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    self._SELECT + " WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._touch(thread_id)
+            return self._load_tuple(row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """按时间倒序列出检查点"""
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = self._SELECT
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        # 先取出全部结果再逐个产出，避免调用方在迭代期间长时间持有锁
+        with self._lock:
+            tuples = []
+            for row in self._conn.execute(query, params).fetchall():
+                item = self._load_tuple(row)
+                if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(item)
+                if limit is not None and len(tuples) >= limit:
+                    break
+        yield from tuples
+
+    # 写入
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """保存检查点，并按上限裁剪该会话的旧检查点"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id,"
+                " parent_checkpoint_id, type, checkpoint, metadata_type, metadata, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    metadata_type,
+                    metadata_data,
+                    len(data) + len(metadata_data),
+                ),
+            )
+            self._touch(thread_id)
+            self._trim_thread(thread_id, checkpoint_ns)
+
+        self._maybe_evict(keep=thread_id)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """保存某个检查点上的待应用写入"""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 特殊通道（错误 / 中断等）使用固定的负数 idx，重复写入时覆盖；普通写入已存在时保留
+        replace_rows, insert_rows = [], []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, value_data = self.serde.dumps_typed(value)
+            row_idx = WRITES_IDX_MAP.get(channel, idx)
+            (replace_rows if row_idx < 0 else insert_rows).append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                row_idx,
+                channel,
+                value_type,
+                value_data,
+                task_path,
+            ))
+        columns = (
+            " INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx,"
+            " channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        )
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE" + columns, replace_rows)
+            self._conn.executemany("INSERT OR IGNORE" + columns, insert_rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """删除会话的全部检查点和写入"""
+        with self._lock, self._conn:
+            self._delete_threads([thread_id])
+
+    # 裁剪与淘汰
+
+    def _delete_threads(self, thread_ids: Sequence[str]) -> None:
+        """删除会话，调用方需持有锁并处于事务中"""
+        for table in ("writes", "checkpoints", "threads"):
+            self._conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(t,) for t in thread_ids])
+
+    def _trim_thread(self, thread_id: str, checkpoint_ns: str) -> None:
+        """按检查点数 / 字节数上限删除最旧的检查点（至少保留最新一个），调用方需持有锁并处于事务中"""
+        max_count = self.limits.max_checkpoints_per_thread
+        max_bytes = self.limits.max_thread_bytes
+        if not max_count and not max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT checkpoint_id, size FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        ).fetchall()
+        keep = 0
+        total = 0
+        for checkpoint_id, size in rows:
+            if keep >= 1 and (
+                (max_count and keep >= max_count) or (max_bytes and total + size > max_bytes)
+            ):
+                break
+            keep += 1
+            total += size
+
+        stale = [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id, _ in rows[keep:]]
+        if stale:
+            for table in ("writes", "checkpoints"):
+                self._conn.executemany(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    stale,
+                )
+
+    def _maybe_evict(self, keep: Optional[str] = None) -> None:
+        """距离上次淘汰超过 EVICTION_INTERVAL 时自动淘汰"""
+        if not self.limits.thread_ttl and not self.limits.max_threads:
+            return
+        now = time.monotonic()
+        if now - self._last_eviction < EVICTION_INTERVAL:
+            return
+        self._last_eviction = now
+        self.evict(keep=keep)
+
+    def evict(self, now: Optional[float] = None, keep: Optional[str] = None) -> list[str]:
+        """
+        淘汰闲置超过 TTL 的会话，以及超出会话数上限时最久未访问的会话
+
+        Args:
+            now: 当前时间戳（默认 time.time()，便于测试）
+            keep: 不淘汰的会话（通常是正在写入的会话）
+
+        Returns:
+            被删除的会话 ID
+        """
+        now = time.time() if now is None else now
+        evicted: list[str] = []
+        with self._lock, self._conn:
+            if self.limits.thread_ttl:
+                rows = self._conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_access < ?",
+                    (now - self.limits.thread_ttl,),
+                ).fetchall()
+                evicted.extend(t for (t,) in rows if t != keep)
+
+            if self.limits.max_threads:
+                remaining = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0] - len(evicted)
+                excess = remaining - self.limits.max_threads
+                if excess > 0:
+                    skip = set(evicted)
+                    for (thread_id,) in self._conn.execute(
+                        "SELECT thread_id FROM threads ORDER BY last_access"
+                    ).fetchall():
+                        if excess <= 0:
+                            break
+                        if thread_id in skip or thread_id == keep:
+                            continue
+                        evicted.append(thread_id)
+                        excess -= 1
+
+            if evicted:
+                self._delete_threads(evicted)
+        return evicted
+
+    def thread_ids(self) -> list[str]:
+        """全部会话 ID（最近访问的在前）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT thread_id FROM threads ORDER BY last_access DESC").fetchall()
+        return [t for (t,) in rows]
+
+    # 异步接口：在线程中执行同步实现，不阻塞事件循环
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        """与 InMemorySaver 相同的版本格式（递增整数 + 随机后缀）"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def create_checkpointer(kind: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    按配置创建检查点存储
+
+    Args:
+        kind: "memory" / "sqlite"，默认读取 SKILLS_CHECKPOINTER（未设置时为 memory）
+
+    Raises:
+        ValueError: 不支持的类型
+    """
+    kind = (kind or os.getenv("SKILLS_CHECKPOINTER") or "memory").strip().lower()
+    if kind == "memory":
+        return InMemorySaver()
+    if kind == "sqlite":
+        return SqliteCheckpointSaver(default_checkpoint_db(), CheckpointLimits.from_env())
+    raise ValueError(f"Unsupported checkpointer '{kind}'. Use 'memory' or 'sqlite'.")
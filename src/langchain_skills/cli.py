@@ -21,13 +21,10 @@ import argparse
 import json
 import os
 import sys
+import threading
 from pathlib import Path
 
 from dotenv import load_dotenv
-from prompt_toolkit import PromptSession
-from prompt_toolkit.history import FileHistory
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.formatted_text import HTML
 from rich.console import Console, Group
 from rich.panel import Panel
 from rich.markdown import Markdown
@@ -37,9 +34,9 @@ from rich.text import Text
 from rich.spinner import Spinner
 from rich.layout import Layout
 from rich.syntax import Syntax
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 from .agent import LangChainSkillsAgent, check_api_credentials
+from .model_registry import close_model_registry
 from .skill_loader import SkillLoader
 from .stream import (
     ToolResultFormatter,
@@ -534,13 +531,14 @@ def cmd_show_prompt():
     console.print(f"[dim]Estimated tokens: ~{token_estimate}[/dim]")
 
 
-def cmd_run(prompt: str, enable_thinking: bool = True):
+def cmd_run(prompt: str, enable_thinking: bool = True, record: str | None = None):
     """
     执行单次请求，支持流式输出和 thinking 显示
 
     Args:
         prompt: 用户请求
         enable_thinking: 是否启用 thinking 显示
+        record: 录制文件路径，指定时把原始模型流写入 JSONL（可用 --replay 回放）
     """
     console.print(Panel(f"[bold cyan]User Request:[/bold cyan]\n{prompt}"))
     console.print()
@@ -558,24 +556,61 @@ def cmd_run(prompt: str, enable_thinking: bool = True):
 
     console.print("[dim]Running agent with streaming output...[/dim]\n")
 
+    _render_event_stream(agent.stream_events(prompt, record=record))
+    if record:
+        console.print(f"[dim]Recorded model stream to {record}[/dim]")
+
+
+def cmd_replay(path: str, speed: float = 1.0):
+    """
+    回放录制的模型流（不调用模型和工具，不需要 API Key）
+
+    Args:
+        path: 录制文件路径（cmd_run --record 生成）
+        speed: 回放倍速（1.0 为原速，0 表示不等待）
+    """
+    from .recording import load_recording
+
+    recording = load_recording(path)
+    header = recording.header
+    console.print(Panel(
+        f"[bold cyan]Replay:[/bold cyan] {path}\n"
+        f"[dim]{header.get('provider', '?')} / {header.get('model', '?')} · "
+        f"{len(recording.messages)} messages · {recording.duration:.1f}s · speed {speed:g}x[/dim]\n"
+        f"{header.get('message', '')}"
+    ))
+    console.print()
+
+    agent = LangChainSkillsAgent()
+    _render_event_stream(agent.replay_events(recording, speed=speed))
+
+
+def _render_event_stream(events):
+    """实时显示事件流，结束后显示最终结果（Ctrl+C 取消本轮）"""
     try:
         state = StreamState()
 
-        with Live(console=console, refresh_per_second=10, transient=True) as live:
-            # 立即显示等待状态
-            live.update(create_streaming_display(is_waiting=True))
+        try:
+            with Live(console=console, refresh_per_second=10, transient=True) as live:
+                # 立即显示等待状态
+                live.update(create_streaming_display(is_waiting=True))
 
-            for event in agent.stream_events(prompt):
-                event_type = state.handle_event(event)
+                for event in events:
+                    event_type = state.handle_event(event)
 
-                # 更新 Live 显示
-                live.update(create_streaming_display(**state.get_display_args()))
+                    # 更新 Live 显示
+                    live.update(create_streaming_display(**state.get_display_args()))
 
-                # tool_call 和 tool_result 时强制刷新
-                # tool_call: 确保"正在执行"状态立即可见
-                # tool_result: 确保"正在分析结果"状态立即可见
-                if event_type in ("tool_call", "tool_result"):
-                    live.refresh()
+                    # tool_call 和 tool_result 时强制刷新
+                    # tool_call: 确保"正在执行"状态立即可见
+                    # tool_result: 确保"正在分析结果"状态立即可见
+                    if event_type in ("tool_call", "tool_result"):
+                        live.refresh()
+        except KeyboardInterrupt:
+            # 关闭事件流即取消本轮：终止正在执行的命令并补全对话状态
+            events.close()
+            console.print("\n[yellow]Cancelled[/yellow]")
+            sys.exit(130)
 
         # 显示最终结果
         console.print()
@@ -591,6 +626,31 @@ def cmd_run(prompt: str, enable_thinking: bool = True):
         raise
 
 
+class _AgentWarmup:
+    """
+    在后台初始化模型并编译 Agent
+
+    后台线程中的异常不直接打印（会打乱输入提示），保存下来由主线程在第一轮对话前显示一次。
+    """
+
+    def __init__(self, agent: LangChainSkillsAgent):
+        self.error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, args=(agent,), daemon=True)
+        self._thread.start()
+
+    def _run(self, agent: LangChainSkillsAgent) -> None:
+        try:
+            agent.build_agent()
+        except Exception as e:
+            self.error = e
+
+    def wait(self) -> Exception | None:
+        """等待初始化结束，返回初始化错误（只返回一次）"""
+        self._thread.join()
+        error, self.error = self.error, None
+        return error
+
+
 def cmd_interactive(enable_thinking: bool = True):
     """
     交互式对话模式，支持流式输出和 thinking 显示
@@ -625,7 +685,15 @@ def cmd_interactive(enable_thinking: bool = True):
 
     thread_id = "interactive"
 
-    # 初始化 prompt_toolkit session（跨平台兼容路径）
+    # 用户输入第一条消息时在后台初始化模型并编译 Agent
+    warmup: _AgentWarmup | None = _AgentWarmup(agent)
+
+    # 初始化 prompt_toolkit session（跨平台兼容路径，仅交互模式需要，延迟导入）
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from prompt_toolkit.formatted_text import HTML
+    from prompt_toolkit.history import FileHistory
+
     history_file = str(Path.home() / ".langchain_skills_history")
     session = PromptSession(
         history=FileHistory(history_file),
@@ -656,26 +724,40 @@ def cmd_interactive(enable_thinking: bool = True):
                 cmd_show_prompt()
                 continue
 
+            # 第一轮对话前等待后台初始化，初始化失败时在这里显示一次
+            if warmup is not None:
+                error, warmup = warmup.wait(), None
+                if error is not None:
+                    console.print(f"[red]Error: Failed to initialize agent: {error}[/red]")
+                    continue
+
             # 运行 agent（流式输出）
             console.print()
 
             state = StreamState()
-
-            with Live(console=console, refresh_per_second=10, transient=True) as live:
-                # 立即显示等待状态
-                live.update(create_streaming_display(is_waiting=True))
-
-                for event in agent.stream_events(user_input, thread_id=thread_id):
-                    event_type = state.handle_event(event)
-
-                    # 更新 Live 显示
-                    live.update(create_streaming_display(**state.get_display_args()))
-
-                    # tool_call 和 tool_result 时强制刷新
-                    # tool_call: 确保"正在执行"状态立即可见
-                    # tool_result: 确保"正在分析结果"状态立即可见
-                    if event_type in ("tool_call", "tool_result"):
-                        live.refresh()
+            events = agent.stream_events(user_input, thread_id=thread_id)
+
+            try:
+                with Live(console=console, refresh_per_second=10, transient=True) as live:
+                    # 立即显示等待状态
+                    live.update(create_streaming_display(is_waiting=True))
+
+                    for event in events:
+                        event_type = state.handle_event(event)
+
+                        # 更新 Live 显示
+                        live.update(create_streaming_display(**state.get_display_args()))
+
+                        # tool_call 和 tool_result 时强制刷新
+                        # tool_call: 确保"正在执行"状态立即可见
+                        # tool_result: 确保"正在分析结果"状态立即可见
+                        if event_type in ("tool_call", "tool_result"):
+                            live.refresh()
+            except KeyboardInterrupt:
+                # 运行中按 Ctrl+C 只取消当前这一轮（终止正在执行的命令），回到输入提示
+                events.close()
+                console.print("\n[yellow]Cancelled[/yellow]\n")
+                continue
 
             # 显示最终结果（交互模式：简化显示，不用 Panel 包裹响应）
             display_final_results(
@@ -717,6 +799,10 @@ Examples:
   # 交互式模式
   %(prog)s --interactive
 
+  # 录制模型流，之后离线回放（0 表示不等待）
+  %(prog)s --record run.jsonl "列出当前目录的文件"
+  %(prog)s --replay run.jsonl --replay-speed 0
+
 Features:
   - 🧠 Extended Thinking: 显示模型的思考过程（蓝色面板）
   - 🔧 Tool Calls: 显示工具调用（黄色）
@@ -749,6 +835,22 @@ Features:
         action="store_true",
         help="禁用 Extended Thinking（可降低延迟和成本）",
     )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="把原始模型流（含时间）录制到 JSONL 文件",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="回放录制的模型流（不调用模型）",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="回放倍速（默认 1.0 原速，0 表示不等待）",
+    )
     parser.add_argument(
         "--cwd",
         type=str,
@@ -765,17 +867,23 @@ Features:
     enable_thinking = not args.no_thinking
 
     # 执行命令
-    if args.list_skills:
-        cmd_list_skills()
-    elif args.show_prompt:
-        cmd_show_prompt()
-    elif args.interactive:
-        cmd_interactive(enable_thinking=enable_thinking)
-    elif args.prompt:
-        cmd_run(args.prompt, enable_thinking=enable_thinking)
-    else:
-        # 默认进入交互模式
-        cmd_interactive(enable_thinking=enable_thinking)
+    try:
+        if args.list_skills:
+            cmd_list_skills()
+        elif args.show_prompt:
+            cmd_show_prompt()
+        elif args.replay:
+            cmd_replay(args.replay, speed=args.replay_speed)
+        elif args.interactive:
+            cmd_interactive(enable_thinking=enable_thinking)
+        elif args.prompt:
+            cmd_run(args.prompt, enable_thinking=enable_thinking, record=args.record)
+        else:
+            # 默认进入交互模式
+            cmd_interactive(enable_thinking=enable_thinking)
+    finally:
+        # 释放共享的模型连接池
+        close_model_registry()
 
 
 if __name__ == "__main__":
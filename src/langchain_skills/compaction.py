@@ -0,0 +1,261 @@
+"""
+对话压缩
+
+交互模式下所有轮次共用一个 thread_id，每次调用模型都会重发完整历史（包括每个大工具结果），
+延迟和费用逐轮上升，最终超过上下文上限。这里在模型调用前压缩发送给模型的消息：
+
+1. 估算的 token 数超过阈值时，把较早轮次的工具结果替换为简短占位
+2. 仍然超过阈值时，把较早轮次整体替换为一条摘要（用户请求 / 工具调用 / 回答开头）
+
+只修改本次发给模型的请求，不修改对话状态：完整历史仍保存在 checkpointer 中，
+可以通过 agent.get_state(config) 取回。最近 keep_turns 轮始终原样发送。
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+
+from .env import env_number
+from .stream import estimate_tokens, truncate_to_budget
+
+
+# 默认压缩阈值（估算 token 数，<= 0 表示不压缩）
+DEFAULT_THRESHOLD_TOKENS = 60_000
+
+# 默认原样保留的最近轮数（一轮从一条用户消息开始）
+DEFAULT_KEEP_TURNS = 2
+
+# 小于该 token 数的工具结果不替换（占位本身也有开销）
+DEFAULT_STUB_MIN_TOKENS = 200
+
+# 摘要的 token 上限
+DEFAULT_SUMMARY_MAX_TOKENS = 2_000
+
+# 摘要中每条用户请求 / 回答保留的 token 数
+_SUMMARY_ITEM_TOKENS = 80
+
+COMPACTED_PREFIX = "[compacted]"
+
+# last_stats 最多保留多少个会话（淘汰最久未压缩的会话）
+MAX_STATS_THREADS = 1024
+
+
+@dataclass
+class CompactionPolicy:
+    """
+    对话压缩策略
+
+    Attributes:
+        threshold_tokens: 发给模型的消息估算 token 数超过该值时开始压缩，<= 0 不压缩
+        keep_turns: 原样保留的最近轮数
+        stub_min_tokens: 小于该值的工具结果不替换
+        summary_max_tokens: 较早轮次摘要的 token 上限
+    """
+    threshold_tokens: int = DEFAULT_THRESHOLD_TOKENS
+    keep_turns: int = DEFAULT_KEEP_TURNS
+    stub_min_tokens: int = DEFAULT_STUB_MIN_TOKENS
+    summary_max_tokens: int = DEFAULT_SUMMARY_MAX_TOKENS
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_tokens > 0
+
+    @classmethod
+    def from_env(cls) -> "CompactionPolicy":
+        """
+        从环境变量读取策略
+
+        - SKILLS_COMPACT_THRESHOLD_TOKENS: 压缩阈值（0 表示不压缩）
+        - SKILLS_COMPACT_KEEP_TURNS: 原样保留的最近轮数
+        """
+        return cls(
+            threshold_tokens=env_number("SKILLS_COMPACT_THRESHOLD_TOKENS", DEFAULT_THRESHOLD_TOKENS),
+            keep_turns=max(1, env_number("SKILLS_COMPACT_KEEP_TURNS", DEFAULT_KEEP_TURNS)),
+        )
+
+
+@dataclass
+class CompactionStats:
+    """一次压缩的结果"""
+    tokens_before: int
+    tokens_after: int
+    stubbed_results: int = 0
+    summarized_turns: int = 0
+
+    @property
+    def compacted(self) -> bool:
+        return self.stubbed_results > 0 or self.summarized_turns > 0
+
+
+def _content_text(content: Any) -> str:
+    """消息 content（字符串或内容块列表）中的文本"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for block in content:
+            if isinstance(block, str):
+                parts.append(block)
+            elif isinstance(block, dict):
+                parts.append(str(block.get("text") or block.get("thinking") or ""))
+        return "\n".join(parts)
+    return str(content or "")
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """估算单条消息的 token 数（含工具调用参数）"""
+    tokens = estimate_tokens(_content_text(message.content)) + 4
+    for call in getattr(message, "tool_calls", None) or []:
+        tokens += estimate_tokens(call.get("name", "")) + estimate_tokens(_compact_args(call.get("args")))
+    return tokens
+
+
+def messages_tokens(messages: list[AnyMessage]) -> int:
+    """估算一组消息的 token 数"""
+    return sum(message_tokens(m) for m in messages)
+
+
+def _compact_args(args: Any) -> str:
+    try:
+        return json.dumps(args or {}, ensure_ascii=False, separators=(",", ":"), default=str)
+    except (TypeError, ValueError):
+        return str(args)
+
+
+def _recent_start(messages: list[AnyMessage], keep_turns: int) -> int:
+    """最近 keep_turns 轮的起始下标（轮次以用户消息分隔；不足时返回 0）"""
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if len(starts) <= keep_turns:
+        return 0
+    return starts[-keep_turns]
+
+
+def _stub_tool_result(message: ToolMessage, tokens: int) -> ToolMessage:
+    """工具结果占位（保留 tool_call_id，工具调用与结果仍然配对）"""
+    name = message.name or "tool"
+    size_kb = len(_content_text(message.content).encode("utf-8", errors="replace")) / 1024
+    stub = (
+        f"{COMPACTED_PREFIX} {name} result omitted (~{tokens} tokens, {size_kb:.1f} KB). "
+        "It is kept in the session history; call the tool again if you need the details."
+    )
+    return message.model_copy(update={"content": stub})
+
+
+def _summarize(messages: list[AnyMessage], max_tokens: int) -> str:
+    """较早轮次的摘要（抽取式，不额外调用模型）"""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            text = _content_text(message.content).strip()
+            if text.startswith(COMPACTED_PREFIX):
+                # 之前压缩生成的摘要：沿用其内容
+                lines.extend(text.splitlines()[1:])
+                continue
+            lines.append(f"- User: {truncate_to_budget(text, _SUMMARY_ITEM_TOKENS)}")
+        elif isinstance(message, AIMessage):
+            for call in message.tool_calls or []:
+                args = truncate_to_budget(_compact_args(call.get("args")), _SUMMARY_ITEM_TOKENS)
+                lines.append(f"  - called {call.get('name', 'tool')}({args})")
+            text = _content_text(message.content).strip()
+            if text:
+                lines.append(f"  - Assistant: {truncate_to_budget(text, _SUMMARY_ITEM_TOKENS)}")
+    body = truncate_to_budget("\n".join(lines), max_tokens)
+    return (
+        f"{COMPACTED_PREFIX} Summary of earlier conversation turns "
+        "(full details are kept in the session history):\n" + body
+    )
+
+
+def compact_messages(
+    messages: list[AnyMessage],
+    policy: CompactionPolicy,
+) -> tuple[list[AnyMessage], CompactionStats]:
+    """
+    压缩发给模型的消息（不修改传入的列表）
+
+    Returns:
+        (压缩后的消息, 压缩结果)
+    """
+    tokens = [message_tokens(m) for m in messages]
+    total = sum(tokens)
+    stats = CompactionStats(tokens_before=total, tokens_after=total)
+    if not policy.enabled or total <= policy.threshold_tokens:
+        return messages, stats
+
+    recent = _recent_start(messages, policy.keep_turns)
+    if recent == 0:
+        return messages, stats
+
+    # 1. 替换较早轮次中的大工具结果（从最早的开始）
+    compacted = list(messages)
+    for i in range(recent):
+        message = compacted[i]
+        if not isinstance(message, ToolMessage) or tokens[i] < policy.stub_min_tokens:
+            continue
+        compacted[i] = _stub_tool_result(message, tokens[i])
+        total += message_tokens(compacted[i]) - tokens[i]
+        stats.stubbed_results += 1
+        if total <= policy.threshold_tokens:
+            break
+
+    # 2. 仍然超过阈值：较早轮次整体替换为一条摘要
+    if total > policy.threshold_tokens:
+        old = compacted[:recent]
+        stats.summarized_turns = sum(
+            1 for m in old
+            if isinstance(m, HumanMessage) and not _content_text(m.content).startswith(COMPACTED_PREFIX)
+        )
+        summary = HumanMessage(content=_summarize(old, policy.summary_max_tokens))
+        compacted = [summary] + compacted[recent:]
+        total = messages_tokens(compacted)
+
+    stats.tokens_after = total
+    return compacted, stats
+
+
+class ConversationCompactionMiddleware(AgentMiddleware):
+    """
+    模型调用前压缩对话历史
+
+    只替换 request.messages，对话状态（checkpointer 中的完整历史）不变。
+    last_stats 记录最近压缩过的 MAX_STATS_THREADS 个会话各自最近一次压缩的结果，便于调试。
+    """
+
+    def __init__(self, policy: Optional[CompactionPolicy] = None):
+        super().__init__()
+        self.policy = policy or CompactionPolicy.from_env()
+        self.last_stats: "OrderedDict[str, CompactionStats]" = OrderedDict()
+        # 并行运行的不同会话会同时更新 last_stats
+        self._stats_lock = threading.Lock()
+
+    def _compact(self, request: ModelRequest) -> ModelRequest:
+        messages, stats = compact_messages(request.messages, self.policy)
+        if not stats.compacted:
+            return request
+        execution_info = getattr(request.runtime, "execution_info", None)
+        thread_id = getattr(execution_info, "thread_id", None) or ""
+        with self._stats_lock:
+            self.last_stats[thread_id] = stats
+            self.last_stats.move_to_end(thread_id)
+            while len(self.last_stats) > MAX_STATS_THREADS:
+                self.last_stats.popitem(last=False)
+        return request.override(messages=messages)
+
+    def wrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], ModelResponse],
+    ) -> ModelResponse:
+        return handler(self._compact(request))
+
+    async def awrap_model_call(
+        self,
+        request: ModelRequest,
+        handler: Callable[[ModelRequest], Awaitable[ModelResponse]],
+    ) -> ModelResponse:
+        return await handler(self._compact(request))
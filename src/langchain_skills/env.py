@@ -0,0 +1,38 @@
+"""
+环境变量解析
+
+配置项大多来自环境变量（.env），拼写错误的数值不应让 Agent 构造或服务启动直接崩溃：
+无法解析时给出警告并使用默认值。
+"""
+
+import os
+import warnings
+from typing import Callable, TypeVar
+
+T = TypeVar("T", int, float)
+
+
+def env_number(name: str, default: T, cast: Callable[[str], T] = int) -> T:
+    """
+    读取数值环境变量
+
+    Args:
+        name: 环境变量名
+        default: 未设置、为空或无法解析时的默认值
+        cast: 解析函数（int / float）
+
+    Returns:
+        解析后的值；无法解析时发出 RuntimeWarning 并返回默认值
+    """
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return cast(raw.strip())
+    except ValueError:
+        warnings.warn(
+            f"Invalid value for {name}: {raw!r}, using default {default!r}",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return default
@@ -0,0 +1,298 @@
+"""
+工具执行策略
+
+模型在一条消息中发出多个工具调用时（例如三个 read_file 加一个 grep），
+create_agent 会把每个调用作为独立任务（Send）放进同一步并发执行。这里提供：
+- max_concurrency: 同时执行的工具调用上限
+- tool_limits: 单个工具的并发上限，例如同一工作目录下同时只跑一个 bash
+- ordered_results: tool_result 事件按调用顺序发出（而不是按完成顺序）
+
+工具结果写回对话状态时始终按调用顺序排列，ordered_results 只影响流式事件。
+
+并发上限通过包装工具的信号量实现，而不是 RunnableConfig 的 max_concurrency：
+LangGraph 同步执行时，同一个线程池还承载它自己的后台任务，上限较小时会死锁。
+"""
+
+import asyncio
+import collections
+import functools
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+from .env import env_number
+
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
+
+
+# 默认的单工具并发上限：bash 可能修改工作目录中的文件，同一目录下串行执行
+DEFAULT_TOOL_LIMITS = {"bash": 1}
+
+
+def _parse_tool_limits(value: str) -> dict[str, int]:
+    """解析 "bash=1,grep=4" 形式的单工具并发上限"""
+    limits = {}
+    for item in value.split(","):
+        name, sep, limit = item.partition("=")
+        name = name.strip()
+        if not name or not sep:
+            continue
+        try:
+            limits[name] = int(limit)
+        except ValueError:
+            continue
+    return limits
+
+
+@dataclass
+class ToolExecutionPolicy:
+    """
+    并行工具调用的执行策略
+
+    Attributes:
+        max_concurrency: 同时执行的工具调用上限（同一 Agent 内所有工具共享），None 不限制
+        tool_limits: 单个工具的并发上限（<= 0 表示不限制）
+        per_working_directory: tool_limits 是否按工作目录分别计数
+        ordered_results: tool_result 事件是否按调用顺序发出
+    """
+    max_concurrency: Optional[int] = None
+    tool_limits: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_TOOL_LIMITS))
+    per_working_directory: bool = True
+    ordered_results: bool = True
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutionPolicy":
+        """
+        从环境变量读取策略
+
+        - SKILLS_TOOL_CONCURRENCY: 并发上限（未设置或 <= 0 表示不限制）
+        - SKILLS_TOOL_LIMITS: 单工具上限，如 "bash=1,grep=4"，覆盖默认值
+        - SKILLS_ORDERED_TOOL_RESULTS: 是否按调用顺序发出 tool_result（默认 true）
+        """
+        max_concurrency = env_number("SKILLS_TOOL_CONCURRENCY", 0)
+        tool_limits = dict(DEFAULT_TOOL_LIMITS)
+        tool_limits.update(_parse_tool_limits(os.getenv("SKILLS_TOOL_LIMITS", "")))
+        ordered = os.getenv("SKILLS_ORDERED_TOOL_RESULTS", "true").lower() in ("1", "true", "yes", "on")
+        return cls(
+            max_concurrency=max_concurrency if max_concurrency > 0 else None,
+            tool_limits=tool_limits,
+            ordered_results=ordered,
+        )
+
+
+class SharedSemaphore:
+    """
+    线程和事件循环共用的信号量（按等待顺序分配名额）
+
+    同一个工具可能同时被同步调用（LangGraph 线程池）和异步调用（一个或多个事件循环）执行，
+    名额必须在它们之间共享。release 时名额直接交给最早的等待者：线程通过 threading.Event
+    唤醒，协程通过所属事件循环的 Future 唤醒，等待期间不占用线程也不轮询。
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._waiters: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(future)
+                    granted = False
+                except ValueError:
+                    # 取消前名额已经交给了本协程
+                    granted = True
+            if granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                try:
+                    waiter.get_loop().call_soon_threadsafe(_grant, waiter)
+                    return
+                except RuntimeError:
+                    # 等待者所属的事件循环已关闭，交给下一个等待者
+                    continue
+            self._value += 1
+
+
+def _grant(future: asyncio.Future) -> None:
+    """在等待者的事件循环中交付名额（等待者已被取消时由它自己归还）"""
+    if not future.done():
+        future.set_result(None)
+
+
+class ToolConcurrencyLimiter:
+    """
+    工具并发上限（同步 / 异步调用共用）
+
+    先获取单工具信号量（按 (工具名, 工作目录) 计数），再获取全局信号量，
+    排队等待 bash 的调用不会占用全局名额。
+    """
+
+    def __init__(self, policy: ToolExecutionPolicy):
+        self.policy = policy
+        self._global = (
+            SharedSemaphore(policy.max_concurrency) if policy.max_concurrency else None
+        )
+        self._semaphores: dict[tuple[str, str], SharedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _tool_semaphore(self, tool_name: str, kwargs: dict) -> Optional[SharedSemaphore]:
+        limit = self.policy.tool_limits.get(tool_name, 0)
+        if limit <= 0:
+            return None
+        scope = ""
+        if self.policy.per_working_directory:
+            context = getattr(kwargs.get("runtime"), "context", None)
+            scope = os.fspath(getattr(context, "working_directory", "") or "")
+        key = (tool_name, scope)
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = self._semaphores[key] = SharedSemaphore(limit)
+            return semaphore
+
+    def _semaphores_for(self, tool_name: str, kwargs: dict) -> list[SharedSemaphore]:
+        """本次调用需要依次获取的信号量"""
+        semaphores = []
+        tool_semaphore = self._tool_semaphore(tool_name, kwargs)
+        if tool_semaphore is not None:
+            semaphores.append(tool_semaphore)
+        if self._global is not None:
+            semaphores.append(self._global)
+        return semaphores
+
+    def wrap(self, tool: "BaseTool") -> "BaseTool":
+        """返回受并发上限约束的工具副本（不受限的工具原样返回）"""
+        if self._global is None and self.policy.tool_limits.get(tool.name, 0) <= 0:
+            return tool
+
+        name = tool.name
+        update = {}
+
+        if getattr(tool, "func", None) is not None:
+            func = tool.func
+
+            @functools.wraps(func)
+            def limited_func(*args, **kwargs):
+                acquired = []
+                try:
+                    for semaphore in self._semaphores_for(name, kwargs):
+                        semaphore.acquire()
+                        acquired.append(semaphore)
+                    return func(*args, **kwargs)
+                finally:
+                    for semaphore in reversed(acquired):
+                        semaphore.release()
+
+            update["func"] = limited_func
+
+        if getattr(tool, "coroutine", None) is not None:
+            coroutine = tool.coroutine
+
+            @functools.wraps(coroutine)
+            async def limited_coroutine(*args, **kwargs):
+                acquired = []
+                try:
+                    for semaphore in self._semaphores_for(name, kwargs):
+                        # 在事件循环中等待，不阻塞线程；取消时不会遗留已获取的名额
+                        await semaphore.acquire_async()
+                        acquired.append(semaphore)
+                    return await coroutine(*args, **kwargs)
+                finally:
+                    for semaphore in reversed(acquired):
+                        semaphore.release()
+
+            update["coroutine"] = limited_coroutine
+
+        return tool.model_copy(update=update) if update else tool
+
+
+def apply_execution_policy(tools: list["BaseTool"], policy: ToolExecutionPolicy) -> list["BaseTool"]:
+    """为一组工具加上并发上限（同一组工具共享全局上限）"""
+    limiter = ToolConcurrencyLimiter(policy)
+    return [limiter.wrap(tool) for tool in tools]
+
+
+class OrderedResultBuffer:
+    """
+    按工具调用顺序释放结果
+
+    并发执行的工具按完成顺序返回；push 时如果前面还有未返回的调用，先暂存，
+    等前面的结果都到齐后再一起释放。
+
+    用法:
+        buffer = OrderedResultBuffer()
+        for item in buffer.push(tool_call_id, item, call_order):
+            yield item
+        for item in buffer.flush():  # 结束时释放剩余结果
+            yield item
+    """
+
+    def __init__(self):
+        self._held: dict[str, Any] = {}
+        self._released: set[str] = set()
+
+    def push(self, tool_call_id: str, item: Any, call_order: Iterable[str]) -> list[Any]:
+        """
+        加入一个结果，返回现在可以释放的结果（按调用顺序）
+
+        Args:
+            tool_call_id: 结果对应的调用 ID
+            item: 结果
+            call_order: 目前已知的全部调用 ID（按发出顺序）
+        """
+        if not tool_call_id:
+            return [item]
+        call_order = list(call_order)
+        self._held[tool_call_id] = item
+
+        ready = []
+        for call_id in call_order:
+            if call_id in self._released:
+                continue
+            if call_id not in self._held:
+                break
+            ready.append(self._held.pop(call_id))
+            self._released.add(call_id)
+
+        # 调用 ID 不在已知顺序中（无法排序），直接释放
+        if tool_call_id in self._held and tool_call_id not in call_order:
+            ready.append(self._held.pop(tool_call_id))
+            self._released.add(tool_call_id)
+        return ready
+
+    def flush(self) -> list[Any]:
+        """释放剩余的全部结果"""
+        ready = list(self._held.values())
+        self._released.update(self._held)
+        self._held.clear()
+        return ready
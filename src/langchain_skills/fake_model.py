@@ -0,0 +1,245 @@
+"""
+离线压测用的确定性聊天模型
+
+MODEL_PROVIDER=fake 时使用 FakeStreamingChatModel 代替真实 provider：
+按脚本流式输出 thinking / 文本 / 工具调用，可配置首 token 延迟和每秒 token 数，
+从而在没有 API Key 的情况下压测和剖析真实的 stream_events、工具和 SSE 链路。
+
+脚本是一组步骤，每个步骤对应一次模型调用（一轮对话内按顺序推进，新的用户消息从头开始）：
+
+    [
+      {"thinking": "...", "text": "...", "tool_calls": [{"name": "list_dir", "args": {"path": "."}}]},
+      {"text": "Done: {input}"}
+    ]
+
+文本中的 {input} 替换为最近一条用户消息；步骤用完后重复最后一步。
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import (
+    BaseChatModel,
+    agenerate_from_stream,
+    generate_from_stream,
+)
+from langchain_core.messages import AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from .env import env_number
+from .stream import estimate_tokens
+
+
+DEFAULT_FAKE_MODEL = "fake-model"
+
+# 默认脚本：先查看工作目录，再给出回答
+DEFAULT_SCRIPT = [
+    {
+        "thinking": "The user wants help. I should look at the working directory before answering.",
+        "text": "Let me look at the working directory first.",
+        "tool_calls": [{"name": "list_dir", "args": {"path": "."}}],
+    },
+    {
+        "text": "I checked the working directory. This is a scripted response from the fake model "
+                "for the request: {input}",
+    },
+]
+
+# 按"单词 + 后续空白"切分 token
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def _split_tokens(text: str) -> list[str]:
+    return _TOKEN_PATTERN.findall(text)
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def load_script(path: Optional[str]) -> list[dict]:
+    """读取脚本文件（JSON 步骤列表），未指定时返回默认脚本"""
+    if not path:
+        return [dict(step) for step in DEFAULT_SCRIPT]
+    steps = json.loads(Path(path).expanduser().read_text(encoding="utf-8"))
+    if not isinstance(steps, list) or not steps:
+        raise ValueError(f"Fake model script must be a non-empty JSON list: {path}")
+    return steps
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    按脚本流式输出的确定性聊天模型
+
+    Attributes:
+        script: 步骤列表（见模块文档）
+        tokens_per_second: 输出速度，<= 0 表示不限速
+        latency: 首个 token 前的延迟（秒）
+        emit_thinking: 是否输出脚本中的 thinking
+    """
+    model_name: str = DEFAULT_FAKE_MODEL
+    script: list[dict] = DEFAULT_SCRIPT
+    tokens_per_second: float = 0.0
+    latency: float = 0.0
+    emit_thinking: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        """工具由脚本决定，这里不需要绑定"""
+        return self
+
+    def _select_step(self, messages: list[BaseMessage]) -> tuple[dict, str]:
+        """根据最近一条用户消息之后的模型调用次数选择步骤"""
+        steps_taken = 0
+        user_input = ""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                user_input = _message_text(message)
+                break
+            if message.type == "ai":
+                steps_taken += 1
+        step = self.script[min(steps_taken, len(self.script) - 1)]
+        return step, user_input
+
+    def _plan_chunks(self, messages: list[BaseMessage]) -> Iterator[tuple[AIMessageChunk, bool]]:
+        """
+        生成要输出的 chunk
+
+        Yields:
+            (chunk, 是否计入 token 速率)
+        """
+        step, user_input = self._select_step(messages)
+        run_id = f"fake-{sum(1 for m in messages if m.type == 'ai')}-{len(messages)}"
+        output_tokens = 0
+
+        if self.emit_thinking and step.get("thinking"):
+            for token in _split_tokens(step["thinking"]):
+                output_tokens += 1
+                yield AIMessageChunk(content=[{"type": "reasoning", "reasoning": token, "index": 0}]), True
+
+        text = str(step.get("text", "")).replace("{input}", user_input)
+        for token in _split_tokens(text):
+            output_tokens += 1
+            yield AIMessageChunk(content=token), True
+
+        for index, call in enumerate(step.get("tool_calls") or []):
+            args = json.dumps(call.get("args") or {}, ensure_ascii=False)
+            output_tokens += estimate_tokens(args)
+            yield AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": call["name"],
+                    "args": args,
+                    "id": call.get("id") or f"{run_id}-call-{index}",
+                    "index": index,
+                }],
+            ), True
+
+        input_tokens = sum(estimate_tokens(_message_text(m)) for m in messages)
+        yield AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+            response_metadata={"model_name": self.model_name, "stop_reason": "end_turn"},
+            chunk_position="last",
+        ), False
+
+    def _token_interval(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        interval = self._token_interval()
+        first = True
+        for chunk, paced in self._plan_chunks(messages):
+            if paced and interval and not first:
+                time.sleep(interval)
+            first = False
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and isinstance(chunk.content, str) and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        interval = self._token_interval()
+        first = True
+        for chunk, paced in self._plan_chunks(messages):
+            if paced and interval and not first:
+                await asyncio.sleep(interval)
+            first = False
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and isinstance(chunk.content, str) and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+
+def create_fake_chat_model(model: str, emit_thinking: bool = True, **kwargs: Any) -> FakeStreamingChatModel:
+    """
+    按环境变量创建假模型（与 init_chat_model 调用方式兼容，忽略其余参数）
+
+    - SKILLS_FAKE_SCRIPT: 脚本文件路径（JSON 步骤列表），默认使用内置脚本
+    - SKILLS_FAKE_TPS: 每秒输出 token 数（默认 0，不限速）
+    - SKILLS_FAKE_LATENCY_MS: 首 token 延迟（毫秒，默认 0）
+    """
+    return FakeStreamingChatModel(
+        model_name=model,
+        script=load_script(os.getenv("SKILLS_FAKE_SCRIPT")),
+        tokens_per_second=env_number("SKILLS_FAKE_TPS", 0.0, float),
+        latency=env_number("SKILLS_FAKE_LATENCY_MS", 0.0, float) / 1000,
+        emit_thinking=emit_thinking,
+    )
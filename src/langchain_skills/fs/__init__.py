@@ -0,0 +1,125 @@
+"""
+FS 子模块 - 文件工具的底层实现
+
+提供:
+- read_line_window: 基于 mmap + 行偏移索引的窗口读取
+- classify_file: 二进制嗅探与编码检测
+- search: mmap + 进程池并行的 grep 搜索引擎
+- TrigramIndex: 工作目录的持久化 trigram 索引
+- walk: 遵守 .gitignore 的惰性目录遍历
+- atomic_write_bytes: 临时文件 + fsync + rename 的原子写入
+- FileContentCache: read_file / grep / edit 共享的文件内容缓存
+"""
+
+from .lines import LineWindow, LineIndex, read_line_window, get_line_index, clear_line_index_cache
+from .sniff import (
+    SNIFF_BYTES,
+    FALLBACK_ENCODINGS,
+    FileKind,
+    sniff_bytes,
+    classify_file,
+    clear_sniff_cache,
+)
+from .cache import (
+    DEFAULT_CACHE_BYTES,
+    MAX_CACHED_FILE_BYTES,
+    CachedText,
+    FileContentCache,
+)
+from .search import (
+    SearchMatch,
+    SearchResult,
+    default_workers,
+    iter_search_files,
+    search_file,
+    search_text,
+    search,
+    shutdown_search_pool,
+)
+from .walker import (
+    DEFAULT_IGNORE_FILES,
+    DEFAULT_EXCLUDES,
+    IgnoreRule,
+    IgnoreMatcher,
+    WalkEntry,
+    translate_glob,
+    compile_glob,
+    parse_ignore_lines,
+    walk,
+    split_glob,
+    iter_glob,
+)
+from .atomic import (
+    stage_write,
+    commit_staged,
+    discard_staged,
+    atomic_write_bytes,
+    atomic_write_text,
+    append_bytes,
+    encode_chunks,
+    file_sha256,
+)
+from .trigram import (
+    TrigramIndex,
+    query_trigrams,
+    get_trigram_index,
+    close_trigram_indexes,
+    update_indexed_files,
+)
+
+__all__ = [
+    # Lines
+    "LineWindow",
+    "LineIndex",
+    "read_line_window",
+    "get_line_index",
+    "clear_line_index_cache",
+    # Sniff
+    "SNIFF_BYTES",
+    "FALLBACK_ENCODINGS",
+    "FileKind",
+    "sniff_bytes",
+    "classify_file",
+    "clear_sniff_cache",
+    # Cache
+    "DEFAULT_CACHE_BYTES",
+    "MAX_CACHED_FILE_BYTES",
+    "CachedText",
+    "FileContentCache",
+    # Search
+    "SearchMatch",
+    "SearchResult",
+    "default_workers",
+    "iter_search_files",
+    "search_file",
+    "search_text",
+    "search",
+    "shutdown_search_pool",
+    # Walker
+    "DEFAULT_IGNORE_FILES",
+    "DEFAULT_EXCLUDES",
+    "IgnoreRule",
+    "IgnoreMatcher",
+    "WalkEntry",
+    "translate_glob",
+    "compile_glob",
+    "parse_ignore_lines",
+    "walk",
+    "split_glob",
+    "iter_glob",
+    # Atomic
+    "stage_write",
+    "commit_staged",
+    "discard_staged",
+    "atomic_write_bytes",
+    "atomic_write_text",
+    "append_bytes",
+    "encode_chunks",
+    "file_sha256",
+    # Trigram
+    "TrigramIndex",
+    "query_trigrams",
+    "get_trigram_index",
+    "close_trigram_indexes",
+    "update_indexed_files",
+]
@@ -0,0 +1,146 @@
+"""
+原子写入
+
+直接 write_text 在写入中途崩溃会留下被截断的文件。这里的写入流程：
+- 在目标文件同目录创建临时文件并写入
+- flush + fsync 后再用 os.replace 替换目标文件（同一文件系统内为原子操作）
+- 保留原文件的权限位；新文件按进程 umask 创建（与普通 open 一致）
+- 目标是符号链接时写入链接指向的文件（与 write_text 一致），链接本身保持不变
+
+多文件修改可以先全部 stage_write，确认都写好后再逐个 commit_staged。
+"""
+
+import hashlib
+import os
+import secrets
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+# 文本按多少字符一块编码写入，避免大内容整体编码带来的额外内存峰值
+ENCODE_CHUNK_CHARS = 1024 * 1024
+
+# 新文件的权限（与普通 open 创建的文件一致，由内核按 umask 处理）
+DEFAULT_FILE_MODE = 0o666
+
+# 生成临时文件名的最大尝试次数
+_TEMP_NAME_ATTEMPTS = 100
+
+
+def _fsync_directory(directory: Path) -> None:
+    """fsync 目录，确保 rename 持久化（不支持的平台忽略）"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_target(path: Path) -> Path:
+    """实际写入的文件：解析符号链接，os.replace 不会替换掉链接本身"""
+    return Path(os.path.realpath(path))
+
+
+def _create_temp(path: Path) -> tuple[int, Path]:
+    """在 path 同目录独占创建临时文件，返回 (文件描述符, 临时文件路径)"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for _ in range(_TEMP_NAME_ATTEMPTS):
+        temp_path = path.parent / f".{path.name}.{secrets.token_hex(4)}.tmp"
+        try:
+            return os.open(temp_path, flags, DEFAULT_FILE_MODE), temp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"Cannot create a temporary file next to {path}")
+
+
+def stage_write(path: Path, chunks: Iterable[bytes]) -> Path:
+    """
+    将内容写入 path 同目录下的临时文件（尚未替换目标文件）
+
+    Args:
+        path: 目标文件
+        chunks: 要写入的字节块
+
+    Returns:
+        临时文件路径，交给 commit_staged / discard_staged
+    """
+    path = _write_target(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = _create_temp(path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        # 保留原文件权限；新文件保持创建时按 umask 得到的权限
+        try:
+            os.chmod(temp_path, path.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+    except BaseException:
+        discard_staged(temp_path)
+        raise
+    return temp_path
+
+
+def commit_staged(temp_path: Path, path: Path) -> None:
+    """用临时文件原子替换目标文件（符号链接替换其指向的文件）"""
+    path = _write_target(path)
+    os.replace(temp_path, path)
+    _fsync_directory(path.parent)
+
+
+def discard_staged(temp_path: Path) -> None:
+    """删除未提交的临时文件"""
+    try:
+        temp_path.unlink()
+    except OSError:
+        pass
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """原子写入字节内容"""
+    commit_staged(stage_write(path, [data]), path)
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    """原子写入文本内容"""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def encode_chunks(text: str, encoding: str = "utf-8") -> Iterator[bytes]:
+    """分块编码文本"""
+    for start in range(0, len(text), ENCODE_CHUNK_CHARS):
+        yield text[start:start + ENCODE_CHUNK_CHARS].encode(encoding)
+
+
+def file_sha256(path: Path) -> str:
+    """文件内容的 sha256（分块读取）"""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def append_bytes(path: Path, chunks: Iterable[bytes]) -> int:
+    """
+    追加写入（fsync 后返回）
+
+    追加无法通过 rename 原子完成；崩溃时最多丢失 / 截断本次追加的内容，已有内容不受影响。
+
+    Returns:
+        写入的字节数
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "ab") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    return written
@@ -0,0 +1,157 @@
+"""
+文件内容缓存
+
+一次会话中常见的模式是 read_file → grep → edit 同一个文件。
+这里缓存小文件解码后的文本，供这些工具共享：
+- 以 (mtime_ns, size) 校验，文件被外部修改后自动失效
+- 按字节数做 LRU 淘汰
+- write_file / edit 写入后直接更新缓存，无需重新读取
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .sniff import FileKind, classify_file
+
+
+# 缓存总大小上限
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+# 超过该大小的文件不进入缓存（大文件由 mmap 窗口读取）
+MAX_CACHED_FILE_BYTES = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachedText:
+    """缓存的文件文本"""
+    text: str
+    kind: FileKind
+    mtime_ns: int
+    size: int
+
+
+class FileContentCache:
+    """
+    按 mtime 校验、按字节数淘汰的文件文本缓存
+
+    用法:
+        cache = FileContentCache()
+        cached = cache.read(path)   # 未命中时读取并解码（严格模式）
+        cache.peek(path)            # 只查缓存，不读盘
+        cache.put(path, text, kind) # 写入文件后更新
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES, max_file_bytes: int = MAX_CACHED_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedText]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        """当前缓存占用的字节数（按文件大小计）"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: str, stat: os.stat_result) -> Optional[CachedText]:
+        """查找并校验缓存项，调用方需持有锁"""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        if cached.mtime_ns != stat.st_mtime_ns or cached.size != stat.st_size:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return cached
+
+    def _remove(self, key: str) -> None:
+        """删除缓存项，调用方需持有锁"""
+        cached = self._entries.pop(key, None)
+        if cached is not None:
+            self._bytes -= cached.size
+
+    def _store(self, key: str, cached: CachedText) -> None:
+        """写入缓存项并按字节数淘汰，调用方需持有锁"""
+        self._remove(key)
+        if cached.size > self.max_file_bytes:
+            return
+        self._entries[key] = cached
+        self._bytes += cached.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def peek(self, path: Path, stat: Optional[os.stat_result] = None) -> Optional[CachedText]:
+        """只查询缓存（文件已变化或未缓存时返回 None）"""
+        try:
+            stat = stat or path.stat()
+        except OSError:
+            return None
+        with self._lock:
+            return self._lookup(os.fspath(path), stat)
+
+    def read(self, path: Path, stat: Optional[os.stat_result] = None) -> Optional[CachedText]:
+        """
+        读取文件文本（优先使用缓存）
+
+        Returns:
+            CachedText；二进制文件或超过 max_file_bytes 的文件返回 None
+
+        Raises:
+            OSError: 读取失败
+            UnicodeDecodeError: 按检测到的编码无法严格解码
+        """
+        stat = stat or path.stat()
+        key = os.fspath(path)
+        with self._lock:
+            cached = self._lookup(key, stat)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        if stat.st_size > self.max_file_bytes:
+            return None
+        kind = classify_file(path, stat)
+        if kind.is_binary:
+            return None
+
+        with open(path, "rb") as f:
+            data = f.read()
+        # 读取期间文件被修改时不缓存（以实际读到的内容为准）
+        if len(data) != stat.st_size:
+            return CachedText(data.decode(kind.encoding), kind, -1, len(data))
+        cached = CachedText(data.decode(kind.encoding), kind, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            self._store(key, cached)
+        return cached
+
+    def put(self, path: Path, text: str, kind: FileKind) -> None:
+        """写入文件后更新缓存（text 须与磁盘内容一致）"""
+        try:
+            stat = path.stat()
+        except OSError:
+            self.invalidate(path)
+            return
+        with self._lock:
+            self._store(os.fspath(path), CachedText(text, kind, stat.st_mtime_ns, stat.st_size))
+
+    def invalidate(self, path: Path) -> None:
+        """使某个文件的缓存失效"""
+        with self._lock:
+            self._remove(os.fspath(path))
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
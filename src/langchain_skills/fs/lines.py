@@ -0,0 +1,166 @@
+"""
+行窗口读取
+
+read_file 需要按行号随机访问大文件（如读取第 5000~5100 行）。
+这里用 mmap 映射文件，并为每个文件缓存一份行起始偏移索引：
+- 索引按需增量扩展，只扫描到目标窗口为止
+- 以 (mtime_ns, size) 校验，文件变化后自动重建
+- 模块级锁只保护索引缓存的查找 / 插入，扫描使用每个索引自己的锁
+- 读取窗口只切片对应字节区间，开销与窗口大小成正比
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+
+# 最多缓存多少个文件的行索引
+MAX_CACHED_INDEXES = 64
+
+
+@dataclass
+class LineIndex:
+    """单个文件的行起始偏移索引"""
+    mtime_ns: int
+    size: int
+    # offsets[i] 为第 i 行（0 起）的起始字节偏移
+    offsets: array = field(default_factory=lambda: array("Q", [0]))
+    # 已扫描到的字节位置
+    scanned: int = 0
+    # 是否已扫描到文件末尾（此时 len(offsets) 即总行数）
+    complete: bool = False
+    # 扫描锁：只串行化同一文件的扩展，不同文件的读取互不阻塞
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_lines(self) -> Optional[int]:
+        """总行数，未扫描完时为 None"""
+        return len(self.offsets) if self.complete else None
+
+    def extend_to(self, buf, line_count: int) -> None:
+        """
+        扩展索引，直到已知至少 line_count 行的起始偏移或到达文件末尾
+
+        Args:
+            buf: 文件内容（mmap 或 bytes）
+            line_count: 需要的行起始偏移数量
+        """
+        pos = self.scanned
+        offsets = self.offsets
+        while not self.complete and len(offsets) < line_count:
+            newline = buf.find(b"\n", pos)
+            if newline == -1:
+                self.complete = True
+                pos = self.size
+                break
+            pos = newline + 1
+            offsets.append(pos)
+        self.scanned = pos
+
+
+@dataclass
+class LineWindow:
+    """一段连续行的读取结果"""
+    start_line: int            # 第一行的行号（1 起）
+    lines: list                # 行内容（不含换行符）；read_line_window 返回 bytes，由调用方解码
+    has_more: bool             # 窗口之后是否还有内容
+    total_lines: Optional[int]  # 总行数（未知时为 None）
+
+    @property
+    def end_line(self) -> int:
+        """最后一行的行号（1 起）"""
+        return self.start_line + len(self.lines) - 1
+
+
+_cache: "OrderedDict[str, LineIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_line_index_cache() -> None:
+    """清空行索引缓存"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def get_line_index(path: Path, stat: Optional[os.stat_result] = None) -> LineIndex:
+    """
+    获取文件的行索引（mtime / size 变化时重建）
+
+    Args:
+        path: 文件路径
+        stat: 已有的 stat 结果，避免重复 stat
+
+    Returns:
+        LineIndex（可能尚未扫描完整）
+    """
+    stat = stat or path.stat()
+    key = os.fspath(path)
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None and index.mtime_ns == stat.st_mtime_ns and index.size == stat.st_size:
+            _cache.move_to_end(key)
+            return index
+
+        index = LineIndex(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _cache[key] = index
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.popitem(last=False)
+        return index
+
+
+def read_line_window(path: Path, offset: int = 1, limit: int = 2000) -> LineWindow:
+    """
+    读取文件中 [offset, offset + limit) 行
+
+    行的划分与 str.split("\\n") 一致：以换行结尾的文件最后有一个空行。
+
+    Args:
+        path: 文件路径
+        offset: 起始行号（1 起）
+        limit: 最多读取的行数
+
+    Returns:
+        LineWindow
+    """
+    offset = max(offset, 1)
+    limit = max(limit, 1)
+    stat = path.stat()
+
+    if stat.st_size == 0:
+        return LineWindow(start_line=1, lines=[b""] if offset == 1 else [], has_more=False, total_lines=1)
+
+    index = get_line_index(path, stat)
+    start = offset - 1
+    stop = start + limit
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 多扫描一行，用于确定窗口最后一行的结束位置以及是否还有后续内容
+        with index.lock:
+            index.extend_to(mm, stop + 1)
+            offsets = index.offsets
+            known = len(offsets)
+            total = index.total_lines
+
+        if start >= known:
+            return LineWindow(start_line=offset, lines=[], has_more=False, total_lines=total)
+
+        begin = offsets[start]
+        if stop < known:
+            end = offsets[stop] - 1  # 去掉换行符
+            has_more = True
+        else:
+            end = stat.st_size
+            has_more = False
+        data = mm[begin:end]
+
+    return LineWindow(
+        start_line=offset,
+        lines=data.split(b"\n"),
+        has_more=has_more,
+        total_lines=total,
+    )
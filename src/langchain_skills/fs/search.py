@@ -0,0 +1,374 @@
+"""
+grep 搜索引擎
+
+相比逐文件 read_text + 逐行正则，这里的实现：
+- 惰性遍历目录（遵守 .gitignore），忽略的目录不会进入，达到 max_results 立即停止
+- 对整个 mmap 缓冲区做 bytes 正则搜索；纯字面量模式走 bytes.find 快速路径
+- 只在命中的行上计算行号、解码文本
+- 文件较多时按批次分发到进程池并行搜索，结果仍按遍历顺序返回
+"""
+
+import atexit
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from .cache import FileContentCache
+from .sniff import classify_file
+from .walker import DEFAULT_EXCLUDES, walk
+
+
+# 前多少个文件在当前进程串行搜索（小目录不值得启动进程池）
+SERIAL_FILE_THRESHOLD = 200
+
+# 每个进程池任务包含的文件数
+BATCH_SIZE = 64
+
+# 单行输出的最大长度
+MAX_LINE_LENGTH = 100
+
+# 正则元字符（不含这些字符的模式按字面量处理）
+_REGEX_METACHARS = frozenset(".^$*+?{}[]\\|()")
+
+# bytes 正则中按字节（而非字符）或只按 ASCII 匹配的转义
+_CHAR_SENSITIVE_ESCAPES = frozenset("sSdDwWbB")
+
+# 可以直接在原始字节上搜索的编码
+_BYTES_SEARCHABLE_ENCODINGS = ("utf-8", "utf-8-sig")
+
+
+@dataclass
+class SearchMatch:
+    """单条匹配"""
+    path: Path
+    line_number: int
+    line: str
+
+
+@dataclass
+class SearchResult:
+    """一次搜索的结果"""
+    matches: list[SearchMatch] = field(default_factory=list)
+    files_searched: int = 0
+    truncated: bool = False
+
+
+def default_workers() -> int:
+    """默认进程数：SKILLS_GREP_WORKERS 环境变量，否则 min(4, CPU 数)"""
+    raw = os.getenv("SKILLS_GREP_WORKERS")
+    if raw is not None:
+        try:
+            return max(int(raw), 0)
+        except ValueError:
+            pass
+    return min(4, os.cpu_count() or 1)
+
+
+def iter_search_files(
+    root: Path,
+    base: Optional[Path] = None,
+    exclude: Iterable[str] = DEFAULT_EXCLUDES,
+) -> Iterator[Path]:
+    """
+    惰性遍历 root 下需要搜索的文件
+
+    隐藏文件 / 目录、.gitignore / .ignore 和 exclude 规则命中的目录在进入之前被剪枝。
+
+    Args:
+        root: 搜索目录
+        base: 忽略规则的根目录（通常为工作目录）
+        exclude: 额外的排除规则（gitignore 语法）
+    """
+    for entry in walk(root, base=base, exclude=exclude, skip_hidden=True):
+        if entry.is_file():
+            yield Path(entry.path)
+
+
+def _is_literal(pattern: str) -> bool:
+    """模式是否不含正则元字符"""
+    return not any(ch in _REGEX_METACHARS for ch in pattern)
+
+
+def _is_bytes_safe(pattern: str) -> bool:
+    """
+    ASCII 正则在 bytes 上搜索是否与解码文本上的结果一致
+
+    . / [^...] 在 bytes 模式下只匹配单个字节，\\s \\d \\w \\b 等只按 ASCII 判断，
+    内联标记 (?u) 在 bytes 模式下非法；含这些构造的模式走解码路径。
+    """
+    if not pattern.isascii():
+        return False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        nxt = pattern[i + 1] if i + 1 < len(pattern) else ""
+        if ch == "\\":
+            if nxt in _CHAR_SENSITIVE_ESCAPES:
+                return False
+            i += 2
+            continue
+        if ch == "." or (ch == "[" and nxt == "^") or (ch == "(" and nxt == "?"):
+            return False
+        i += 1
+    return True
+
+
+@lru_cache(maxsize=32)
+def _compile(pattern: str, as_bytes: bool) -> "re.Pattern":
+    """编译（并缓存）搜索用正则"""
+    source = pattern.encode("utf-8") if as_bytes else pattern
+    return re.compile(source, re.MULTILINE)
+
+
+def _scan(buf, find: Callable[[int], int], verify: Optional[Callable], newline, limit: int) -> list:
+    """
+    在整个缓冲区上查找匹配行
+
+    Args:
+        buf: mmap / bytes / str
+        find: 从给定位置开始查找下一个匹配起点，找不到返回 -1
+        verify: 对候选行再做一次逐行校验（正则可能跨行匹配时需要）
+        newline: 换行符（b"\\n" 或 "\\n"）
+        limit: 最多返回多少行
+
+    Returns:
+        [(行号, 行内容)]
+    """
+    matches = []
+    size = len(buf)
+    pos = 0
+    line_number = 1
+    counted_to = 0
+
+    while len(matches) < limit and pos <= size:
+        start = find(pos)
+        if start < 0:
+            break
+
+        line_start = buf.rfind(newline, 0, start) + 1
+        line_end = buf.find(newline, start)
+        if line_end < 0:
+            line_end = size
+        line = buf[line_start:line_end]
+
+        if verify is None or verify(line):
+            line_number += buf[counted_to:line_start].count(newline)
+            counted_to = line_start
+            matches.append((line_number, line))
+
+        pos = line_end + 1
+
+    return matches
+
+
+def search_file(path: Path, pattern: str, limit: int) -> Optional[list[tuple[int, str]]]:
+    """
+    在单个文件中搜索
+
+    Args:
+        path: 文件路径
+        pattern: 正则表达式
+        limit: 最多返回多少行
+
+    Returns:
+        [(行号, 行文本)]；二进制或不可读文件返回 None
+    """
+    try:
+        stat = path.stat()
+        kind = classify_file(path, stat)
+        if kind.is_binary:
+            return None
+        if stat.st_size == 0:
+            return []
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            use_bytes = (
+                kind.encoding in _BYTES_SEARCHABLE_ENCODINGS
+                and (_is_literal(pattern) or _is_bytes_safe(pattern))
+                # CRLF 文件中 $ 需要按规范化后的换行匹配
+                and not ("$" in pattern and mm.find(b"\r") >= 0)
+            )
+            regex = None
+            if use_bytes and not _is_literal(pattern):
+                try:
+                    regex = _compile(pattern, True)
+                except re.error:
+                    # bytes 模式下不支持的构造：改为在解码文本上搜索
+                    use_bytes = False
+
+            if use_bytes:
+                if regex is None:
+                    needle = pattern.encode("utf-8")
+                    raw = _scan(mm, lambda pos: mm.find(needle, pos), None, b"\n", limit)
+                else:
+                    def find(pos: int) -> int:
+                        m = regex.search(mm, pos)
+                        return m.start() if m else -1
+
+                    raw = _scan(mm, find, regex.search, b"\n", limit)
+                return [
+                    (line_number, line.decode(kind.encoding, errors="ignore"))
+                    for line_number, line in raw
+                ]
+
+            text = mm[:].decode(kind.encoding, errors="ignore")
+
+        # 非 UTF-8 编码 / 字符语义敏感的正则：解码后整体搜索
+        return search_text(text, pattern, limit)
+
+    except (OSError, ValueError):
+        return None
+
+
+def search_text(text: str, pattern: str, limit: int) -> list[tuple[int, str]]:
+    """
+    在已解码的文本中搜索（如文件内容缓存中的文本）
+
+    Returns:
+        [(行号, 行文本)]
+    """
+    text = text.replace("\r\n", "\n")
+    regex = _compile(pattern, False)
+
+    def find_text(pos: int) -> int:
+        m = regex.search(text, pos)
+        return m.start() if m else -1
+
+    return _scan(text, find_text, regex.search, "\n", limit)
+
+
+def _search_batch(paths: list[str], pattern: str, limit: int) -> list[tuple[str, Optional[list]]]:
+    """进程池任务：搜索一批文件"""
+    results = []
+    for path in paths:
+        found = search_file(Path(path), pattern, limit)
+        results.append((path, found))
+        if found:
+            limit -= len(found)
+            if limit <= 0:
+                break
+    return results
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """获取（或创建）常驻进程池"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # spawn 避免在多线程进程中 fork
+            import multiprocessing
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown_search_pool() -> None:
+    """关闭常驻进程池"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _batched(iterable: Iterable[Path], size: int) -> Iterator[list[str]]:
+    """按固定大小分批"""
+    it = iter(iterable)
+    while batch := [os.fspath(p) for p in islice(it, size)]:
+        yield batch
+
+
+def search(
+    pattern: str,
+    root: Path,
+    max_results: int = 50,
+    workers: Optional[int] = None,
+    files: Optional[Iterable[Path]] = None,
+    serial_threshold: int = SERIAL_FILE_THRESHOLD,
+    cache: Optional[FileContentCache] = None,
+) -> SearchResult:
+    """
+    在文件或目录中搜索正则
+
+    Args:
+        pattern: 正则表达式（非法时抛出 re.error）
+        root: 搜索的文件或目录
+        max_results: 最多返回多少条匹配
+        workers: 并行进程数，None 使用 default_workers()，<= 1 表示只在当前进程搜索
+        files: 指定候选文件（按顺序搜索），None 时遍历 root
+        serial_threshold: 前多少个文件在当前进程串行搜索
+        cache: 文件内容缓存；串行阶段已缓存的文件直接搜索缓存文本
+
+    Returns:
+        SearchResult
+    """
+    re.compile(pattern)  # 提前校验，非法模式直接抛出
+    workers = default_workers() if workers is None else workers
+    result = SearchResult()
+
+    if files is None:
+        files = [root] if root.is_file() else iter_search_files(root)
+    files = iter(files)
+
+    def collect(path: Path, found: Optional[list]) -> bool:
+        """记录一个文件的结果，达到上限时返回 True"""
+        if found is None:
+            return False
+        result.files_searched += 1
+        for line_number, line in found:
+            result.matches.append(SearchMatch(path, line_number, line.strip()[:MAX_LINE_LENGTH]))
+            if len(result.matches) >= max_results:
+                result.truncated = True
+                return True
+        return False
+
+    # 串行阶段：小目录直接搜完，避免进程池开销
+    for path in islice(files, serial_threshold if workers > 1 else None):
+        remaining = max_results - len(result.matches)
+        cached = cache.peek(path) if cache is not None else None
+        if cached is not None:
+            found = search_text(cached.text, pattern, remaining)
+        else:
+            found = search_file(path, pattern, remaining)
+        if collect(path, found):
+            return result
+
+    if workers <= 1:
+        return result
+
+    # 并行阶段：按遍历顺序提交批次，按提交顺序消费，保证输出顺序稳定
+    pool = _get_pool(workers)
+    batches = _batched(files, BATCH_SIZE)
+    pending = []
+    try:
+        for batch in islice(batches, workers * 2):
+            pending.append(pool.submit(_search_batch, batch, pattern, max_results))
+
+        while pending:
+            future = pending.pop(0)
+            for path, found in future.result():
+                if collect(Path(path), found):
+                    return result
+            next_batch = next(batches, None)
+            if next_batch is not None:
+                pending.append(pool.submit(_search_batch, next_batch, pattern, max_results))
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return result
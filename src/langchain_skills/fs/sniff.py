@@ -0,0 +1,156 @@
+"""
+文件类型嗅探
+
+read_file / grep / edit 共用的文件分类层：
+- 只读取文件开头的少量字节（SNIFF_BYTES）
+- 通过 BOM、魔数和 NUL 字节判断是否为二进制文件
+- 按候选编码列表依次尝试解码，确定文本编码
+- 结果按 (path, mtime_ns, size) 缓存，文件未变化时不再重复读取
+"""
+
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+# 嗅探读取的字节数
+SNIFF_BYTES = 8192
+
+# 候选编码（按顺序尝试）；latin-1 可解码任意字节，作为最终兜底
+FALLBACK_ENCODINGS = ("utf-8", "gb18030", "latin-1")
+
+# 最多缓存多少个文件的嗅探结果
+MAX_CACHED_VERDICTS = 4096
+
+# BOM -> 编码（UTF-32 需在 UTF-16 之前检查）
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 常见二进制格式的魔数
+_MAGIC_NUMBERS = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"%PDF-", "pdf"),
+    (b"PK\x03\x04", "zip"),
+    (b"PK\x05\x06", "zip"),
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"7z\xbc\xaf\x27\x1c", "7z"),
+    (b"Rar!\x1a\x07", "rar"),
+    (b"\x7fELF", "elf"),
+    (b"\xfe\xed\xfa\xce", "mach-o"),
+    (b"\xfe\xed\xfa\xcf", "mach-o"),
+    (b"\xce\xfa\xed\xfe", "mach-o"),
+    (b"\xcf\xfa\xed\xfe", "mach-o"),
+    (b"\xca\xfe\xba\xbe", "mach-o"),
+    (b"SQLite format 3\x00", "sqlite"),
+    (b"\x00asm", "wasm"),
+    (b"RIFF", "riff"),
+    (b"OggS", "ogg"),
+    (b"fLaC", "flac"),
+    (b"ID3", "mp3"),
+)
+
+
+@dataclass(frozen=True)
+class FileKind:
+    """文件分类结果"""
+    is_binary: bool
+    encoding: Optional[str]  # 文本文件的编码，二进制文件为 None
+    reason: str              # 判定依据，如 "text" / "nul-bytes" / "magic:png"
+
+    @property
+    def line_addressable(self) -> bool:
+        """是否可以直接按 b"\\n" 切分行（UTF-16/32 不行）"""
+        return self.encoding is not None and not self.encoding.startswith(("utf-16", "utf-32"))
+
+
+_cache: "OrderedDict[str, tuple[int, int, FileKind]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_sniff_cache() -> None:
+    """清空嗅探结果缓存"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def sniff_bytes(sample: bytes, complete: bool = False) -> FileKind:
+    """
+    根据文件开头的字节判断文件类型和编码
+
+    Args:
+        sample: 文件开头的字节
+        complete: sample 是否为完整文件内容（决定末尾的不完整多字节字符是否算错误）
+
+    Returns:
+        FileKind
+    """
+    if not sample:
+        return FileKind(is_binary=False, encoding="utf-8", reason="empty")
+
+    # BOM 优先（UTF-16/32 文本本身包含 NUL 字节）
+    for bom, encoding in _BOMS:
+        if sample.startswith(bom):
+            return FileKind(is_binary=False, encoding=encoding, reason="bom")
+
+    for magic, name in _MAGIC_NUMBERS:
+        if sample.startswith(magic):
+            return FileKind(is_binary=True, encoding=None, reason=f"magic:{name}")
+
+    if b"\x00" in sample:
+        return FileKind(is_binary=True, encoding=None, reason="nul-bytes")
+
+    for encoding in FALLBACK_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoder.decode(sample, final=complete)
+        except UnicodeDecodeError:
+            continue
+        return FileKind(is_binary=False, encoding=encoding, reason="text")
+
+    return FileKind(is_binary=True, encoding=None, reason="unknown-encoding")
+
+
+def classify_file(path: Path, stat: Optional[os.stat_result] = None) -> FileKind:
+    """
+    判断文件是否为二进制，以及文本文件的编码
+
+    只读取前 SNIFF_BYTES 字节；结果按 (mtime_ns, size) 缓存。
+
+    Args:
+        path: 文件路径
+        stat: 已有的 stat 结果，避免重复 stat
+
+    Returns:
+        FileKind
+    """
+    stat = stat or path.stat()
+    key = os.fspath(path)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            _cache.move_to_end(key)
+            return cached[2]
+
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    kind = sniff_bytes(sample, complete=stat.st_size <= SNIFF_BYTES)
+
+    with _cache_lock:
+        _cache[key] = (stat.st_mtime_ns, stat.st_size, kind)
+        while len(_cache) > MAX_CACHED_VERDICTS:
+            _cache.popitem(last=False)
+    return kind
@@ -0,0 +1,418 @@
+"""
+持久化 trigram 索引
+
+同一个工作目录在一次会话中会被 grep 很多次。这里为工作目录维护一份
+磁盘上的 trigram 倒排索引（思路同 Zoekt / codesearch）：
+- 每个文件记录其内容中出现过的所有 3 字节组合
+- 搜索时从正则中提取必须出现的字面量，求出候选文件后再做正则校验
+- 按 (mtime_ns, size) 增量刷新，write_file / edit 写入后立即更新对应文件
+- 存储在 SQLite 中（SKILLS_INDEX_DIR，默认 ~/.cache/langchain_skills/trigram）
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .search import iter_search_files
+from .walker import DEFAULT_EXCLUDES
+from .sniff import classify_file
+
+
+# 超过该大小的文件不建索引，总是作为候选文件
+MAX_INDEXED_FILE_BYTES = 1024 * 1024
+
+# 索引结构版本，变化时重建
+SCHEMA_VERSION = 1
+
+# 一次查询最多使用多少个 trigram（越多过滤越精确，但 SQL 越慢）
+MAX_QUERY_TRIGRAMS = 16
+
+# 正则中会打断字面量的元字符
+_BREAK_CHARS = frozenset(".^$[](){}")
+_QUANTIFIERS = frozenset("*?{")
+
+# 字符类转义（\w \d 等）会打断字面量；其余转义按字面字符处理
+_CLASS_ESCAPES = frozenset("wWdDsSbBAZ")
+_SIMPLE_ESCAPES = {"a": "\a", "n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v"}
+
+
+def default_index_dir() -> Path:
+    """索引目录：SKILLS_INDEX_DIR 环境变量，否则 ~/.cache/langchain_skills/trigram"""
+    raw = os.getenv("SKILLS_INDEX_DIR")
+    if raw:
+        return Path(raw).expanduser()
+    return Path.home() / ".cache" / "langchain_skills" / "trigram"
+
+
+def file_trigrams(data: bytes) -> set[int]:
+    """
+    提取内容中出现过的所有 trigram
+
+    Returns:
+        trigram 整数集合（3 个字节按大端拼成 24 位整数）
+    """
+    if len(data) < 3:
+        return set()
+    triples = set(zip(data, data[1:], data[2:]))
+    return {(a << 16) | (b << 8) | c for a, b, c in triples}
+
+
+def literal_runs(pattern: str) -> Optional[list[str]]:
+    """
+    提取正则中每个匹配都必须包含的字面量片段
+
+    只做保守分析：分组内部、字符类、被 ? / * / {m,n} 修饰的字符都不计入。
+
+    Returns:
+        字面量片段列表；模式含顶层 | 或内联标志（如 (?i)）时返回 None，表示无法缩小范围
+    """
+    if "(?" in pattern and any(f"(?{flag}" in pattern for flag in "aiLmsux"):
+        return None
+
+    runs: list[str] = []
+    current: list[str] = []
+    depth = 0
+    i = 0
+
+    def flush() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    while i < len(pattern):
+        ch = pattern[i]
+        literal = None
+
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if nxt in _CLASS_ESCAPES:
+                flush()
+                continue
+            if nxt.isdigit() or nxt in "xuUN":
+                # 反向引用 / 八进制 / 十六进制 / Unicode 转义：跳过参数，不计入字面量
+                flush()
+                if nxt.isdigit():
+                    while i < len(pattern) and pattern[i].isdigit():
+                        i += 1
+                elif nxt == "N":
+                    end = pattern.find("}", i)
+                    i = len(pattern) if end < 0 else end + 1
+                else:
+                    i += {"x": 2, "u": 4, "U": 8}[nxt]
+                continue
+            literal = _SIMPLE_ESCAPES.get(nxt, nxt)
+        elif ch == "|":
+            if depth == 0:
+                return None
+            i += 1
+            continue
+        elif ch == "(":
+            depth += 1
+            flush()
+            i += 1
+            continue
+        elif ch == ")":
+            depth = max(depth - 1, 0)
+            flush()
+            i += 1
+            continue
+        elif ch == "[":
+            # 跳过整个字符类
+            flush()
+            end = i + 1
+            if end < len(pattern) and pattern[end] == "^":
+                end += 1
+            if end < len(pattern) and pattern[end] == "]":
+                end += 1
+            while end < len(pattern) and pattern[end] != "]":
+                end += 2 if pattern[end] == "\\" else 1
+            i = end + 1
+            continue
+        elif ch in _BREAK_CHARS or ch in "*+?":
+            flush()
+            i += 1
+            if ch == "{":
+                # 跳过 {m,n} 量词
+                end = pattern.find("}", i)
+                i = len(pattern) if end < 0 else end + 1
+            continue
+        else:
+            literal = ch
+            i += 1
+
+        if depth > 0:
+            continue
+
+        nxt = pattern[i] if i < len(pattern) else ""
+        if nxt in _QUANTIFIERS:
+            # 该字符可以不出现
+            flush()
+        elif nxt == "+":
+            # 至少出现一次，但之后的字符不再相邻
+            current.append(literal)
+            flush()
+        else:
+            current.append(literal)
+
+    flush()
+    return runs
+
+
+def query_trigrams(pattern: str) -> Optional[set[int]]:
+    """
+    正则匹配所需的 trigram 集合
+
+    Returns:
+        trigram 集合；无法提取（无 3 字符以上字面量或模式过于复杂）时返回 None
+    """
+    runs = literal_runs(pattern)
+    if not runs:
+        return None
+    required: set[int] = set()
+    for run in runs:
+        required |= file_trigrams(run.encode("utf-8"))
+    return required or None
+
+
+def _walk_order(path: str) -> tuple:
+    """与 iter_search_files 一致的排序键（先序遍历，同一目录内按名称排序）"""
+    return tuple(path.split("/"))
+
+
+class TrigramIndex:
+    """
+    工作目录的 trigram 索引
+
+    用法:
+        index = TrigramIndex(root)
+        files = index.candidates(pattern, search_path)  # None 表示无法缩小范围
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        db_path: Optional[Path] = None,
+        exclude: Iterable[str] = DEFAULT_EXCLUDES,
+    ):
+        self.root = Path(os.path.abspath(root))
+        self.exclude = tuple(exclude)
+        if db_path is None:
+            digest = hashlib.sha1(os.fspath(self.root).encode("utf-8")).hexdigest()[:16]
+            db_path = default_index_dir() / f"{digest}.sqlite"
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.fspath(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        """创建表结构；版本不一致时重建"""
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS postings")
+                self._conn.execute("DROP TABLE IF EXISTS files")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " id INTEGER PRIMARY KEY,"
+                " path TEXT UNIQUE NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                # 0 = 已索引, 1 = 二进制（永远不是候选）, 2 = 未索引（永远是候选）
+                " status INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " trigram INTEGER NOT NULL,"
+                " file_id INTEGER NOT NULL,"
+                " PRIMARY KEY (trigram, file_id)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id)")
+            self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def _relative(self, path: Path) -> Optional[str]:
+        """root 下的相对路径（POSIX 风格），不在 root 下时返回 None"""
+        try:
+            return Path(os.path.abspath(path)).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def _index_file(self, rel: str, path: Path, stat: os.stat_result) -> None:
+        """（重新）索引单个文件，调用方需持有锁并处于事务中"""
+        row = self._conn.execute("SELECT id FROM files WHERE path = ?", (rel,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM postings WHERE file_id = ?", (row[0],))
+
+        trigrams: set[int] = set()
+        try:
+            kind = classify_file(path, stat)
+            if kind.is_binary:
+                status = 1
+            elif stat.st_size > MAX_INDEXED_FILE_BYTES:
+                status = 2
+            else:
+                data = path.read_bytes()
+                if kind.encoding not in ("utf-8", "utf-8-sig"):
+                    # 统一转成 UTF-8，与查询时模式的编码一致
+                    data = data.decode(kind.encoding, errors="ignore").encode("utf-8")
+                trigrams = file_trigrams(data)
+                status = 0
+        except OSError:
+            status = 2
+
+        if row is None:
+            file_id = self._conn.execute(
+                "INSERT INTO files (path, mtime_ns, size, status) VALUES (?, ?, ?, ?)",
+                (rel, stat.st_mtime_ns, stat.st_size, status),
+            ).lastrowid
+        else:
+            file_id = row[0]
+            self._conn.execute(
+                "UPDATE files SET mtime_ns = ?, size = ?, status = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, status, file_id),
+            )
+        self._conn.executemany(
+            "INSERT INTO postings (trigram, file_id) VALUES (?, ?)",
+            ((trigram, file_id) for trigram in trigrams),
+        )
+
+    def refresh(self) -> int:
+        """
+        按 mtime / size 增量同步索引
+
+        Returns:
+            重新索引的文件数
+        """
+        with self._lock, self._conn:
+            known = {
+                path: (file_id, mtime_ns, size)
+                for file_id, path, mtime_ns, size in self._conn.execute(
+                    "SELECT id, path, mtime_ns, size FROM files"
+                )
+            }
+            updated = 0
+            for path in iter_search_files(self.root, base=self.root, exclude=self.exclude):
+                rel = self._relative(path)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entry = known.pop(rel, None)
+                if entry is not None and entry[1] == stat.st_mtime_ns and entry[2] == stat.st_size:
+                    continue
+                self._index_file(rel, path, stat)
+                updated += 1
+
+            # 已删除的文件
+            for file_id, _, _ in known.values():
+                self._conn.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+            return updated
+
+    def update_file(self, path: Path) -> None:
+        """
+        写入文件后立即更新索引
+
+        只更新已被索引的文件；新文件是否需要索引（忽略规则）由下次 refresh 判断。
+        """
+        rel = self._relative(path)
+        if rel is None:
+            return
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM files WHERE path = ?", (rel,)).fetchone()
+            if row is None:
+                return
+            try:
+                stat = path.stat()
+            except OSError:
+                self._conn.execute("DELETE FROM postings WHERE file_id = ?", (row[0],))
+                self._conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+                return
+            self._index_file(rel, path, stat)
+
+    def candidates(self, pattern: str, search_path: Path, refresh: bool = True) -> Optional[list[Path]]:
+        """
+        可能匹配 pattern 的文件（按目录遍历顺序）
+
+        Args:
+            pattern: 正则表达式
+            search_path: grep 的搜索目录（须在 root 下）
+            refresh: 查询前是否先按 mtime 同步索引
+
+        Returns:
+            候选文件列表；无法用索引缩小范围时返回 None
+        """
+        required = query_trigrams(pattern)
+        prefix = self._relative(search_path)
+        if required is None or prefix is None or search_path.is_file():
+            return None
+
+        if refresh:
+            self.refresh()
+
+        # 只用部分 trigram 查询：先用较少的条件过滤，剩余由正则校验
+        trigrams = sorted(required)[:MAX_QUERY_TRIGRAMS]
+        placeholders = ",".join("?" * len(trigrams))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT path FROM files WHERE id IN ("
+                f" SELECT file_id FROM postings WHERE trigram IN ({placeholders})"
+                f" GROUP BY file_id HAVING COUNT(*) = ?)"
+                f" UNION SELECT path FROM files WHERE status = 2",
+                (*trigrams, len(trigrams)),
+            ).fetchall()
+
+        paths = [row[0] for row in rows]
+        if prefix not in ("", "."):
+            paths = [p for p in paths if p.startswith(prefix + "/")]
+        paths.sort(key=_walk_order)
+        return [self.root / p for p in paths]
+
+
+_indexes: dict[tuple, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_trigram_index(root: Path, exclude: Iterable[str] = DEFAULT_EXCLUDES) -> TrigramIndex:
+    """获取（或创建）root 对应的索引实例"""
+    key = (os.path.abspath(root), tuple(exclude))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = TrigramIndex(Path(key[0]), exclude=key[1])
+            _indexes[key] = index
+        return index
+
+
+def close_trigram_indexes() -> None:
+    """关闭所有索引连接"""
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
+
+
+def update_indexed_files(root: Path, paths: Iterable[Path]) -> None:
+    """若 root 已打开索引，则同步更新这些文件（失败时留给下次 refresh）"""
+    root = os.path.abspath(root)
+    paths = list(paths)
+    with _indexes_lock:
+        indexes = [index for key, index in _indexes.items() if key[0] == root]
+    for index in indexes:
+        for path in paths:
+            try:
+                index.update_file(path)
+            except sqlite3.Error:
+                continue
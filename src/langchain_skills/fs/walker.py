@@ -0,0 +1,363 @@
+"""
+目录遍历器
+
+glob / grep / list_dir 共用的惰性遍历：
+- 基于 os.scandir，DirEntry 自带的类型信息避免额外 stat
+- 支持 .gitignore / .ignore 和可配置的排除规则（gitignore 语法）
+- 被忽略的目录在进入之前剪枝
+- 以生成器形式产出，调用方可以随时停止
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+
+# 各目录中读取的忽略文件
+DEFAULT_IGNORE_FILES = (".gitignore", ".ignore")
+
+# 默认排除规则（gitignore 语法，对所有层级生效）
+DEFAULT_EXCLUDES = ("node_modules/", "__pycache__/", ".git/", "venv/", ".venv/")
+
+
+def translate_glob(pattern: str) -> str:
+    """
+    将 glob 模式转换为正则（按 / 分隔的相对路径整体匹配）
+
+    - ** 匹配任意层级（**/ 可以匹配零层）
+    - * / ? 不跨越 /
+    - [...] 字符类，[!...] 取反
+    """
+    i = 0
+    n = len(pattern)
+    parts = []
+    while i < n:
+        ch = pattern[i]
+        if ch == "*":
+            if pattern.startswith("**", i):
+                if pattern.startswith("**/", i):
+                    parts.append("(?:.*/)?")
+                    i += 3
+                else:
+                    parts.append(".*")
+                    i += 2
+                continue
+            parts.append("[^/]*")
+        elif ch == "?":
+            parts.append("[^/]")
+        elif ch == "[":
+            end = i + 1
+            if end < n and pattern[end] in "!^":
+                end += 1
+            if end < n and pattern[end] == "]":
+                end += 1
+            while end < n and pattern[end] != "]":
+                end += 1
+            if end >= n:
+                parts.append(re.escape(ch))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif ch == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(ch))
+        i += 1
+    return "".join(parts)
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> "re.Pattern":
+    """编译（并缓存）glob 模式"""
+    return re.compile(translate_glob(pattern), re.DOTALL)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """一条 gitignore 规则"""
+    regex: "re.Pattern"
+    negated: bool   # ! 开头：重新包含
+    dir_only: bool  # / 结尾：只匹配目录
+
+
+def parse_ignore_lines(lines: Iterable[str]) -> list[IgnoreRule]:
+    """
+    解析 gitignore 语法的规则
+
+    不含 / 的模式匹配任意层级的同名文件 / 目录；含 / 的模式相对于规则所在目录。
+    """
+    rules = []
+    for raw in lines:
+        line = raw.rstrip("\n").rstrip("\r")
+        # 末尾空格除非转义，否则忽略
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+        if not line or line.startswith("#"):
+            continue
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith(("\\!", "\\#")):
+            line = line[1:]
+
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+
+        if "/" in line:
+            regex = translate_glob(line.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + translate_glob(line)
+        rules.append(IgnoreRule(re.compile(regex, re.DOTALL), negated, dir_only))
+    return rules
+
+
+class IgnoreMatcher:
+    """
+    分层的忽略规则
+
+    每层规则对应一个目录（prefix 为该目录相对遍历起点的路径），
+    深层规则覆盖浅层规则，同一层内后面的规则覆盖前面的规则。
+    """
+
+    def __init__(self, layers: tuple = ()):
+        self.layers = layers
+
+    def child(self, prefix: str, rules: list[IgnoreRule]) -> "IgnoreMatcher":
+        """追加一层规则（rules 为空时返回自身）"""
+        if not rules:
+            return self
+        return IgnoreMatcher(self.layers + ((prefix, tuple(rules)),))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """判断相对路径是否被忽略"""
+        ignored = False
+        for prefix, rules in self.layers:
+            if prefix:
+                if not rel_path.startswith(prefix + "/"):
+                    continue
+                local = rel_path[len(prefix) + 1:]
+            else:
+                local = rel_path
+            for rule in rules:
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.negated == ignored and rule.regex.fullmatch(local):
+                    ignored = not rule.negated
+        return ignored
+
+
+def load_ignore_rules(directory: str, ignore_files: Iterable[str]) -> list[IgnoreRule]:
+    """读取目录下的忽略文件"""
+    rules = []
+    for name in ignore_files:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8", errors="ignore") as f:
+                rules.extend(parse_ignore_lines(f))
+        except OSError:
+            continue
+    return rules
+
+
+@dataclass
+class WalkEntry:
+    """遍历产出的一个条目"""
+    path: str          # 完整路径
+    rel_path: str      # 相对遍历起点的路径（/ 分隔）
+    depth: int         # 层级，起点的直接子项为 1
+    is_dir: bool       # 是否为目录（符号链接按目标判断，但不会进入）
+    entry: os.DirEntry
+    ignored: bool = False  # 命中忽略规则（仅 yield_ignored=True 时出现，目录不会进入）
+
+    @property
+    def name(self) -> str:
+        return self.entry.name
+
+    def is_file(self) -> bool:
+        """是否为普通文件（跟随符号链接）"""
+        try:
+            return self.entry.is_file()
+        except OSError:
+            return False
+
+    def stat(self) -> os.stat_result:
+        """stat 结果（DirEntry 会缓存）"""
+        return self.entry.stat()
+
+
+def _sorted_entries(directory: str, dirs_first: bool) -> list[tuple[os.DirEntry, bool]]:
+    """读取目录并排序，返回 [(entry, is_dir)]"""
+    try:
+        with os.scandir(directory) as it:
+            entries = []
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry, is_dir))
+    except OSError:
+        return []
+
+    if dirs_first:
+        entries.sort(key=lambda item: (not item[1], item[0].name.lower(), item[0].name))
+    else:
+        entries.sort(key=lambda item: item[0].name)
+    return entries
+
+
+def walk(
+    root: Path,
+    *,
+    base: Optional[Path] = None,
+    exclude: Iterable[str] = DEFAULT_EXCLUDES,
+    ignore_files: Iterable[str] = DEFAULT_IGNORE_FILES,
+    skip_hidden: bool = False,
+    max_depth: Optional[int] = None,
+    include_dirs: bool = False,
+    dirs_first: bool = False,
+    yield_ignored: bool = False,
+) -> Iterator[WalkEntry]:
+    """
+    惰性遍历目录（先序深度优先，同一目录内按名称排序）
+
+    Args:
+        root: 遍历起点
+        base: 忽略规则的根目录（通常为工作目录），base 到 root 之间的忽略文件同样生效
+        exclude: 额外的排除规则（gitignore 语法，相对 base）
+        ignore_files: 各目录中读取的忽略文件名
+        skip_hidden: 是否跳过 . 开头的文件和目录
+        max_depth: 最大层级（1 表示只列出 root 的直接子项），None 不限制
+        include_dirs: 是否产出目录条目
+        dirs_first: 同一目录内目录排在文件之前，名称不区分大小写
+        yield_ignored: 仍然产出被忽略的条目（标记 ignored=True），但不进入被忽略的目录
+
+    Yields:
+        WalkEntry
+    """
+    root_path = os.path.abspath(root)
+    ignore_files = tuple(ignore_files)
+
+    # 规则匹配使用相对 base 的路径
+    prefix = ""
+    directories = [root_path]
+    if base is not None:
+        base_path = os.path.abspath(base)
+        rel_root = os.path.relpath(root_path, base_path)
+        if rel_root != "." and not rel_root.startswith(".."):
+            prefix = Path(rel_root).as_posix()
+            directories = [base_path]
+            for part in Path(rel_root).parts:
+                directories.append(os.path.join(directories[-1], part))
+
+    matcher = IgnoreMatcher().child("", parse_ignore_lines(exclude))
+    if ignore_files:
+        for directory in directories:
+            rel_dir = os.path.relpath(directory, directories[0])
+            rel_dir = "" if rel_dir == "." else Path(rel_dir).as_posix()
+            matcher = matcher.child(rel_dir, load_ignore_rules(directory, ignore_files))
+
+    stack = [(iter(_sorted_entries(root_path, dirs_first)), "", 1, matcher)]
+    while stack:
+        entries, rel_dir, depth, matcher = stack[-1]
+        item = next(entries, None)
+        if item is None:
+            stack.pop()
+            continue
+
+        entry, is_dir = item
+        if skip_hidden and entry.name.startswith("."):
+            continue
+
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        match_path = f"{prefix}/{rel_path}" if prefix else rel_path
+        ignored = bool(matcher.layers) and matcher.is_ignored(match_path, is_dir)
+        if ignored and not yield_ignored:
+            continue
+
+        walk_entry = WalkEntry(entry.path, rel_path, depth, is_dir, entry, ignored)
+        if not is_dir:
+            yield walk_entry
+            continue
+
+        if include_dirs:
+            yield walk_entry
+
+        # 不进入被忽略的目录和符号链接目录（避免循环）
+        if (max_depth is None or depth < max_depth) and not ignored and not entry.is_symlink():
+            child = matcher
+            if ignore_files:
+                child = matcher.child(match_path, load_ignore_rules(entry.path, ignore_files))
+            stack.append((iter(_sorted_entries(entry.path, dirs_first)), rel_path, depth + 1, child))
+
+
+# glob 通配字符
+_GLOB_CHARS = frozenset("*?[")
+
+
+def split_glob(pattern: str) -> tuple[str, str]:
+    """
+    拆分 glob 模式的字面量目录前缀
+
+    例如 "src/**/*.ts" -> ("src", "**/*.ts")，"*.md" -> ("", "*.md")
+    """
+    parts = pattern.split("/")
+    literal = []
+    for part in parts[:-1]:
+        if any(ch in _GLOB_CHARS for ch in part):
+            break
+        literal.append(part)
+    return "/".join(literal), "/".join(parts[len(literal):])
+
+
+def iter_glob(
+    pattern: str,
+    root: Path,
+    *,
+    exclude: Iterable[str] = DEFAULT_EXCLUDES,
+    ignore_files: Iterable[str] = DEFAULT_IGNORE_FILES,
+) -> Iterator[tuple[str, WalkEntry]]:
+    """
+    惰性 glob（按名称先序产出，调用方可以随时停止）
+
+    只从字面量前缀目录开始遍历；模式不含 ** 时按 / 的数量限制遍历深度。
+
+    Args:
+        pattern: 相对 root 的 glob 模式
+        root: 工作目录（同时作为忽略规则的根目录）
+        exclude: 额外的排除规则
+        ignore_files: 各目录中读取的忽略文件名
+
+    Yields:
+        (相对 root 的路径, WalkEntry)
+    """
+    while pattern.startswith("./"):
+        pattern = pattern[2:]
+    prefix, rest = split_glob(pattern)
+    start = os.path.join(root, prefix) if prefix else os.fspath(root)
+    if not rest or not os.path.isdir(start):
+        return
+
+    regex = compile_glob(rest)
+    max_depth = None if "**" in rest else rest.count("/") + 1
+    for entry in walk(
+        Path(start),
+        base=root,
+        exclude=exclude,
+        ignore_files=ignore_files,
+        max_depth=max_depth,
+        include_dirs=True,
+    ):
+        if regex.fullmatch(entry.rel_path):
+            yield (f"{prefix}/{entry.rel_path}" if prefix else entry.rel_path), entry
@@ -0,0 +1,229 @@
+"""
+工具调用指标
+
+在 ALL_TOOLS 外面包一层记录器，统计每次工具调用的：
+- 墙钟耗时 / 执行线程的 CPU 耗时
+- 输入（参数 JSON）和输出的字节数
+- 抛出的异常
+
+单次调用的指标按 tool_call_id 暂存，由 stream_events 附加到 tool_result 事件；
+同时按 thread_id 聚合，便于判断一轮对话的耗时主要花在哪个工具上（只保留最近使用的
+MAX_TRACKED_THREADS 个会话，长期运行的服务和批量执行不会无限增长）。
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
+
+
+# 最多暂存多少条尚未被取走的单次调用指标
+MAX_PENDING_CALLS = 1024
+
+# 最多保留多少个会话的聚合指标（淘汰最久未记录的会话）
+MAX_TRACKED_THREADS = 1024
+
+
+@dataclass
+class ToolCallMetrics:
+    """单次工具调用的指标"""
+    tool: str
+    tool_call_id: str
+    thread_id: str
+    wall_ms: float
+    cpu_ms: float
+    bytes_in: int
+    bytes_out: int
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class ToolStats:
+    """某个工具的聚合指标"""
+    calls: int = 0
+    errors: int = 0
+    total_wall_ms: float = 0.0
+    max_wall_ms: float = 0.0
+    total_cpu_ms: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    @property
+    def mean_wall_ms(self) -> float:
+        return self.total_wall_ms / self.calls if self.calls else 0.0
+
+    def add(self, metrics: ToolCallMetrics) -> None:
+        self.calls += 1
+        self.errors += metrics.error is not None
+        self.total_wall_ms += metrics.wall_ms
+        self.max_wall_ms = max(self.max_wall_ms, metrics.wall_ms)
+        self.total_cpu_ms += metrics.cpu_ms
+        self.bytes_in += metrics.bytes_in
+        self.bytes_out += metrics.bytes_out
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["mean_wall_ms"] = self.mean_wall_ms
+        return data
+
+
+class ToolMetricsRecorder:
+    """工具调用指标记录器（线程安全）"""
+
+    def __init__(self):
+        self._pending: "OrderedDict[str, ToolCallMetrics]" = OrderedDict()
+        self._threads: "OrderedDict[str, dict[str, ToolStats]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, metrics: ToolCallMetrics) -> None:
+        """记录一次调用"""
+        with self._lock:
+            if metrics.tool_call_id:
+                self._pending[metrics.tool_call_id] = metrics
+                while len(self._pending) > MAX_PENDING_CALLS:
+                    self._pending.popitem(last=False)
+            stats = self._threads.setdefault(metrics.thread_id, {})
+            stats.setdefault(metrics.tool, ToolStats()).add(metrics)
+            self._threads.move_to_end(metrics.thread_id)
+            while len(self._threads) > MAX_TRACKED_THREADS:
+                self._threads.popitem(last=False)
+
+    def pop_call(self, tool_call_id: str) -> Optional[ToolCallMetrics]:
+        """取出某次调用的指标（用于附加到 tool_result 事件）"""
+        if not tool_call_id:
+            return None
+        with self._lock:
+            return self._pending.pop(tool_call_id, None)
+
+    def summary(self, thread_id: Optional[str] = None) -> dict[str, dict]:
+        """
+        按工具聚合的指标
+
+        Args:
+            thread_id: 会话 ID，None 表示汇总所有保留的会话
+
+        Returns:
+            {tool_name: ToolStats.to_dict()}
+        """
+        with self._lock:
+            if thread_id is not None:
+                sources = [self._threads.get(thread_id, {})]
+            else:
+                sources = list(self._threads.values())
+            merged: dict[str, ToolStats] = {}
+            for stats in sources:
+                for name, item in stats.items():
+                    target = merged.setdefault(name, ToolStats())
+                    target.calls += item.calls
+                    target.errors += item.errors
+                    target.total_wall_ms += item.total_wall_ms
+                    target.max_wall_ms = max(target.max_wall_ms, item.max_wall_ms)
+                    target.total_cpu_ms += item.total_cpu_ms
+                    target.bytes_in += item.bytes_in
+                    target.bytes_out += item.bytes_out
+        return {name: stats.to_dict() for name, stats in merged.items()}
+
+    def clear(self, thread_id: Optional[str] = None) -> None:
+        """清空指标（thread_id 为 None 时清空全部）"""
+        with self._lock:
+            if thread_id is None:
+                self._threads.clear()
+                self._pending.clear()
+            else:
+                self._threads.pop(thread_id, None)
+
+
+def _payload_size(kwargs: dict) -> int:
+    """工具参数（不含 runtime）的 JSON 字节数"""
+    payload = {k: v for k, v in kwargs.items() if k != "runtime"}
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _result_size(result: Any) -> int:
+    """工具输出的字节数"""
+    return len(str(result).encode("utf-8", errors="replace"))
+
+
+def _call_identity(kwargs: dict) -> tuple[str, str]:
+    """从注入的 runtime 中取 (tool_call_id, thread_id)"""
+    runtime = kwargs.get("runtime")
+    tool_call_id = getattr(runtime, "tool_call_id", None) or ""
+    config = getattr(runtime, "config", None) or {}
+    thread_id = (config.get("configurable") or {}).get("thread_id", "")
+    return tool_call_id, str(thread_id)
+
+
+def instrument_tool(tool: "BaseTool", recorder: ToolMetricsRecorder) -> "BaseTool":
+    """
+    返回记录指标的工具副本（原工具不变）
+
+    同步实现记录 time.thread_time()（执行线程的 CPU 时间）；
+    异步实现中 CPU 时间包含同一事件循环上其他任务的开销，仅供参考。
+    """
+    name = tool.name
+
+    def finish(kwargs: dict, started: float, cpu_started: float, result: Any, error: Optional[BaseException]) -> None:
+        tool_call_id, thread_id = _call_identity(kwargs)
+        recorder.record(ToolCallMetrics(
+            tool=name,
+            tool_call_id=tool_call_id,
+            thread_id=thread_id,
+            wall_ms=(time.perf_counter() - started) * 1000,
+            cpu_ms=(time.thread_time() - cpu_started) * 1000,
+            bytes_in=_payload_size(kwargs),
+            bytes_out=_result_size(result) if error is None else 0,
+            error=None if error is None else f"{type(error).__name__}: {error}",
+        ))
+
+    update = {}
+
+    if getattr(tool, "func", None) is not None:
+        func = tool.func
+
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                finish(kwargs, started, cpu_started, None, e)
+                raise
+            finish(kwargs, started, cpu_started, result, None)
+            return result
+
+        update["func"] = timed_func
+
+    if getattr(tool, "coroutine", None) is not None:
+        coroutine = tool.coroutine
+
+        @functools.wraps(coroutine)
+        async def timed_coroutine(*args, **kwargs):
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                result = await coroutine(*args, **kwargs)
+            except BaseException as e:
+                finish(kwargs, started, cpu_started, None, e)
+                raise
+            finish(kwargs, started, cpu_started, result, None)
+            return result
+
+        update["coroutine"] = timed_coroutine
+
+    return tool.model_copy(update=update) if update else tool
+
+
+def instrument_tools(tools: list["BaseTool"], recorder: ToolMetricsRecorder) -> list["BaseTool"]:
+    """为一组工具添加指标记录"""
+    return [instrument_tool(tool, recorder) for tool in tools]
@@ -0,0 +1,225 @@
+"""
+进程级模型 / HTTP 客户端注册表
+
+每个 LangChainSkillsAgent 都会调用 init_chat_model，默认各自创建 SDK 客户端和连接池；
+示例和批处理脚本创建多个 Agent 时会反复进行 TLS 握手。这里在进程内共享：
+- 模型实例：按 (ModelConfig, init kwargs) 缓存，配置相同的 Agent 复用同一个模型
+- HTTP 连接池：OpenAI 模型共用一对 SDK HTTP 客户端（同步 / 异步，通过 http_client /
+  http_async_client 参数传入），连接数显式配置，keep-alive 连接跨 Agent 复用；安装 h2 时可启用 HTTP/2
+
+ChatAnthropic 没有传入 HTTP 客户端的参数，这里不为它共享连接池；langchain-anthropic
+自己按 (base_url, timeout, proxy) 在进程内缓存 HTTP 客户端，相同配置的模型已经复用连接。
+
+进程退出前可调用 close_model_registry() 释放连接。
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .env import env_number
+
+
+# 使用共享连接池的 provider 及其 SDK 模块
+_SDK_MODULES = {"openai": "openai"}
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    """
+    共享 HTTP 连接池配置
+
+    Attributes:
+        max_connections: 最大连接数
+        max_keepalive_connections: 最多保留的空闲 keep-alive 连接数
+        keepalive_expiry: 空闲连接保留秒数
+        http2: 是否启用 HTTP/2（需要安装 h2，未安装时回退到 HTTP/1.1）
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "HttpPoolConfig":
+        """
+        从环境变量读取配置
+
+        - SKILLS_HTTP_MAX_CONNECTIONS: 最大连接数
+        - SKILLS_HTTP_MAX_KEEPALIVE: 最多保留的空闲连接数
+        - SKILLS_HTTP_KEEPALIVE_EXPIRY: 空闲连接保留秒数
+        - SKILLS_HTTP2: 是否启用 HTTP/2
+        """
+        return cls(
+            max_connections=env_number("SKILLS_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=env_number("SKILLS_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_number("SKILLS_HTTP_KEEPALIVE_EXPIRY", 30.0, float),
+            http2=os.getenv("SKILLS_HTTP2", "false").lower() in ("1", "true", "yes", "on"),
+        )
+
+    def client_kwargs(self, client_cls: type) -> dict:
+        """
+        SDK HTTP 客户端的构造参数
+
+        Args:
+            client_cls: SDK 的 DefaultHttpxClient / DefaultAsyncHttpxClient，
+                Limits 取自它所基于的 HTTP 库（不同 SDK 版本基于 httpx 或其分支）
+        """
+        http_lib = importlib.import_module(client_cls.__mro__[1].__module__.partition(".")[0])
+        return {
+            "limits": http_lib.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "http2": self.http2 and importlib.util.find_spec("h2") is not None,
+        }
+
+
+def _kwargs_key(init_kwargs: dict) -> str:
+    """init kwargs 的稳定表示（用作缓存键）"""
+    return json.dumps(init_kwargs, sort_keys=True, ensure_ascii=False, default=repr)
+
+
+class ModelRegistry:
+    """
+    模型实例与 HTTP 客户端注册表（线程安全）
+
+    用法:
+        registry = get_model_registry()
+        model = registry.get_chat_model(config, init_kwargs, factory=init_chat_model)
+        ...
+        registry.close()
+    """
+
+    def __init__(self, pool: Optional[HttpPoolConfig] = None):
+        self.pool = pool or HttpPoolConfig.from_env()
+        self._models: dict[tuple[Any, str], Any] = {}
+        self._http_clients: dict[str, Any] = {}
+        self._async_http_clients: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def http_client(self, provider: str) -> Any:
+        """provider 共享的同步 HTTP 客户端（首次使用时创建）"""
+        with self._lock:
+            client = self._http_clients.get(provider)
+            if client is None or client.is_closed:
+                client_cls = importlib.import_module(_SDK_MODULES[provider]).DefaultHttpxClient
+                client = self._http_clients[provider] = client_cls(**self.pool.client_kwargs(client_cls))
+            return client
+
+    def async_http_client(self, provider: str) -> Any:
+        """provider 共享的异步 HTTP 客户端（首次使用时创建）"""
+        with self._lock:
+            client = self._async_http_clients.get(provider)
+            if client is None or client.is_closed:
+                client_cls = importlib.import_module(_SDK_MODULES[provider]).DefaultAsyncHttpxClient
+                client = self._async_http_clients[provider] = client_cls(**self.pool.client_kwargs(client_cls))
+            return client
+
+    def get_chat_model(self, config: Any, init_kwargs: dict, factory: Callable[..., Any]) -> Any:
+        """
+        获取（或创建）模型实例
+
+        Args:
+            config: 模型配置（可哈希，通常为 ModelConfig）
+            init_kwargs: 传给 factory 的参数（不含模型名）
+            factory: 模型构造函数，调用方式为 factory(config.model, **kwargs)
+
+        Returns:
+            模型实例；配置与参数相同时返回同一个实例
+        """
+        key = (config, _kwargs_key(init_kwargs))
+        with self._lock:
+            model = self._models.get(key)
+        if model is not None:
+            return model
+
+        kwargs = dict(init_kwargs)
+        provider = kwargs.get("model_provider")
+        if provider == "openai":
+            kwargs.setdefault("http_client", self.http_client(provider))
+            kwargs.setdefault("http_async_client", self.async_http_client(provider))
+
+        model = factory(config.model, **kwargs)
+
+        with self._lock:
+            # 并发创建时以先写入的为准
+            return self._models.setdefault(key, model)
+
+    def clear(self) -> None:
+        """丢弃缓存的模型实例（HTTP 客户端保留）"""
+        with self._lock:
+            self._models.clear()
+
+    def _take_clients(self) -> tuple[list, list]:
+        """取出全部 HTTP 客户端并丢弃缓存的模型"""
+        with self._lock:
+            self._models.clear()
+            clients = list(self._http_clients.values())
+            async_clients = list(self._async_http_clients.values())
+            self._http_clients.clear()
+            self._async_http_clients.clear()
+        return clients, async_clients
+
+    def close(self) -> None:
+        """关闭 HTTP 客户端并丢弃缓存的模型"""
+        clients, async_clients = self._take_clients()
+        for client in clients:
+            client.close()
+        for client in async_clients:
+            _close_async_client(client)
+
+    async def aclose(self) -> None:
+        """在事件循环中关闭 HTTP 客户端"""
+        clients, async_clients = self._take_clients()
+        for client in clients:
+            client.close()
+        for client in async_clients:
+            await client.aclose()
+
+
+def _close_async_client(client: Any) -> None:
+    """在同步代码中关闭异步客户端（有运行中的事件循环时交给它关闭）"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    try:
+        if loop is not None:
+            loop.create_task(client.aclose())
+        else:
+            asyncio.run(client.aclose())
+    except Exception:
+        # 连接所属的事件循环已关闭时无需再释放
+        pass
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """获取进程级注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+def close_model_registry() -> None:
+    """关闭进程级注册表（释放连接池，下次使用时重新创建）"""
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        registry.close()
@@ -0,0 +1,160 @@
+"""
+模型流录制与回放
+
+录制：stream_events(record=...) 把 agent.stream(stream_mode="messages") 产出的每个原始消息
+（AIMessageChunk / ToolMessage）连同相对时间写入 JSONL 文件，每行一条，省略空字段。
+
+回放：replay_events() 按原始节奏（或加速 / 不等待）把录制的消息重新送入 stream_events 的
+事件处理链路（_process_chunk_content、ToolCallTracker、事件字典 / SSE），不调用模型和工具，
+可以用真实的 Anthropic / OpenAI 流建立基准测试和回归测试语料。
+
+文件格式：
+
+    {"version": 1, "provider": "anthropic", "model": "...", "message": "...", "recorded_at": "..."}
+    {"t": 0.412, "type": "AIMessageChunk", "data": {"content": [...], ...}}
+    {"t": 1.038, "type": "tool", "data": {"content": "...", "tool_call_id": "...", "name": "list_dir"}}
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, AsyncIterator, Iterator, Optional, Union
+
+RECORDING_VERSION = 1
+
+
+def _compact(data: dict) -> dict:
+    """去掉空字段（None / 空列表 / 空字典），减小文件体积"""
+    return {key: value for key, value in data.items() if value not in (None, [], {}, "")}
+
+
+def _message_record(message: Any, elapsed: float) -> dict:
+    from langchain_core.messages import message_to_dict
+
+    record = message_to_dict(message)
+    data = _compact(record["data"])
+    data["content"] = record["data"].get("content", "")
+    data.pop("type", None)
+    # tool_calls 由 tool_call_chunks 推导，回放时自动重建
+    if data.get("tool_call_chunks"):
+        data.pop("tool_calls", None)
+    return {"t": round(elapsed, 4), "type": record["type"], "data": data}
+
+
+@dataclass
+class Recording:
+    """
+    一次录制
+
+    Attributes:
+        header: 录制信息（provider / model / 用户消息 / 录制时间）
+        messages: (相对开始时间的秒数, 消息) 列表
+    """
+    header: dict = field(default_factory=dict)
+    messages: list[tuple[float, Any]] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.messages[-1][0] if self.messages else 0.0
+
+
+class StreamRecorder:
+    """
+    把原始流式消息写入 JSONL 文件
+
+    用法:
+        with StreamRecorder("run.jsonl", provider="anthropic", model="...") as recorder:
+            for message, metadata in agent.stream(..., stream_mode="messages"):
+                recorder.write(message)
+    """
+
+    def __init__(self, path: Union[str, Path], **header: Any):
+        self.path = Path(path)
+        self.header = {
+            "version": RECORDING_VERSION,
+            **header,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.count = 0
+        self._file: Optional[IO[str]] = None
+        self._started = 0.0
+
+    def open(self) -> "StreamRecorder":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("w", encoding="utf-8")
+        self._file.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+        self._started = time.perf_counter()
+        return self
+
+    def write(self, message: Any) -> None:
+        """写入一条消息（只记录 AI / 工具消息，其余忽略）"""
+        if self._file is None or getattr(message, "type", None) not in ("AIMessageChunk", "ai", "tool"):
+            return
+        record = _message_record(message, time.perf_counter() - self._started)
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "StreamRecorder":
+        return self.open()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def load_recording(path: Union[str, Path]) -> Recording:
+    """读取录制文件"""
+    from langchain_core.messages import messages_from_dict
+
+    recording = Recording()
+    with Path(path).open(encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if line_no == 1 and "version" in record:
+                if record["version"] > RECORDING_VERSION:
+                    raise ValueError(f"Unsupported recording version {record['version']}: {path}")
+                recording.header = record
+                continue
+            message = messages_from_dict([{"type": record["type"], "data": record["data"]}])[0]
+            recording.messages.append((float(record.get("t", 0.0)), message))
+    return recording
+
+
+def _delays(recording: Recording, speed: float) -> Iterator[tuple[float, Any]]:
+    """(回放前需要等待的秒数, 消息)；speed <= 0 时不等待"""
+    previous = 0.0
+    for elapsed, message in recording.messages:
+        delay = (elapsed - previous) / speed if speed > 0 else 0.0
+        previous = elapsed
+        yield max(delay, 0.0), message
+
+
+def replay_messages(recording: Recording, speed: float = 1.0) -> Iterator[Any]:
+    """
+    按录制节奏产出消息
+
+    Args:
+        recording: 录制内容
+        speed: 回放倍速（1.0 为原速，<= 0 表示不等待）
+    """
+    for delay, message in _delays(recording, speed):
+        if delay:
+            time.sleep(delay)
+        yield message
+
+
+async def areplay_messages(recording: Recording, speed: float = 1.0) -> AsyncIterator[Any]:
+    """replay_messages 的异步版本"""
+    for delay, message in _delays(recording, speed):
+        if delay:
+            await asyncio.sleep(delay)
+        yield message
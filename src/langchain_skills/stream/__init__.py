@@ -6,6 +6,7 @@ Stream 子模块 - 流式事件处理
 - ToolCallTracker: 工具调用追踪器
 - ToolResultFormatter: 工具结果格式化器
 - 工具函数: has_args, is_success, resolve_path, truncate, get_status_symbol
+- 输出压缩: compact_output, strip_ansi, collapse_carriage_returns, dedupe_lines
 - 常量: SUCCESS_PREFIX, FAILURE_PREFIX, DisplayLimits
 """
 
@@ -27,6 +28,15 @@ from .utils import (
     truncate_with_line_hint,
     get_status_symbol,
 )
+from .compact import (
+    DEFAULT_OUTPUT_TOKEN_BUDGET,
+    compact_output,
+    strip_ansi,
+    collapse_carriage_returns,
+    dedupe_lines,
+    estimate_tokens,
+    truncate_to_budget,
+)
 
 __all__ = [
     # Emitter
@@ -53,4 +63,12 @@ __all__ = [
     "count_lines",
     "truncate_with_line_hint",
     "get_status_symbol",
+    # Compact
+    "DEFAULT_OUTPUT_TOKEN_BUDGET",
+    "compact_output",
+    "strip_ansi",
+    "collapse_carriage_returns",
+    "dedupe_lines",
+    "estimate_tokens",
+    "truncate_to_budget",
 ]
@@ -0,0 +1,176 @@
+"""
+工具输出压缩管线
+
+工具结果在进入模型上下文之前经过统一压缩，减少无效 token：
+1. 去除 ANSI 转义序列（颜色、光标控制）
+2. 折叠 \\r 重绘（进度条只保留最终状态）
+3. 连续重复行去重并标注次数
+4. 超出 token 预算时保留头部和尾部，省略中间部分
+"""
+
+import re
+
+
+# 默认的单次工具输出 token 预算
+DEFAULT_OUTPUT_TOKEN_BUDGET = 8000
+
+# 连续重复达到该次数才折叠（两行相同通常是正常输出）
+DEDUPE_MIN_REPEAT = 3
+
+# 超出预算时头部所占比例，其余留给尾部（错误信息通常在末尾）
+HEAD_RATIO = 0.6
+
+# CSI 序列 / OSC 序列 / 其它两字节 ESC 序列
+_ANSI_ESCAPE_RE = re.compile(
+    r"\x1b\[[0-?]*[ -/]*[@-~]"
+    r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"
+    r"|\x1b[@-Z\\-_]"
+)
+
+
+def strip_ansi(text: str) -> str:
+    """去除 ANSI 转义序列"""
+    if "\x1b" not in text:
+        return text
+    return _ANSI_ESCAPE_RE.sub("", text)
+
+
+def collapse_carriage_returns(text: str) -> str:
+    """
+    折叠 \\r 重绘
+
+    终端中 \\r 会把光标移回行首，后续内容覆盖前面的内容。
+    进度条大量使用这种方式，这里只保留每行最后一次重绘的结果。
+    """
+    if "\r" not in text:
+        return text
+
+    lines = []
+    for line in text.split("\n"):
+        # \r\n 换行只是行尾标记
+        line = line.rstrip("\r")
+        if "\r" in line:
+            segments = [seg for seg in line.split("\r") if seg]
+            line = segments[-1] if segments else ""
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def dedupe_lines(text: str, min_repeat: int = DEDUPE_MIN_REPEAT) -> str:
+    """
+    折叠连续重复的行
+
+    Args:
+        text: 输入文本
+        min_repeat: 连续出现至少多少次才折叠
+
+    Returns:
+        折叠后的文本，重复行保留一次并标注省略的次数
+    """
+    lines = text.split("\n")
+    result = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        j = i + 1
+        while j < len(lines) and lines[j] == line:
+            j += 1
+        count = j - i
+        if count >= min_repeat:
+            result.append(line)
+            result.append(f"... (previous line repeated {count - 1} more times)")
+        else:
+            result.extend(lines[i:j])
+        i = j
+    return "\n".join(result)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算 token 数
+
+    ASCII 约 4 字符 / token，CJK 等非 ASCII 字符约 1 字符 / token。
+    """
+    if not text:
+        return 0
+    non_ascii = len(text) - len(text.encode("ascii", errors="ignore"))
+    ascii_count = len(text) - non_ascii
+    return (ascii_count + 3) // 4 + non_ascii
+
+
+def _take_within(lines: list[str], max_tokens: int) -> list[str]:
+    """按顺序取行，直到达到 token 预算"""
+    taken = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1  # +1 近似换行符
+        if used + cost > max_tokens:
+            break
+        taken.append(line)
+        used += cost
+    return taken
+
+
+def _take_chars(text: str, max_tokens: int) -> str:
+    """按字符取前缀，直到达到 token 预算"""
+    used = 0.0
+    for i, char in enumerate(text):
+        used += 0.25 if char.isascii() else 1
+        if used > max_tokens:
+            return text[:i]
+    return text
+
+
+def truncate_to_budget(text: str, max_tokens: int) -> str:
+    """
+    在 token 预算内保留头部和尾部
+
+    Args:
+        text: 输入文本
+        max_tokens: token 预算
+
+    Returns:
+        未超预算时原样返回；否则返回 头部 + 省略提示 + 尾部
+    """
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+
+    lines = text.split("\n")
+    head = _take_within(lines, int(max_tokens * HEAD_RATIO))
+    tail = _take_within(list(reversed(lines[len(head):])), max_tokens - int(max_tokens * HEAD_RATIO))
+    tail.reverse()
+
+    if not head and not tail:
+        # 单行超长：按字符截断
+        head_text = _take_chars(text, max_tokens // 2)
+        tail_text = _take_chars(text[::-1], max_tokens // 2)[::-1]
+        omitted = len(text) - len(head_text) - len(tail_text)
+        return f"{head_text}\n... ({omitted} chars omitted) ...\n{tail_text}"
+
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"... ({omitted} lines omitted) ..."] + tail)
+
+
+def compact_output(
+    text: str,
+    max_tokens: int = DEFAULT_OUTPUT_TOKEN_BUDGET,
+    clean: bool = True,
+    dedupe: bool = True,
+) -> str:
+    """
+    工具输出压缩管线
+
+    Args:
+        text: 原始工具输出
+        max_tokens: token 预算（<= 0 表示不限制）
+        clean: 是否去除 ANSI 序列并折叠 \\r 重绘
+        dedupe: 是否折叠连续重复行
+
+    Returns:
+        压缩后的文本
+    """
+    if clean:
+        text = collapse_carriage_returns(strip_ansi(text))
+    if dedupe:
+        text = dedupe_lines(text)
+    return truncate_to_budget(text, max_tokens)
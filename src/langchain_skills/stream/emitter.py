@@ -5,7 +5,7 @@ StreamEventEmitter - 统一事件格式
 """
 
 from dataclasses import dataclass
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -34,19 +34,46 @@ class StreamEventEmitter:
         return StreamEvent("tool_call", {"type": "tool_call", "name": name, "args": args, "id": tool_id})
 
     @staticmethod
-    def tool_result(name: str, content: str, success: bool = True) -> StreamEvent:
-        """工具结果事件"""
-        return StreamEvent("tool_result", {
+    def tool_result(
+        name: str,
+        content: str,
+        success: bool = True,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> StreamEvent:
+        """工具结果事件（metrics 为该次调用的耗时 / 字节数等指标，可选）"""
+        data = {
             "type": "tool_result",
             "name": name,
             "content": content,
             "success": success,
+        }
+        if metrics is not None:
+            data["metrics"] = metrics
+        return StreamEvent("tool_result", data)
+
+    @staticmethod
+    def done(response: str = "", usage: Optional[Dict[str, int]] = None) -> StreamEvent:
+        """完成事件（usage 为本轮 token 用量，可选）"""
+        data = {"type": "done", "response": response}
+        if usage:
+            data["usage"] = usage
+        return StreamEvent("done", data)
+
+    @staticmethod
+    def budget_exceeded(limit: str, value: float, used: float, message: str) -> StreamEvent:
+        """单轮预算耗尽事件（limit 为超出的预算项，value / used 为上限和用量）"""
+        return StreamEvent("budget_exceeded", {
+            "type": "budget_exceeded",
+            "limit": limit,
+            "value": value,
+            "used": used,
+            "message": message,
         })
 
     @staticmethod
-    def done(response: str = "") -> StreamEvent:
-        """完成事件"""
-        return StreamEvent("done", {"type": "done", "response": response})
+    def cancelled(reason: str = "cancelled") -> StreamEvent:
+        """本轮已取消事件"""
+        return StreamEvent("cancelled", {"type": "cancelled", "reason": reason})
 
     @staticmethod
     def error(message: str) -> StreamEvent:
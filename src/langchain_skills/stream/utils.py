@@ -200,6 +200,11 @@ def format_tool_compact(name: str, args: dict | None) -> str:
                 path = ".../" + "/".join(parts[-2:])  # 统一使用 / 显示
         return f"Edit({path})"
 
+    elif name_lower == "multi_edit":
+        edits = args.get("edits") or []
+        files = {e.get("file_path", "") for e in edits if isinstance(e, dict)}
+        return f"MultiEdit({len(edits)} edits, {len(files)} files)"
+
     elif name_lower == "glob":
         pattern = args.get("pattern", "")
         if len(pattern) > 40:
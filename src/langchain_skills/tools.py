@@ -9,18 +9,67 @@ LangChain Tools 定义
 ToolRuntime 提供访问运行时信息的统一接口：
 - state: 可变的执行状态
 - context: 不可变的配置（如 skill_loader）
+
+每个工具同时注册同步实现（func）和异步实现（coroutine）。
 """
 
+import asyncio
+import contextvars
+import functools
+import hashlib
+import heapq
+import locale
+import os
 import subprocess
+import threading
 import fnmatch
 import re
+import signal
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from itertools import islice
+from typing import Literal, NotRequired, Optional, TypedDict
 
 from langchain.tools import tool, ToolRuntime
 
 from .skill_loader import SkillLoader
-from .stream import resolve_path
+from .budget import current_tracker, tool_timeout
+from .cancellation import current_cancel_token
+from .env import env_number
+from .stream import resolve_path, compact_output, collapse_carriage_returns, DEFAULT_OUTPUT_TOKEN_BUDGET
+from .fs import (
+    LineWindow,
+    FileKind,
+    read_line_window,
+    classify_file,
+    search,
+    iter_search_files,
+    get_trigram_index,
+    update_indexed_files,
+    DEFAULT_EXCLUDES,
+    walk,
+    iter_glob,
+    stage_write,
+    commit_staged,
+    discard_staged,
+    atomic_write_text,
+    append_bytes,
+    encode_chunks,
+    file_sha256,
+    CachedText,
+    FileContentCache,
+)
+
+
+# read_file 默认每次读取的行数
+DEFAULT_READ_LIMIT = 2000
+
+# bash 命令超时（秒）
+BASH_TIMEOUT = 300
+
+# POSIX 上命令在独立的进程组中运行，超时 / 取消时连同它启动的子进程一起终止
+_PROCESS_GROUP_KWARGS = {"start_new_session": True} if os.name != "nt" else {}
 
 
 @dataclass
@@ -32,6 +81,56 @@ class SkillAgentContext:
     """
     skill_loader: SkillLoader
     working_directory: Path = field(default_factory=Path.cwd)
+    # 单次工具输出进入模型上下文前的 token 预算
+    max_output_tokens: int = DEFAULT_OUTPUT_TOKEN_BUDGET
+    # grep 是否使用工作目录的持久化 trigram 索引
+    use_trigram_index: bool = False
+    # glob / grep 遍历时的排除规则（gitignore 语法，.gitignore / .ignore 之外的补充）
+    walk_excludes: tuple[str, ...] = DEFAULT_EXCLUDES
+    # read_file / grep / edit 共享的文件内容缓存
+    file_cache: FileContentCache = field(default_factory=FileContentCache)
+
+
+def _notify_file_written(
+    runtime: ToolRuntime[SkillAgentContext],
+    path: Path,
+    text: Optional[str] = None,
+    kind: Optional[FileKind] = None,
+) -> None:
+    """
+    文件写入后同步更新内容缓存和 trigram 索引
+
+    Args:
+        text: 写入后的完整文本（与磁盘内容一致）；None 表示未知，缓存直接失效
+        kind: 文本的编码信息；None 时重新嗅探
+    """
+    cache = runtime.context.file_cache
+    if text is None:
+        cache.invalidate(path)
+    else:
+        kind = kind or classify_file(path)
+        if kind.is_binary:
+            cache.invalidate(path)
+        else:
+            cache.put(path, text, kind)
+
+    if runtime.context.use_trigram_index:
+        update_indexed_files(runtime.context.working_directory, [path])
+
+
+def _read_cached_text(runtime: ToolRuntime[SkillAgentContext], path: Path) -> Optional[CachedText]:
+    """通过内容缓存读取文本；大文件或无法严格解码时返回 None"""
+    try:
+        return runtime.context.file_cache.read(path)
+    except UnicodeDecodeError:
+        return None
+
+
+def _read_for_edit(runtime: ToolRuntime[SkillAgentContext], path: Path, kind: FileKind) -> str:
+    """读取待编辑文件的文本（换行统一为 \\n，与文本模式读取一致）"""
+    cached = runtime.context.file_cache.read(path)
+    content = cached.text if cached is not None else path.read_bytes().decode(kind.encoding)
+    return content.replace("\r\n", "\n").replace("\r", "\n")
 
 
 @tool
@@ -115,49 +214,117 @@ def bash(command: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         command: The shell command to execute
     """
     cwd = str(runtime.context.working_directory)
+    timeout, limited_by_turn = tool_timeout(BASH_TIMEOUT)
 
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             command,
             shell=True,
             cwd=cwd,
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 分钟超时
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **_PROCESS_GROUP_KWARGS,
         )
+        token, callback_id = _kill_on_cancel(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill_process_tree(process)
+            process.communicate()
+            return _bash_timeout_message(limited_by_turn)
+        except BaseException:
+            _kill_process_tree(process)
+            process.communicate()
+            raise
+        finally:
+            if token is not None:
+                token.remove_callback(callback_id)
+        if token is not None and token.cancelled:
+            return _BASH_CANCELLED_MESSAGE
+        return _format_bash_result(
+            process.returncode,
+            _decode_process_output(stdout),
+            _decode_process_output(stderr),
+            runtime,
+        )
+
+    except Exception as e:
+        return f"[FAILED] {str(e)}"
 
-        parts = []
 
-        # 状态标记（与 ToolResultFormatter 配合）
-        if result.returncode == 0:
-            parts.append("[OK]")
+def _kill_process_tree(process) -> None:
+    """终止 bash 命令及其子进程（subprocess.Popen / asyncio.subprocess.Process）"""
+    try:
+        if os.name != "nt":
+            os.killpg(process.pid, signal.SIGKILL)
         else:
-            parts.append(f"[FAILED] Exit code: {result.returncode}")
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
 
-        parts.append("")  # 空行分隔
 
-        if result.stdout:
-            parts.append(result.stdout.rstrip())
+_BASH_CANCELLED_MESSAGE = "[FAILED] Command cancelled: the turn was cancelled."
 
-        if result.stderr:
-            if result.stdout:
-                parts.append("")
-            parts.append("--- stderr ---")
-            parts.append(result.stderr.rstrip())
 
-        if not result.stdout and not result.stderr:
-            parts.append("(no output)")
+def _kill_on_cancel(process):
+    """本轮被取消时终止命令（返回取消令牌和回调编号，不在可取消的运行中时令牌为 None）"""
+    token = current_cancel_token()
+    if token is None:
+        return None, None
+    return token, token.add_callback(lambda: _kill_process_tree(process))
 
-        return "\n".join(parts)
 
-    except subprocess.TimeoutExpired:
-        return "[FAILED] Command timed out after 300 seconds."
-    except Exception as e:
-        return f"[FAILED] {str(e)}"
+def _bash_timeout_message(limited_by_turn: bool) -> str:
+    """bash 超时的结果；受本轮截止时间限制时记录预算超出"""
+    if limited_by_turn:
+        exceeded = current_tracker().time_exceeded()
+        return (
+            f"[FAILED] Command cancelled: the turn reached its wall time budget "
+            f"({exceeded.value:g} seconds)."
+        )
+    return f"[FAILED] Command timed out after {BASH_TIMEOUT} seconds."
+
+
+def _format_bash_result(
+    returncode: int,
+    stdout: str,
+    stderr: str,
+    runtime: ToolRuntime[SkillAgentContext],
+) -> str:
+    """格式化命令输出（同步 / 异步实现共用）"""
+    parts = []
+
+    # 状态标记（与 ToolResultFormatter 配合）
+    if returncode == 0:
+        parts.append("[OK]")
+    else:
+        parts.append(f"[FAILED] Exit code: {returncode}")
+
+    parts.append("")  # 空行分隔
+
+    if stdout:
+        parts.append(stdout.rstrip())
+
+    if stderr:
+        if stdout:
+            parts.append("")
+        parts.append("--- stderr ---")
+        parts.append(stderr.rstrip())
+
+    if not stdout and not stderr:
+        parts.append("(no output)")
+
+    # 去除 ANSI / 进度条重绘 / 重复行，并限制在 token 预算内
+    return compact_output("\n".join(parts), runtime.context.max_output_tokens)
 
 
 @tool
-def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def read_file(
+    file_path: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    offset: int = 1,
+    limit: int = DEFAULT_READ_LIMIT,
+) -> str:
     """
     Read the contents of a file.
 
@@ -166,8 +333,13 @@ def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     - View script output files
     - Inspect any text file
 
+    Large files can be read in windows: pass `offset` to start at a given
+    line and `limit` to control how many lines are returned.
+
     Args:
         file_path: Path to the file (absolute or relative to working directory)
+        offset: Line number to start reading from (1-based, default 1)
+        limit: Maximum number of lines to read (default 2000)
     """
     path = resolve_path(file_path, runtime.context.working_directory)
 
@@ -178,27 +350,82 @@ def read_file(file_path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         return f"[Error] Not a file: {file_path}"
 
     try:
-        content = path.read_text(encoding="utf-8")
-        lines = content.split("\n")
+        # 只读取文件开头几 KB 判断是否为二进制及编码
+        kind = classify_file(path)
+        if kind.is_binary:
+            return f"[Error] Cannot read binary file ({kind.reason}): {file_path}"
+
+        # 小文件走共享内容缓存，大文件用 mmap 窗口
+        cached = _read_cached_text(runtime, path)
+        if cached is not None:
+            window = _text_window(cached.text, offset, limit)
+        else:
+            window = _read_text_window(path, kind, offset, limit)
+
+        if not window.lines:
+            total = f" (file has {window.total_lines} lines)" if window.total_lines else ""
+            return f"[Error] Offset {offset} is beyond end of file{total}: {file_path}"
 
         # 添加行号
         numbered_lines = []
-        for i, line in enumerate(lines[:2000], 1):  # 限制行数
+        for i, line in enumerate(window.lines, window.start_line):
             numbered_lines.append(f"{i:4d}| {line}")
 
-        if len(lines) > 2000:
-            numbered_lines.append(f"... ({len(lines) - 2000} more lines)")
-
-        return "\n".join(numbered_lines)
+        if window.has_more:
+            remaining = (
+                f"{window.total_lines - window.end_line} more lines"
+                if window.total_lines is not None
+                else "more lines"
+            )
+            numbered_lines.append(f"... ({remaining}, use offset={window.end_line + 1} to continue)")
+
+        # 文件内容保持原样，只做 token 预算截断
+        return compact_output(
+            "\n".join(numbered_lines),
+            runtime.context.max_output_tokens,
+            clean=False,
+            dedupe=False,
+        )
 
-    except UnicodeDecodeError:
-        return f"[Error] Cannot read file (binary or unknown encoding): {file_path}"
     except Exception as e:
         return f"[Error] Failed to read file: {str(e)}"
 
 
+def _read_text_window(path: Path, kind: FileKind, offset: int, limit: int) -> LineWindow:
+    """读取文本行窗口，返回的 lines 为解码后的 str"""
+    if kind.line_addressable:
+        # mmap + 行偏移索引，只读取请求的窗口
+        window = read_line_window(path, offset=offset, limit=limit)
+        window.lines = [
+            line.decode(kind.encoding, errors="replace").rstrip("\r") for line in window.lines
+        ]
+        return window
+
+    # UTF-16/32 无法按字节切分行，整体解码
+    return _text_window(path.read_bytes().decode(kind.encoding, errors="replace"), offset, limit)
+
+
+def _text_window(text: str, offset: int, limit: int) -> LineWindow:
+    """从已解码的文本中截取行窗口"""
+    lines = text.split("\n")
+    start = max(offset, 1) - 1
+    stop = start + max(limit, 1)
+    return LineWindow(
+        start_line=start + 1,
+        lines=[line.rstrip("\r") for line in lines[start:stop]],
+        has_more=stop < len(lines),
+        total_lines=len(lines),
+    )
+
+
 @tool
-def write_file(file_path: str, content: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def write_file(
+    file_path: str,
+    content: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    mode: Literal["overwrite", "append"] = "overwrite",
+    include_hash: bool = False,
+) -> str:
     """
     Write content to a file.
 
@@ -206,26 +433,55 @@ def write_file(file_path: str, content: str, runtime: ToolRuntime[SkillAgentCont
     - Save generated content
     - Create new files
     - Modify existing files
+    - Build a large file incrementally (mode="append", one chunk per call)
 
     Args:
         file_path: Path to the file (absolute or relative to working directory)
         content: Content to write to the file
+        mode: "overwrite" (default) replaces the file atomically; "append" adds content to the end
+        include_hash: Include the sha256 of the resulting file in the result
     """
     path = resolve_path(file_path, runtime.context.working_directory)
 
     try:
-        # 确保父目录存在
-        path.parent.mkdir(parents=True, exist_ok=True)
-
-        path.write_text(content, encoding="utf-8")
-        return f"[Success] File written: {path}"
+        if mode == "append":
+            size = append_bytes(path, encode_chunks(content))
+            _notify_file_written(runtime, path)  # 追加后缓存失效
+            suffix = f" (sha256: {file_sha256(path)})" if include_hash else ""
+            return f"[Success] Appended {size} bytes to file: {path}{suffix}"
+
+        # 分块编码计算大小和哈希，不在内存中保留完整的编码结果
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in encode_chunks(content):
+            digest.update(chunk)
+            size += len(chunk)
+        content_hash = digest.hexdigest()
+        suffix = f" (sha256: {content_hash})" if include_hash else ""
+
+        # 内容完全相同时跳过重写
+        if path.is_file() and path.stat().st_size == size and file_sha256(path) == content_hash:
+            return f"[Success] File unchanged (identical content): {path}{suffix}"
+
+        # 临时文件 + fsync + rename，写入中途崩溃不会留下截断文件（父目录自动创建）
+        commit_staged(stage_write(path, encode_chunks(content)), path)
+        _notify_file_written(runtime, path, text=content)
+        return f"[Success] File written: {path}{suffix}"
 
     except Exception as e:
         return f"[Error] Failed to write file: {str(e)}"
 
 
+# glob 名称排序时，超出返回数量后最多再计数多少条匹配（超过则不报告总数）
+GLOB_COUNT_BUDGET = 10000
+
+
 @tool
-def glob(pattern: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def glob(
+    pattern: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    sort_by: Literal["name", "mtime"] = "name",
+) -> str:
     """
     Find files matching a glob pattern.
 
@@ -233,34 +489,53 @@ def glob(pattern: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     - Find files by name pattern (e.g., "**/*.py" for all Python files)
     - List files in a directory with wildcards
     - Discover project structure
+    - Find recently changed files (sort_by="mtime")
 
     Args:
         pattern: Glob pattern (e.g., "**/*.py", "src/**/*.ts", "*.md")
+        sort_by: "name" (default) or "mtime" for most recently modified first
     """
     cwd = runtime.context.working_directory
+    max_results = 100
+
+    if Path(pattern).is_absolute():
+        return "[FAILED] Non-relative patterns are unsupported"
 
     try:
-        # 使用 Path.glob 进行匹配
-        matches = sorted(cwd.glob(pattern))
+        # 惰性遍历（遵守 .gitignore 和排除规则），拿够结果即停止
+        matches = iter_glob(pattern, cwd, exclude=runtime.context.walk_excludes)
+
+        if sort_by == "mtime":
+            # 需要看到全部匹配，用有界堆取最近修改的 max_results 条，总数顺带得到
+            total = 0
+
+            def counted_mtimes():
+                nonlocal total
+                for rel_path, entry in matches:
+                    total += 1
+                    try:
+                        mtime = entry.stat().st_mtime
+                    except OSError:
+                        mtime = 0.0
+                    yield mtime, rel_path
+
+            shown = [rel_path for _, rel_path in heapq.nlargest(max_results, counted_mtimes())]
+            remaining = total - len(shown)
+        else:
+            shown = [rel_path for rel_path, _ in islice(matches, max_results)]
+            # 剩余数量只在计数代价可控时报告
+            extra = sum(1 for _ in islice(matches, GLOB_COUNT_BUDGET + 1))
+            remaining = extra if extra <= GLOB_COUNT_BUDGET else None
 
-        if not matches:
+        if not shown:
             return f"No files matching pattern: {pattern}"
 
-        # 限制返回数量
-        max_results = 100
-        result_lines = []
-
-        for path in matches[:max_results]:
-            try:
-                rel_path = path.relative_to(cwd)
-                result_lines.append(str(rel_path))
-            except ValueError:
-                result_lines.append(str(path))
+        result = "\n".join(shown)
 
-        result = "\n".join(result_lines)
-
-        if len(matches) > max_results:
-            result += f"\n... and {len(matches) - max_results} more files"
+        if remaining is None:
+            result += f"\n... and more than {GLOB_COUNT_BUDGET} more files (refine the pattern)"
+        elif remaining > 0:
+            result += f"\n... and {remaining} more files"
 
         return f"[OK]\n\n{result}"
 
@@ -284,64 +559,48 @@ def grep(pattern: str, path: str, runtime: ToolRuntime[SkillAgentContext]) -> st
     """
     cwd = runtime.context.working_directory
     search_path = resolve_path(path, cwd)
+    max_results = 50
+
+    # 有索引时先用 trigram 缩小候选文件范围（None 表示无法缩小，回退到完整遍历）
+    candidates = None
+    if runtime.context.use_trigram_index:
+        try:
+            candidates = get_trigram_index(cwd, runtime.context.walk_excludes).candidates(pattern, search_path)
+        except Exception:
+            candidates = None
+    if candidates is None and search_path.is_dir():
+        candidates = iter_search_files(search_path, base=cwd, exclude=runtime.context.walk_excludes)
 
     try:
-        regex = re.compile(pattern)
+        # 惰性遍历 + mmap 搜索，命中 max_results 后立即停止
+        result = search(
+            pattern,
+            search_path,
+            max_results=max_results,
+            files=candidates,
+            cache=runtime.context.file_cache,
+        )
     except re.error as e:
         return f"[FAILED] Invalid regex pattern: {e}"
+    except Exception as e:
+        return f"[FAILED] {str(e)}"
 
-    results = []
-    max_results = 50
-    files_searched = 0
-
-    try:
-        if search_path.is_file():
-            files = [search_path]
-        else:
-            # 搜索所有文本文件，排除常见的二进制/隐藏目录
-            files = []
-            for p in search_path.rglob("*"):
-                if p.is_file():
-                    # 排除隐藏文件和常见的非代码目录
-                    parts = p.parts
-                    if any(part.startswith(".") or part in ("node_modules", "__pycache__", ".git", "venv", ".venv") for part in parts):
-                        continue
-                    files.append(p)
-
-        for file_path in files:
-            if len(results) >= max_results:
-                break
-
-            try:
-                content = file_path.read_text(encoding="utf-8", errors="ignore")
-                lines = content.split("\n")
-                files_searched += 1
-
-                for line_num, line in enumerate(lines, 1):
-                    if regex.search(line):
-                        try:
-                            rel_path = file_path.relative_to(cwd)
-                        except ValueError:
-                            rel_path = file_path
-                        results.append(f"{rel_path}:{line_num}: {line.strip()[:100]}")
-
-                        if len(results) >= max_results:
-                            break
-
-            except (UnicodeDecodeError, PermissionError, IsADirectoryError):
-                continue
-
-        if not results:
-            return f"No matches found for pattern: {pattern} (searched {files_searched} files)"
+    if not result.matches:
+        return f"No matches found for pattern: {pattern} (searched {result.files_searched} files)"
 
-        output = "\n".join(results)
-        if len(results) >= max_results:
-            output += f"\n... (truncated, showing first {max_results} matches)"
+    results = []
+    for match in result.matches:
+        try:
+            rel_path = match.path.relative_to(cwd)
+        except ValueError:
+            rel_path = match.path
+        results.append(f"{rel_path}:{match.line_number}: {match.line}")
 
-        return f"[OK]\n\n{output}"
+    output = "\n".join(results)
+    if result.truncated:
+        output += f"\n... (truncated, showing first {max_results} matches)"
 
-    except Exception as e:
-        return f"[FAILED] {str(e)}"
+    return f"[OK]\n\n{output}"
 
 
 @tool
@@ -376,7 +635,10 @@ def edit(
         return f"[FAILED] Not a file: {file_path}"
 
     try:
-        content = path.read_text(encoding="utf-8")
+        kind = classify_file(path)
+        if kind.is_binary:
+            return f"[FAILED] Cannot edit binary file ({kind.reason}): {file_path}"
+        content = _read_for_edit(runtime, path, kind)
 
         # 检查 old_string 是否存在
         count = content.count(old_string)
@@ -389,7 +651,9 @@ def edit(
 
         # 执行替换
         new_content = content.replace(old_string, new_string, 1)
-        path.write_text(new_content, encoding="utf-8")
+        # 保持原文件编码，原子替换避免写入中途崩溃留下截断文件
+        atomic_write_text(path, new_content, encoding=kind.encoding)
+        _notify_file_written(runtime, path, text=new_content, kind=kind)
 
         # 计算变化的行数
         old_lines = len(old_string.split("\n"))
@@ -403,8 +667,147 @@ def edit(
         return f"[FAILED] {str(e)}"
 
 
+class EditOperation(TypedDict):
+    """multi_edit 中的一次替换"""
+    file_path: str
+    old_string: str
+    new_string: str
+    replace_all: NotRequired[bool]
+
+
+@tool
+def multi_edit(edits: list[EditOperation], runtime: ToolRuntime[SkillAgentContext]) -> str:
+    """
+    Apply several text replacements, possibly across multiple files, in one call.
+
+    Edits are applied in order (later edits see the result of earlier ones in the
+    same file). Every edit is validated first; if any edit fails, no file is changed.
+    Files are written atomically; if writing fails part-way, the result lists the
+    files that were already written.
+
+    Args:
+        edits: Ordered list of edits. Each edit has file_path, old_string, new_string
+            and optional replace_all (default false: old_string must be unique in the file)
+    """
+    cwd = runtime.context.working_directory
+
+    if not edits:
+        return "[FAILED] No edits provided"
+
+    # 第一阶段：在内存中依次应用所有修改并校验
+    # 按规范化后的路径索引，同一文件的不同写法（a.txt / sub/../a.txt）共用一份内容
+    files: dict[Path, tuple[FileKind, str]] = {}
+    changed: dict[Path, str] = {}
+    names: dict[Path, str] = {}
+    report = []
+    failed = False
+
+    for i, op in enumerate(edits, 1):
+        file_path = op["file_path"]
+        old_string = op["old_string"]
+        new_string = op["new_string"]
+        replace_all = op.get("replace_all", False)
+        path = resolve_path(file_path, cwd).resolve()
+
+        def fail(message: str) -> None:
+            nonlocal failed
+            failed = True
+            report.append(f"  {i}. {file_path}: [FAILED] {message}")
+
+        if path not in files:
+            if not path.is_file():
+                fail("File not found" if not path.exists() else "Not a file")
+                continue
+            try:
+                kind = classify_file(path)
+                if kind.is_binary:
+                    fail(f"Cannot edit binary file ({kind.reason})")
+                    continue
+                files[path] = (kind, _read_for_edit(runtime, path, kind))
+                names[path] = file_path
+            except (UnicodeDecodeError, OSError) as e:
+                fail(f"Cannot read file: {e}")
+                continue
+
+        content = changed.get(path, files[path][1])
+
+        if not old_string:
+            fail("old_string must not be empty")
+            continue
+        if old_string == new_string:
+            fail("old_string and new_string are identical")
+            continue
+
+        count = content.count(old_string)
+        if count == 0:
+            fail("String not found in file. Make sure the text matches exactly including whitespace.")
+            continue
+        if count > 1 and not replace_all:
+            fail(f"String appears {count} times in file. Provide more context or set replace_all.")
+            continue
+
+        changed[path] = content.replace(old_string, new_string, -1 if replace_all else 1)
+        old_lines = len(old_string.split("\n"))
+        new_lines = len(new_string.split("\n"))
+        occurrences = f" ({count} occurrences)" if count > 1 else ""
+        report.append(f"  {i}. {file_path}: replaced {old_lines} lines with {new_lines} lines{occurrences}")
+
+    if failed:
+        return f"[FAILED] No files were changed\n\n" + "\n".join(report)
+
+    # 第二阶段：全部写入临时文件后再逐个替换
+    staged = []
+    try:
+        for path, content in changed.items():
+            kind = files[path][0]
+            staged.append((stage_write(path, [content.encode(kind.encoding)]), path))
+    except Exception as e:
+        for temp_path, _ in staged:
+            discard_staged(temp_path)
+        return f"[FAILED] No files were changed: {e}\n\n" + "\n".join(report)
+
+    committed = []
+    for n, (temp_path, path) in enumerate(staged):
+        try:
+            commit_staged(temp_path, path)
+        except Exception as e:
+            for remaining, _ in staged[n:]:
+                discard_staged(remaining)
+            done = "\n".join(f"  - {name}" for name in committed) or "  (none)"
+            return (
+                f"[FAILED] Could not write {names[path]}: {e}\n\n"
+                f"Files already written:\n{done}\n\n" + "\n".join(report)
+            )
+        committed.append(names[path])
+        _notify_file_written(runtime, path, text=changed[path], kind=files[path][0])
+
+    return (
+        f"[OK]\n\nApplied {len(edits)} edits to {len(changed)} files\n"
+        + "\n".join(report)
+    )
+
+
+# list_dir 每页最多列出的条目数
+LIST_DIR_PAGE_SIZE = 100
+
+
+def _format_size(size: int) -> str:
+    """格式化文件大小"""
+    if size < 1024:
+        return f"{size}B"
+    elif size < 1024 * 1024:
+        return f"{size // 1024}KB"
+    else:
+        return f"{size // (1024 * 1024)}MB"
+
+
 @tool
-def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+def list_dir(
+    path: str,
+    runtime: ToolRuntime[SkillAgentContext],
+    depth: int = 1,
+    cursor: str = "",
+) -> str:
     """
     List contents of a directory.
 
@@ -412,9 +815,13 @@ def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
     - Explore directory structure
     - See what files exist in a folder
     - Check if files/folders exist
+    - Get a tree view of nested folders in one call (depth > 1)
 
     Args:
         path: Directory path (use "." for current directory)
+        depth: How many levels to list (1 = only direct children). Ignored folders
+            (.gitignore, node_modules, ...) are shown but not expanded.
+        cursor: Continue a previous listing after this entry (from the "use cursor=" hint)
     """
     dir_path = resolve_path(path, runtime.context.working_directory)
 
@@ -425,25 +832,46 @@ def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         return f"[FAILED] Not a directory: {path}"
 
     try:
-        entries = sorted(dir_path.iterdir(), key=lambda p: (not p.is_dir(), p.name.lower()))
+        # scandir 的 DirEntry 自带类型信息；只对当前页的文件 stat
+        entries = walk(
+            dir_path,
+            base=runtime.context.working_directory,
+            exclude=runtime.context.walk_excludes,
+            max_depth=max(depth, 1),
+            include_dirs=True,
+            dirs_first=True,
+            yield_ignored=True,
+        )
+
+        if cursor:
+            for entry in entries:
+                if entry.rel_path == cursor:
+                    break
+            else:
+                return f"[FAILED] Cursor not found: {cursor} (the directory may have changed, list again without cursor)"
+
+        page = list(islice(entries, LIST_DIR_PAGE_SIZE + 1))
+        has_more = len(page) > LIST_DIR_PAGE_SIZE
+        page = page[:LIST_DIR_PAGE_SIZE]
 
         result_lines = []
-        for entry in entries[:100]:  # 限制数量
-            if entry.is_dir():
-                result_lines.append(f"📁 {entry.name}/")
+        for entry in page:
+            indent = "  " * (entry.depth - 1)
+            if entry.is_dir:
+                note = " (ignored, not expanded)" if entry.ignored and depth > 1 else ""
+                result_lines.append(f"{indent}📁 {entry.name}/{note}")
             else:
-                # 显示文件大小
-                size = entry.stat().st_size
-                if size < 1024:
-                    size_str = f"{size}B"
-                elif size < 1024 * 1024:
-                    size_str = f"{size // 1024}KB"
-                else:
-                    size_str = f"{size // (1024 * 1024)}MB"
-                result_lines.append(f"   {entry.name} ({size_str})")
-
-        if len(entries) > 100:
-            result_lines.append(f"... and {len(entries) - 100} more entries")
+                try:
+                    size_str = _format_size(entry.stat().st_size)
+                except OSError:
+                    size_str = "?"
+                result_lines.append(f"{indent}   {entry.name} ({size_str})")
+
+        if has_more:
+            result_lines.append(f'... (more entries, use cursor="{page[-1].rel_path}" to continue)')
+
+        if not result_lines:
+            return "[OK]\n\n(empty directory)"
 
         return f"[OK]\n\n{chr(10).join(result_lines)}"
 
@@ -453,4 +881,102 @@ def list_dir(path: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
         return f"[FAILED] {str(e)}"
 
 
-ALL_TOOLS = [load_skill, bash, read_file, write_file, glob, grep, edit, list_dir]
+# 异步实现：异步 Agent 循环（ainvoke / astream）优先调用工具的 coroutine
+# - bash 使用 asyncio.create_subprocess_shell，等待命令期间不占用线程
+# - 文件工具在有界的 I/O 线程池中执行同步实现，大量并发会话时排队而不是各占一个线程
+
+# 文件工具异步执行时使用的线程数
+DEFAULT_IO_THREADS = 8
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_io_executor_lock = threading.Lock()
+
+
+def _get_io_executor() -> ThreadPoolExecutor:
+    """文件工具的 I/O 线程池（首次使用时创建，大小由 SKILLS_IO_THREADS 控制）"""
+    global _io_executor
+    if _io_executor is None:
+        with _io_executor_lock:
+            if _io_executor is None:
+                workers = env_number("SKILLS_IO_THREADS", DEFAULT_IO_THREADS) or DEFAULT_IO_THREADS
+                _io_executor = ThreadPoolExecutor(
+                    max_workers=max(1, workers),
+                    thread_name_prefix="skills-io",
+                )
+    return _io_executor
+
+
+def _register_offloaded(sync_tool) -> None:
+    """为工具注册异步实现：在 I/O 线程池中执行同步实现"""
+    func = sync_tool.func
+
+    @functools.wraps(func)
+    async def run_in_io_thread(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(_get_io_executor(), call)
+
+    sync_tool.coroutine = run_in_io_thread
+
+
+def _decode_process_output(data: bytes) -> str:
+    """
+    解码子进程输出（本地编码）
+
+    先折叠 \\r 重绘再规范化换行：text=True 的通用换行会把进度条的 \\r 变成 \\n，
+    每次重绘都会变成单独一行。
+    """
+    text = data.decode(locale.getpreferredencoding(False), errors="replace")
+    return collapse_carriage_returns(text)
+
+
+async def _bash_async(command: str, runtime: ToolRuntime[SkillAgentContext]) -> str:
+    """bash 的异步实现"""
+    cwd = str(runtime.context.working_directory)
+    timeout, limited_by_turn = tool_timeout(BASH_TIMEOUT)
+
+    try:
+        process = await asyncio.create_subprocess_shell(
+            command,
+            cwd=cwd,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            **_PROCESS_GROUP_KWARGS,
+        )
+        token, callback_id = _kill_on_cancel(process)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            _kill_process_tree(process)
+            await process.wait()
+            return _bash_timeout_message(limited_by_turn)
+        except asyncio.CancelledError:
+            # 任务被取消时不留下孤儿进程
+            _kill_process_tree(process)
+            await process.wait()
+            raise
+        finally:
+            if token is not None:
+                token.remove_callback(callback_id)
+        if token is not None and token.cancelled:
+            return _BASH_CANCELLED_MESSAGE
+
+        return _format_bash_result(
+            process.returncode,
+            _decode_process_output(stdout),
+            _decode_process_output(stderr),
+            runtime,
+        )
+
+    except Exception as e:
+        return f"[FAILED] {str(e)}"
+
+
+bash.coroutine = _bash_async
+for _file_tool in (load_skill, read_file, write_file, glob, grep, edit, multi_edit, list_dir):
+    _register_offloaded(_file_tool)
+
+
+ALL_TOOLS = [load_skill, bash, read_file, write_file, glob, grep, edit, multi_edit, list_dir]
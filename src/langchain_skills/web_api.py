@@ -9,14 +9,18 @@ from __future__ import annotations
 
 import json
 import os
-from collections.abc import Callable, Iterator
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager
 from typing import Any, Protocol
 
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from .agent import LangChainSkillsAgent, check_api_credentials
+from .env import env_number
+from .model_registry import get_model_registry
 
 
 DEFAULT_CORS_ORIGINS = (
@@ -38,6 +42,14 @@ class AgentLike(Protocol):
         ...
 
 
+def _agent_events(agent: AgentLike, message: str, thread_id: str) -> AsyncIterator[dict[str, Any]]:
+    """Prefer the agent's async event stream; fall back to the sync one in a threadpool."""
+    astream_events = getattr(agent, "astream_events", None)
+    if astream_events is not None:
+        return astream_events(message, thread_id=thread_id)
+    return iterate_in_threadpool(agent.stream_events(message, thread_id=thread_id))
+
+
 _AGENT_SINGLETON: LangChainSkillsAgent | None = None
 
 
@@ -67,6 +79,13 @@ def _default_agent_provider() -> LangChainSkillsAgent:
     return _AGENT_SINGLETON
 
 
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Release pooled model HTTP connections on shutdown."""
+    yield
+    await get_model_registry().aclose()
+
+
 def create_app(agent_provider: Callable[[], AgentLike] | None = None) -> FastAPI:
     """Create FastAPI app with injectable agent provider (for tests)."""
     provider = agent_provider or _default_agent_provider
@@ -74,7 +93,8 @@ def create_app(agent_provider: Callable[[], AgentLike] | None = None) -> FastAPI
     app = FastAPI(
         title="LangChain Skills Agent Web API",
         version="0.1.0",
-        description="SSE bridge for stream_events()",
+        description="SSE bridge for astream_events()",
+        lifespan=_lifespan,
     )
 
     app.add_middleware(
@@ -107,27 +127,40 @@ def create_app(agent_provider: Callable[[], AgentLike] | None = None) -> FastAPI
         message: str = Query(..., min_length=1),
         thread_id: str = Query("default", min_length=1),
     ) -> StreamingResponse:
-        def event_stream() -> Iterator[str]:
+        async def event_stream() -> AsyncIterator[str]:
             error_emitted = False
             try:
-                agent = provider()
+                # 首次调用会构建 Agent（阻塞），放到线程池中避免卡住事件循环
+                agent = await run_in_threadpool(provider)
             except Exception as exc:  # pragma: no cover - defensive path
                 payload = {"type": "error", "message": f"Failed to initialize agent: {exc}"}
                 yield _to_sse_frame("error", payload)
                 return
 
+            events = _agent_events(agent, message, thread_id)
+            finished = False
             try:
-                for event in agent.stream_events(message, thread_id=thread_id):
+                async for event in events:
                     event_type = str(event.get("type", "message"))
                     if event_type == "error":
                         error_emitted = True
                     yield _to_sse_frame(event_type, event)
+                finished = True
             except GeneratorExit:
                 return
             except Exception as exc:
+                finished = True
                 if not error_emitted:
                     payload = {"type": "error", "message": str(exc)}
                     yield _to_sse_frame("error", payload)
+            finally:
+                # 客户端断开时取消本轮（终止正在执行的命令，不等事件流关闭）并关闭 Agent 的事件流
+                cancel = getattr(agent, "cancel", None)
+                if not finished and cancel is not None:
+                    cancel(thread_id, "client disconnected")
+                aclose = getattr(events, "aclose", None)
+                if aclose is not None:
+                    await aclose()
 
         return StreamingResponse(
             event_stream(),
@@ -150,7 +183,7 @@ def main() -> None:
     import uvicorn
 
     host = os.getenv("SKILLS_WEB_HOST", "0.0.0.0")
-    port = int(os.getenv("SKILLS_WEB_PORT", "8000"))
+    port = env_number("SKILLS_WEB_PORT", 8000)
     reload_enabled = os.getenv("SKILLS_WEB_RELOAD", "").lower() in ("1", "true", "yes")
 
     uvicorn.run(
@@ -2,14 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import threading
+import time
 from contextlib import contextmanager
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from unittest.mock import Mock, patch
 
-from langchain_skills.agent import LangChainSkillsAgent, resolve_model_config
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from langchain_skills.agent import LangChainSkillsAgent, check_api_credentials, resolve_model_config
+from langchain_skills.compaction import COMPACTED_PREFIX, CompactionPolicy
+from langchain_skills.model_registry import ModelRegistry
+
+
+@pytest.fixture(autouse=True)
+def isolated_model_registry():
+    """每个测试使用独立的模型注册表（测试会替换 init_chat_model）"""
+    registry = ModelRegistry()
+    with patch("langchain_skills.agent.get_model_registry", return_value=registry):
+        yield registry
+    registry.close()
 
 
 @contextmanager
@@ -161,6 +180,7 @@ def test_openai_agent_enables_reasoning_effort_kwargs():
     ) as init_chat_model, patch("langchain_skills.agent.create_agent", return_value=object()):
         init_chat_model.return_value = object()
         agent = LangChainSkillsAgent(enable_thinking=True)
+        agent.build_agent()
 
     kwargs = init_chat_model.call_args.kwargs
     assert agent.model_provider == "openai"
@@ -191,7 +211,7 @@ def test_openai_chat_completions_adds_v1_to_proxy_base_url():
         "langchain_skills.agent.init_chat_model"
     ) as init_chat_model, patch("langchain_skills.agent.create_agent", return_value=object()):
         init_chat_model.return_value = object()
-        LangChainSkillsAgent(enable_thinking=True)
+        LangChainSkillsAgent(enable_thinking=True).build_agent()
 
     kwargs = init_chat_model.call_args.kwargs
     assert kwargs["base_url"] == "https://api.example.test/openai/v1"
@@ -217,7 +237,7 @@ def test_openai_chat_completions_accepts_full_endpoint_base_url():
         "langchain_skills.agent.init_chat_model"
     ) as init_chat_model, patch("langchain_skills.agent.create_agent", return_value=object()):
         init_chat_model.return_value = object()
-        LangChainSkillsAgent(enable_thinking=True)
+        LangChainSkillsAgent(enable_thinking=True).build_agent()
 
     kwargs = init_chat_model.call_args.kwargs
     assert kwargs["base_url"] == "https://api.example.test/openai/v1"
@@ -287,6 +307,7 @@ def test_anthropic_agent_keeps_thinking_kwargs():
     ) as init_chat_model, patch("langchain_skills.agent.create_agent", return_value=object()):
         init_chat_model.return_value = object()
         agent = LangChainSkillsAgent(enable_thinking=True, thinking_budget=2048)
+        agent.build_agent()
 
     kwargs = init_chat_model.call_args.kwargs
     assert agent.model_provider == "anthropic"
@@ -295,3 +316,368 @@ def test_anthropic_agent_keeps_thinking_kwargs():
     assert kwargs["thinking"] == {"type": "enabled", "budget_tokens": 2048}
     assert kwargs["api_key"] == "anthropic-token"
     assert kwargs["base_url"] == "https://api.jiekou.ai/anthropic"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """按顺序返回预设消息的模型（支持 tool_calls）"""
+    responses: list
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+
+def test_tool_result_events_carry_metrics(tmp_path):
+    (tmp_path / "notes.txt").write_text("hello")
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    model = ScriptedChatModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "list_dir", "args": {"path": "."}, "id": "call_1"}]),
+        AIMessage(content="done"),
+    ])
+
+    with patch.dict(
+        os.environ,
+        {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"},
+        clear=True,
+    ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader), patch(
+        "langchain_skills.agent.init_chat_model", return_value=model
+    ):
+        agent = LangChainSkillsAgent(working_directory=tmp_path)
+        agent.build_agent()
+        events = list(agent.stream_events("list files", thread_id="metrics-thread"))
+
+    results = [event for event in events if event["type"] == "tool_result"]
+    assert len(results) == 1
+    metrics = results[0]["metrics"]
+    assert metrics["tool"] == "list_dir"
+    assert metrics["tool_call_id"] == "call_1"
+    assert metrics["thread_id"] == "metrics-thread"
+    assert metrics["bytes_out"] == len(results[0]["content"].encode("utf-8"))
+    assert events[-1] == {"type": "done", "response": "done"}
+
+    summary = agent.get_tool_metrics("metrics-thread")
+    assert summary["list_dir"]["calls"] == 1
+    assert agent.get_tool_metrics("other-thread") == {}
+
+
+def _slow_read_tool(delays: dict[str, float]):
+    """按路径休眠的 read_file 替身（模拟 I/O 等待）"""
+    from langchain_core.tools import tool
+
+    @tool
+    def read_file(file_path: str) -> str:
+        """Read a file."""
+        time.sleep(delays[file_path])
+        return f"[OK]\n\n{file_path}"
+
+    return read_file
+
+
+def _run_parallel_reads(delays: dict[str, float], tool_policy=None):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    tool_calls = [
+        {"name": "read_file", "args": {"file_path": path}, "id": f"call_{path}"}
+        for path in delays
+    ]
+    model = ScriptedChatModel(responses=[AIMessage(content="", tool_calls=tool_calls), AIMessage(content="done")])
+
+    with patch.dict(
+        os.environ,
+        {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"},
+        clear=True,
+    ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader), patch(
+        "langchain_skills.agent.init_chat_model", return_value=model
+    ), patch("langchain_skills.tools.ALL_TOOLS", [_slow_read_tool(delays)]):
+        agent = LangChainSkillsAgent(tool_policy=tool_policy)
+        agent.build_agent()
+        started = time.perf_counter()
+        events = list(agent.stream_events("read files", thread_id="parallel"))
+        elapsed = time.perf_counter() - started
+    return agent, events, elapsed
+
+
+def test_parallel_tool_calls_run_concurrently():
+    delays = {f"f{i}.txt": 0.3 for i in range(4)}
+    _, events, elapsed = _run_parallel_reads(delays)
+
+    results = [event for event in events if event["type"] == "tool_result"]
+    assert len(results) == 4
+    # 4 个 0.3s 的读取并发执行，总耗时接近单个读取
+    assert elapsed < 0.9
+
+
+def test_parallel_tool_results_keep_call_order():
+    delays = {"slow.txt": 0.3, "medium.txt": 0.15, "fast.txt": 0.0}
+    agent, events, _ = _run_parallel_reads(delays)
+
+    names = [event["content"].split("\n")[-1] for event in events if event["type"] == "tool_result"]
+    assert names == ["slow.txt", "medium.txt", "fast.txt"]
+    messages = agent.agent.get_state({"configurable": {"thread_id": "parallel"}}).values["messages"]
+    assert [m.tool_call_id for m in messages if m.type == "tool"] == [f"call_{p}" for p in delays]
+
+
+def test_max_concurrency_serializes_tool_calls():
+    from langchain_skills.execution import ToolExecutionPolicy
+
+    delays = {f"f{i}.txt": 0.15 for i in range(3)}
+    _, _, elapsed = _run_parallel_reads(delays, tool_policy=ToolExecutionPolicy(max_concurrency=1))
+
+    assert elapsed >= 0.45
+
+
+def _scripted_agent(tmp_path, responses, model=None, **agent_kwargs):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    with patch.dict(
+        os.environ,
+        {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"},
+        clear=True,
+    ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader), patch(
+        "langchain_skills.agent.init_chat_model", return_value=model or ScriptedChatModel(responses=responses)
+    ):
+        # 每个脚本化 Agent 使用自己的模型（不与同一测试中的其他 Agent 共享）
+        agent_kwargs.setdefault("model_registry", ModelRegistry())
+        agent = LangChainSkillsAgent(working_directory=tmp_path, **agent_kwargs)
+        agent.build_agent()
+        return agent
+
+
+def _bash_script():
+    return [
+        AIMessage(content="", tool_calls=[{"name": "bash", "args": {"command": "echo async-ok"}, "id": "call_bash"}]),
+        AIMessage(content="finished"),
+    ]
+
+
+def _without_metrics(events):
+    return [{k: v for k, v in event.items() if k != "metrics"} for event in events]
+
+
+def test_astream_events_matches_stream_events(tmp_path):
+    sync_agent = _scripted_agent(tmp_path, _bash_script())
+    async_agent = _scripted_agent(tmp_path, _bash_script())
+
+    async def collect():
+        return [event async for event in async_agent.astream_events("run", thread_id="async-thread")]
+
+    sync_events = list(sync_agent.stream_events("run", thread_id="sync-thread"))
+    async_events = asyncio.run(collect())
+
+    assert _without_metrics(async_events) == _without_metrics(sync_events)
+    results = [event for event in async_events if event["type"] == "tool_result"]
+    assert "async-ok" in results[0]["content"]
+    assert results[0]["metrics"]["thread_id"] == "async-thread"
+    assert async_events[-1] == {"type": "done", "response": "finished"}
+
+
+def test_ainvoke_and_astream(tmp_path):
+    agent = _scripted_agent(tmp_path, _bash_script() + [AIMessage(content="second")])
+
+    async def run():
+        result = await agent.ainvoke("run", thread_id="t")
+        chunks = [chunk async for chunk in agent.astream("again", thread_id="t")]
+        return result, chunks
+
+    result, chunks = asyncio.run(run())
+
+    assert agent.get_last_response(result) == "finished"
+    assert agent.get_last_response(chunks[-1]) == "second"
+    # 同一会话的历史被保留
+    assert len(chunks[-1]["messages"]) == len(result["messages"]) + 2
+
+
+def test_astream_events_emits_error_and_raises(tmp_path):
+    agent = _scripted_agent(tmp_path, [])
+
+    async def collect(events):
+        async for event in agent.astream_events("run", thread_id="broken"):
+            events.append(event)
+
+    events = []
+    with pytest.raises(Exception):
+        asyncio.run(collect(events))
+    assert events[-1]["type"] == "error"
+
+
+def _middleware_names(env):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    with patch.dict(os.environ, env, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ), patch("langchain_skills.agent.init_chat_model", return_value=object()), patch(
+        "langchain_skills.agent.create_agent", return_value=object()
+    ) as create_agent:
+        LangChainSkillsAgent().build_agent()
+    return [type(m).__name__ for m in create_agent.call_args.kwargs["middleware"]]
+
+
+def test_anthropic_agent_enables_prompt_caching():
+    env = {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"}
+    assert "AnthropicPromptCachingMiddleware" in _middleware_names(env)
+    env["SKILLS_PROMPT_CACHE"] = "false"
+    assert "AnthropicPromptCachingMiddleware" not in _middleware_names(env)
+
+
+def test_openai_agent_skips_prompt_caching():
+    env = {"MODEL_PROVIDER": "openai", "MODEL_API_KEY": "openai-token"}
+    assert "AnthropicPromptCachingMiddleware" not in _middleware_names(env)
+
+
+def test_prompt_caching_marks_system_prompt_and_tools():
+    from langchain.agents.middleware import ModelRequest
+    from langchain_anthropic import ChatAnthropic
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    from langchain_skills.tools import ALL_TOOLS
+
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    with patch.dict(
+        os.environ, {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"}, clear=True
+    ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader), patch(
+        "langchain_skills.agent.init_chat_model", return_value=object()
+    ), patch("langchain_skills.agent.create_agent", return_value=object()):
+        agent = LangChainSkillsAgent()
+        agent.build_agent()
+        caching = agent._build_middleware()[-1]
+
+    request = ModelRequest(
+        model=ChatAnthropic(model="claude-sonnet-4-5-20250929", api_key="anthropic-token"),
+        messages=[HumanMessage(content="hi")],
+        system_message=SystemMessage(content="system prompt"),
+        tools=list(ALL_TOOLS),
+    )
+    seen = []
+    caching.wrap_model_call(request, lambda req: seen.append(req))
+
+    sent = seen[0]
+    assert sent.system_message.content[-1]["cache_control"]["type"] == "ephemeral"
+    assert sent.tools[-1].extras["cache_control"]["type"] == "ephemeral"
+    assert sent.model_settings["cache_control"]["type"] == "ephemeral"
+
+
+def test_done_event_reports_cache_usage(tmp_path):
+    usage = {
+        "input_tokens": 120,
+        "output_tokens": 8,
+        "total_tokens": 128,
+        "input_token_details": {"cache_read": 3000, "cache_creation": 0},
+    }
+    agent = _scripted_agent(tmp_path, [AIMessage(content="cached", usage_metadata=usage)])
+
+    events = list(agent.stream_events("hi", thread_id="usage"))
+
+    assert events[-1] == {
+        "type": "done",
+        "response": "cached",
+        "usage": {"input_tokens": 120, "output_tokens": 8, "cache_read_tokens": 3000},
+    }
+
+
+class RecordingChatModel(ScriptedChatModel):
+    """记录每次调用收到的消息"""
+    seen: list = Field(default_factory=list)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.seen.append(list(messages))
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+def test_old_tool_results_are_compacted_for_the_model(tmp_path):
+    (tmp_path / "big.txt").write_text("line of text\n" * 2000)
+    model = RecordingChatModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"file_path": "big.txt"}, "id": "call_big"}]),
+        AIMessage(content="read it"),
+        AIMessage(content="second answer"),
+    ])
+    agent = _scripted_agent(
+        tmp_path, [], model=model, compaction=CompactionPolicy(threshold_tokens=500, keep_turns=1)
+    )
+    agent.invoke("read big.txt", thread_id="long")
+    agent.invoke("and now?", thread_id="long")
+
+    seen = model.seen[-1]
+    tool_messages = [m for m in seen if m.type == "tool"]
+    assert tool_messages[0].content.startswith(COMPACTED_PREFIX)
+    assert tool_messages[0].tool_call_id == "call_big"
+    assert agent.compaction.last_stats["long"].stubbed_results == 1
+
+    # 完整结果仍保存在会话状态中
+    state = agent.agent.get_state(agent._build_config("long"))
+    full = [m for m in state.values["messages"] if m.type == "tool"][0]
+    assert "line of text" in full.content
+
+
+def test_agents_with_same_config_share_model(isolated_model_registry):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    env = {"MODEL_PROVIDER": "openai", "MODEL_API_KEY": "openai-token"}
+
+    with patch.dict(os.environ, env, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ), patch("langchain_skills.agent.init_chat_model") as init_chat_model, patch(
+        "langchain_skills.agent.create_agent", return_value=object()
+    ):
+        init_chat_model.side_effect = lambda *args, **kwargs: object()
+        LangChainSkillsAgent().build_agent()
+        LangChainSkillsAgent().build_agent()
+        LangChainSkillsAgent(max_tokens=1024).build_agent()
+
+    # 前两个配置相同，只创建一次；第三个 max_tokens 不同
+    assert init_chat_model.call_count == 2
+    assert len(isolated_model_registry) == 2
+    kwargs = init_chat_model.call_args.kwargs
+    assert kwargs["http_client"] is isolated_model_registry.http_client("openai")
+    assert kwargs["http_async_client"] is isolated_model_registry.async_http_client("openai")
+
+
+def test_agent_builds_model_lazily():
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    env = {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "anthropic-token"}
+
+    with patch.dict(os.environ, env, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ), patch("langchain_skills.agent.init_chat_model", return_value=object()) as init_chat_model, patch(
+        "langchain_skills.agent.create_agent", return_value=object()
+    ) as create_agent:
+        agent = LangChainSkillsAgent()
+        assert agent.get_system_prompt() == "system prompt"
+        assert not init_chat_model.called
+        assert not create_agent.called
+
+        compiled = agent.agent
+        assert agent.agent is compiled
+        assert init_chat_model.call_count == 1
+        assert create_agent.call_count == 1
+
+
+def test_fake_provider_runs_real_pipeline_offline(tmp_path):
+    (tmp_path / "hello.txt").write_text("hi")
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+
+    with patch.dict(os.environ, {"MODEL_PROVIDER": "fake"}, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ):
+        assert check_api_credentials()
+        agent = LangChainSkillsAgent(working_directory=tmp_path, model_registry=ModelRegistry())
+        events = list(agent.stream_events("summarise", thread_id="offline"))
+
+    types = [event["type"] for event in events]
+    assert agent.model_name == "fake-model"
+    assert "thinking" in types
+    result = next(event for event in events if event["type"] == "tool_result")
+    assert result["name"] == "list_dir"
+    assert "hello.txt" in result["content"]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["response"].endswith("for the request: summarise")
+    assert events[-1]["usage"]["output_tokens"] > 0
@@ -0,0 +1,199 @@
+"""
+Batch 模块单元测试
+
+测试批量执行：并发上限、单项超时、失败隔离、按完成顺序产出，以及 Agent 的同步 / 异步批量接口。
+"""
+
+import asyncio
+import json
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+
+from langchain_skills.agent import LangChainSkillsAgent
+from langchain_skills.batch import BatchStats, BatchItemResult, collect_batch, run_batch
+from langchain_skills.model_registry import ModelRegistry
+
+
+def _collect(results):
+    async def run():
+        return [item async for item in results]
+    return asyncio.run(run())
+
+
+class TestRunBatch:
+    """run_batch 测试"""
+
+    def test_bounded_concurrency_and_completion_order(self):
+        active = 0
+        peak = 0
+
+        async def invoke(message, thread_id):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(float(message))
+            active -= 1
+            return {"response": message}
+
+        items = _collect(run_batch(
+            invoke, ["0.06", "0.01", "0.03", "0.01"],
+            extract_response=lambda r: r["response"], max_concurrency=2,
+        ))
+
+        assert peak == 2
+        assert [item.index for item in items] == [1, 2, 3, 0]
+        assert all(item.success for item in items)
+        assert len({item.thread_id for item in items}) == 4
+
+    def test_timeout_and_failure_are_isolated(self):
+        async def invoke(message, thread_id):
+            if message == "slow":
+                await asyncio.sleep(1)
+            if message == "boom":
+                raise RuntimeError("model error")
+            return {"response": f"ok {message}"}
+
+        result = asyncio.run(collect_batch(run_batch(
+            invoke, ["a", "slow", "boom", "b"],
+            extract_response=lambda r: r["response"], timeout=0.05,
+        )))
+
+        assert result.responses == ["ok a", "", "", "ok b"]
+        assert result.items[1].timed_out
+        assert result.items[1].error == "Timed out after 0.05s"
+        assert result.items[2].error == "RuntimeError: model error"
+        stats = result.stats.to_dict()
+        assert stats["total"] == 4
+        assert stats["succeeded"] == 2
+        assert stats["failed"] == 2
+        assert stats["timed_out"] == 1
+        assert stats["throughput"] > 0
+
+    def test_thread_ids_length_checked(self):
+        async def invoke(message, thread_id):
+            return {}
+
+        with pytest.raises(ValueError):
+            _collect(run_batch(invoke, ["a"], extract_response=str, thread_ids=["t1", "t2"]))
+
+
+def test_batch_stats_percentiles():
+    results = [BatchItemResult(index=i, message="", thread_id="", latency=float(i + 1)) for i in range(10)]
+    stats = BatchStats.from_results(results, wall_time=5.0).to_dict()
+    assert stats["latency_p50"] == 5.0
+    assert stats["latency_p95"] == 10.0
+    assert stats["latency_mean"] == 5.5
+    assert stats["throughput"] == 2.0
+
+
+@pytest.fixture
+def fake_agent(tmp_path):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    with patch.dict(os.environ, {"MODEL_PROVIDER": "fake"}, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ):
+        agent = LangChainSkillsAgent(working_directory=tmp_path, model_registry=ModelRegistry())
+        agent.build_agent()
+    return agent
+
+
+class TestAgentBatch:
+    """LangChainSkillsAgent 批量接口测试"""
+
+    def test_batch(self, fake_agent):
+        result = fake_agent.batch(["one", "two", "three"], max_concurrency=2)
+
+        assert [item.index for item in result.items] == [0, 1, 2]
+        for message, response in zip(["one", "two", "three"], result.responses):
+            assert response.endswith(f"for the request: {message}")
+        assert len({item.thread_id for item in result.items}) == 3
+        assert result.stats.succeeded == 3
+
+    def test_batch_as_completed_can_stop_early(self, fake_agent):
+        results = fake_agent.batch_as_completed(["a", "b", "c", "d"], max_concurrency=1)
+        first = next(results)
+        results.close()
+        assert first.success
+
+    def test_abatch(self, fake_agent):
+        result = asyncio.run(fake_agent.abatch(["x", "y"], thread_ids=["t-x", "t-y"]))
+        assert [item.thread_id for item in result.items] == ["t-x", "t-y"]
+        assert result.responses[1].endswith("for the request: y")
+
+
+@contextmanager
+def keepalive_chat_server():
+    """保持 keep-alive 连接的 OpenAI 兼容服务（连接会被共享连接池复用）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):  # noqa: N802 - stdlib callback name
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0") or 0)))
+            message = {"role": "assistant", "content": "PONG"}
+            if payload.get("stream"):
+                chunks = [
+                    {"choices": [{"index": 0, "delta": message, "finish_reason": None}]},
+                    {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+                ]
+                body = "".join(
+                    "data: " + json.dumps({"id": "c", "object": "chat.completion.chunk", "created": 0,
+                                           "model": payload["model"], **chunk}) + "\n\n"
+                    for chunk in chunks
+                ) + "data: [DONE]\n\n"
+                content_type = "text/event-stream"
+            else:
+                body = json.dumps({
+                    "id": "c", "object": "chat.completion", "created": 0, "model": payload["model"],
+                    "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                })
+                content_type = "application/json"
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):  # noqa: A002 - stdlib callback signature
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        thread.join(timeout=5)
+        server.server_close()
+
+
+def test_repeated_sync_batches_share_http_pool(tmp_path):
+    """多次同步批量复用共享的异步连接池（连接绑定的事件循环不能随批次关闭）"""
+    registry = ModelRegistry()
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    with keepalive_chat_server() as server_url, patch.dict(os.environ, {
+        "MODEL_PROVIDER": "openai",
+        "MODEL_NAME": "test-model",
+        "MODEL_API_KEY": "test-token",
+        "MODEL_BASE_URL": server_url,
+        "OPENAI_USE_RESPONSES_API": "false",
+    }, clear=True), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader):
+        agent = LangChainSkillsAgent(working_directory=tmp_path, model_registry=registry)
+        try:
+            for _ in range(2):
+                result = agent.batch(["a", "b"])
+                assert [item.error for item in result.items] == [None, None]
+                assert result.responses == ["PONG", "PONG"]
+        finally:
+            registry.close()
@@ -0,0 +1,164 @@
+"""
+Budget 模块单元测试
+
+测试单轮预算：模型调用数 / 工具调用数 / token 数 / 耗时上限，以及超出预算时终止 bash 子进程。
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+
+from langchain_skills.agent import LangChainSkillsAgent
+from langchain_skills.budget import BUDGET_EXCEEDED_PREFIX, TurnBudget, TurnBudgetMiddleware
+from langchain_skills.model_registry import ModelRegistry
+
+
+def _loop_agent(tmp_path, step: dict, *then: dict, **agent_kwargs) -> LangChainSkillsAgent:
+    """按 step, *then 依次输出、之后重复最后一步的假模型（只有 step 时模拟陷入工具循环）"""
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps([step, *then]))
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    env = {"MODEL_PROVIDER": "fake", "SKILLS_FAKE_SCRIPT": str(script)}
+    with patch.dict(os.environ, env, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ):
+        agent = LangChainSkillsAgent(
+            working_directory=tmp_path, model_registry=ModelRegistry(), enable_thinking=False, **agent_kwargs
+        )
+        agent.build_agent()
+    return agent
+
+
+LIST_DIR_STEP = {"text": "Looking.", "tool_calls": [{"name": "list_dir", "args": {"path": "."}}]}
+
+
+class TestTurnBudget:
+    """TurnBudget 配置测试"""
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {
+            "SKILLS_MAX_TURN_SECONDS": "90",
+            "SKILLS_MAX_MODEL_CALLS": "20",
+            "SKILLS_MAX_TURN_TOKENS": "0",
+        }, clear=True):
+            budget = TurnBudget.from_env()
+        assert budget == TurnBudget(max_wall_time=90.0, max_model_calls=20)
+        assert budget.enabled
+
+    def test_default_disabled(self):
+        with patch.dict(os.environ, {}, clear=True):
+            assert not TurnBudget.from_env().enabled
+
+
+class TestBudgetEnforcement:
+    """超出预算时结束本轮"""
+
+    def test_model_call_budget_ends_tool_loop(self, tmp_path):
+        agent = _loop_agent(tmp_path, LIST_DIR_STEP)
+
+        events = list(agent.stream_events("go", thread_id="loop", budget=TurnBudget(max_model_calls=3)))
+
+        assert sum(1 for e in events if e["type"] == "tool_result") == 3
+        exceeded = next(e for e in events if e["type"] == "budget_exceeded")
+        assert exceeded["limit"] == "max_model_calls"
+        assert exceeded["used"] == 3
+        assert events[-1]["type"] == "done"
+        assert BUDGET_EXCEEDED_PREFIX in events[-1]["response"]
+
+        # 对话状态完整：最后一条是说明预算耗尽的 AI 消息，下一轮可以继续
+        messages = agent.agent.get_state(agent._build_config("loop")).values["messages"]
+        assert isinstance(messages[-1], AIMessage)
+        assert messages[-1].content.startswith(BUDGET_EXCEEDED_PREFIX)
+        result = agent.invoke("again", thread_id="loop", budget=TurnBudget(max_model_calls=1))
+        assert result["budget_exceeded"]["limit"] == "max_model_calls"
+
+    def test_tool_call_budget_skips_extra_calls(self, tmp_path):
+        step = {"tool_calls": [{"name": "list_dir", "args": {"path": "."}}] * 3}
+        answer = {"text": "Answer from partial results."}
+        agent = _loop_agent(tmp_path, step, answer, budget=TurnBudget(max_tool_calls=2))
+
+        result = agent.invoke("go", thread_id="tools")
+
+        tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+        # 并行调用中哪一个被跳过取决于执行顺序
+        assert sorted(m.content.startswith("[OK]") for m in tool_messages) == [False, True, True]
+        assert sum("Tool call skipped" in m.content for m in tool_messages) == 1
+        # 模型看到被跳过的结果后仍可以作答
+        assert result["messages"][-1].content == "Answer from partial results."
+        assert result["budget_exceeded"]["limit"] == "max_tool_calls"
+        assert result["budget_exceeded"]["used"] == 2
+        assert "(2 / 2)" in result["budget_exceeded"]["message"]
+
+    def test_tool_call_budget_stops_model_that_keeps_calling_tools(self, tmp_path):
+        agent = _loop_agent(tmp_path, LIST_DIR_STEP, budget=TurnBudget(max_tool_calls=0))
+
+        result = agent.invoke("go", thread_id="tool-loop")
+
+        tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+        assert len(tool_messages) == 2
+        assert all("Tool call skipped" in m.content for m in tool_messages)
+        assert result["messages"][-1].content.startswith(BUDGET_EXCEEDED_PREFIX)
+        assert result["budget_exceeded"]["used"] == 0
+
+    def test_token_budget(self, tmp_path):
+        agent = _loop_agent(tmp_path, LIST_DIR_STEP)
+        result = agent.invoke("go", thread_id="tokens", budget=TurnBudget(max_tokens=1))
+        assert result["budget_exceeded"]["limit"] == "max_tokens"
+        assert sum(1 for m in result["messages"] if isinstance(m, ToolMessage)) == 1
+
+    def test_no_budget_leaves_result_unchanged(self, tmp_path):
+        agent = _loop_agent(tmp_path, {"text": "done"})
+        result = agent.invoke("go", thread_id="plain")
+        assert "budget_exceeded" not in result
+        assert agent.budget_guard._trackers == {}
+
+
+def test_finish_keeps_tracker_of_newer_turn_on_same_thread():
+    middleware = TurnBudgetMiddleware(TurnBudget(max_model_calls=1))
+    first = middleware.start("tab")
+    second = middleware.start("tab")
+
+    middleware.finish("tab", first)
+    assert middleware._trackers == {"tab": second}
+
+    middleware.finish("tab", second)
+    assert middleware._trackers == {}
+
+
+class TestWallTimeBudget:
+    """耗时上限：终止正在执行的 bash 命令"""
+
+    SLEEP_STEP = {"tool_calls": [{"name": "bash", "args": {"command": "sleep 30 & sleep 30; echo done"}}]}
+
+    @pytest.mark.skipif(os.name == "nt", reason="uses POSIX sleep")
+    def test_sync_kills_running_command(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+
+        started = time.perf_counter()
+        events = list(agent.stream_events("go", thread_id="slow", budget=TurnBudget(max_wall_time=0.5)))
+
+        assert time.perf_counter() - started < 5
+        result = next(e for e in events if e["type"] == "tool_result")
+        assert not result["success"]
+        assert "wall time budget" in result["content"]
+        exceeded = next(e for e in events if e["type"] == "budget_exceeded")
+        assert exceeded["limit"] == "max_wall_time"
+
+    @pytest.mark.skipif(os.name == "nt", reason="uses POSIX sleep")
+    def test_async_kills_running_command(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+
+        async def collect():
+            return [e async for e in agent.astream_events("go", thread_id="aslow", budget=TurnBudget(max_wall_time=0.5))]
+
+        started = time.perf_counter()
+        events = asyncio.run(collect())
+
+        assert time.perf_counter() - started < 5
+        assert any(e["type"] == "budget_exceeded" and e["limit"] == "max_wall_time" for e in events)
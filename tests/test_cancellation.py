@@ -0,0 +1,230 @@
+"""
+Cancellation 模块单元测试
+
+测试取消令牌、取消后补全对话状态，以及取消正在进行的流式输出（终止 bash 子进程）。
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from langchain_skills.agent import LangChainSkillsAgent
+from langchain_skills.cancellation import (
+    CANCELLED_PREFIX,
+    CancellationToken,
+    RunCancelled,
+    cancelled_turn_repair,
+)
+from langchain_skills.model_registry import ModelRegistry
+
+
+def _loop_agent(tmp_path, step: dict) -> LangChainSkillsAgent:
+    """每次模型调用都重复 step 的假模型"""
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps([step]))
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+    env = {"MODEL_PROVIDER": "fake", "SKILLS_FAKE_SCRIPT": str(script)}
+    with patch.dict(os.environ, env, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ):
+        agent = LangChainSkillsAgent(
+            working_directory=tmp_path, model_registry=ModelRegistry(), enable_thinking=False
+        )
+        agent.build_agent()
+    return agent
+
+
+def _messages(agent: LangChainSkillsAgent, thread_id: str) -> list:
+    return agent.agent.get_state(agent._build_config(thread_id)).values["messages"]
+
+
+def _assert_consistent(messages: list) -> None:
+    """每个工具调用都有结果，且本轮以说明已取消的 AI 消息结束"""
+    call_ids = {c["id"] for m in messages if isinstance(m, AIMessage) for c in m.tool_calls}
+    result_ids = {m.tool_call_id for m in messages if isinstance(m, ToolMessage)}
+    assert call_ids == result_ids
+    assert isinstance(messages[-1], AIMessage)
+    assert messages[-1].content.startswith(CANCELLED_PREFIX)
+
+
+class TestCancellationToken:
+    """取消令牌测试"""
+
+    def test_cancel_runs_callbacks_once(self):
+        token = CancellationToken()
+        calls = []
+        token.add_callback(lambda: calls.append("a"))
+        removed = token.add_callback(lambda: calls.append("b"))
+        token.remove_callback(removed)
+
+        assert token.cancel("stop")
+        assert not token.cancel("again")
+        assert calls == ["a"]
+        assert token.reason == "stop"
+        with pytest.raises(RunCancelled):
+            token.raise_if_cancelled()
+
+    def test_callback_added_after_cancel_runs_immediately(self):
+        token = CancellationToken()
+        token.cancel()
+        calls = []
+        assert token.add_callback(lambda: calls.append(1)) is None
+        assert calls == [1]
+
+
+class TestCancelledTurnRepair:
+    """取消后补全对话状态"""
+
+    def test_answers_pending_tool_calls(self):
+        messages = [
+            HumanMessage(content="earlier"),
+            AIMessage(content="", tool_calls=[{"name": "bash", "args": {}, "id": "old"}]),
+            ToolMessage(content="[OK]", tool_call_id="old"),
+            AIMessage(content="done"),
+            HumanMessage(content="go"),
+            AIMessage(content="", tool_calls=[
+                {"name": "bash", "args": {}, "id": "a"},
+                {"name": "read_file", "args": {}, "id": "b"},
+            ]),
+            ToolMessage(content="[OK]", tool_call_id="b"),
+        ]
+
+        updates = cancelled_turn_repair(messages, "client disconnected")
+
+        assert [type(m) for m in updates] == [ToolMessage, AIMessage]
+        assert updates[0].tool_call_id == "a"
+        assert updates[0].content.startswith("[FAILED]")
+        assert "client disconnected" in updates[1].content
+
+    def test_complete_turn_needs_no_repair(self):
+        assert cancelled_turn_repair([HumanMessage(content="go"), AIMessage(content="done")]) == []
+
+    def test_turn_without_answer_gets_cancelled_message(self):
+        updates = cancelled_turn_repair([HumanMessage(content="go")])
+        assert len(updates) == 1
+        assert updates[0].content.startswith(CANCELLED_PREFIX)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses POSIX sleep")
+class TestCancelRunningStream:
+    """取消正在进行的流式输出"""
+
+    SLEEP_STEP = {"tool_calls": [{"name": "bash", "args": {"command": "sleep 30 & sleep 30; echo done"}}]}
+
+    def test_cancel_by_thread_id_kills_command(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+        timer = threading.Timer(0.5, agent.cancel, args=("slow",))
+
+        started = time.perf_counter()
+        timer.start()
+        events = list(agent.stream_events("go", thread_id="slow"))
+
+        assert time.perf_counter() - started < 5
+        cancelled = next(e for e in events if e["type"] == "cancelled")
+        assert cancelled["reason"] == "cancelled"
+        assert events[-1]["type"] == "done"
+        assert not agent.cancel("slow")
+        messages = _messages(agent, "slow")
+        _assert_consistent(messages)
+        # 被终止的 bash 的结果保留在对话中
+        assert any("Command cancelled" in m.content for m in messages if isinstance(m, ToolMessage))
+
+    def test_closing_the_stream_cancels_the_turn(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+        events = agent.stream_events("go", thread_id="closed")
+        token = CancellationToken()
+        with patch("langchain_skills.cancellation.CancellationToken", return_value=token):
+            for event in events:
+                if event["type"] == "tool_call":
+                    break
+
+        started = time.perf_counter()
+        events.close()
+
+        assert time.perf_counter() - started < 5
+        assert token.reason == "interrupted"
+        _assert_consistent(_messages(agent, "closed"))
+
+    def test_async_cancel_with_token(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+        token = CancellationToken()
+
+        async def collect():
+            asyncio.get_running_loop().call_later(0.5, token.cancel, "stop")
+            return [e async for e in agent.astream_events("go", thread_id="aslow", cancel=token)]
+
+        started = time.perf_counter()
+        events = asyncio.run(collect())
+
+        assert time.perf_counter() - started < 5
+        assert any(e["type"] == "cancelled" and e["reason"] == "stop" for e in events)
+        _assert_consistent(_messages(agent, "aslow"))
+
+    def test_async_repair_uses_async_state_api(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+        token = CancellationToken()
+
+        async def collect():
+            asyncio.get_running_loop().call_later(0.5, token.cancel)
+            return [e async for e in agent.astream_events("go", thread_id="async-api", cancel=token)]
+
+        blocking = AssertionError("sync state API used inside the event loop")
+        with patch.object(agent.agent, "get_state", side_effect=blocking), patch.object(
+            agent.agent, "update_state", side_effect=blocking
+        ):
+            events = asyncio.run(collect())
+
+        assert not any(e["type"] == "error" for e in events)
+        _assert_consistent(_messages(agent, "async-api"))
+
+    def test_cancelled_consumer_task_repairs_thread(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+
+        async def consume():
+            async for _ in agent.astream_events("go", thread_id="task"):
+                pass
+
+        async def run():
+            task = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.5)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        started = time.perf_counter()
+        asyncio.run(run())
+
+        assert time.perf_counter() - started < 5
+        _assert_consistent(_messages(agent, "task"))
+
+    def test_repair_failure_is_reported(self, tmp_path):
+        agent = _loop_agent(tmp_path, self.SLEEP_STEP)
+        token = CancellationToken()
+        timer = threading.Timer(0.5, token.cancel)
+
+        timer.start()
+        with patch.object(agent.agent, "update_state", side_effect=RuntimeError("checkpointer down")):
+            events = list(agent.stream_events("go", thread_id="broken", cancel=token))
+
+        error = next(e for e in events if e["type"] == "error")
+        assert "Failed to repair cancelled thread 'broken'" in error["message"]
+        assert "checkpointer down" in error["message"]
+        assert events[-1]["type"] == "done"
+
+    def test_follow_up_turn_after_cancel(self, tmp_path):
+        agent = _loop_agent(tmp_path, {"text": "All good."})
+        token = CancellationToken()
+        token.cancel()
+
+        events = list(agent.stream_events("go", thread_id="again", cancel=token))
+        assert any(e["type"] == "cancelled" for e in events)
+        _assert_consistent(_messages(agent, "again"))
+
+        result = agent.invoke("hello", thread_id="again")
+        assert result["messages"][-1].content == "All good."
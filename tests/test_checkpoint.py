@@ -0,0 +1,277 @@
+"""
+Checkpoint 模块单元测试
+
+测试 SQLite 检查点存储的读写、单会话裁剪、TTL / LRU 淘汰和配置。
+"""
+
+import asyncio
+import operator
+import os
+import sqlite3
+from typing import Annotated, TypedDict
+from unittest.mock import Mock, patch
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from langchain_skills import checkpoint
+from langchain_skills.checkpoint import (
+    SCHEMA_VERSION,
+    CheckpointLimits,
+    SqliteCheckpointSaver,
+    create_checkpointer,
+)
+
+
+class CounterState(TypedDict):
+    items: Annotated[list[str], operator.add]
+
+
+def _build_graph(saver):
+    """每次调用追加一条 "seen:<输入>" 的小图"""
+    def record(state: CounterState) -> dict:
+        return {"items": [f"seen:{state['items'][-1]}"]}
+
+    builder = StateGraph(CounterState)
+    builder.add_node("record", record)
+    builder.add_edge(START, "record")
+    builder.add_edge("record", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+class TestSqliteCheckpointSaver:
+    """测试读写与持久化"""
+
+    def test_state_survives_reopen(self, tmp_path):
+        db = tmp_path / "cp.sqlite"
+        with SqliteCheckpointSaver(db) as saver:
+            graph = _build_graph(saver)
+            graph.invoke({"items": ["a"]}, _config("t1"))
+            graph.invoke({"items": ["b"]}, _config("t1"))
+
+        with SqliteCheckpointSaver(db) as saver:
+            state = _build_graph(saver).get_state(_config("t1"))
+            assert state.values["items"] == ["a", "seen:a", "b", "seen:b"]
+            assert saver.get_tuple(_config("missing")) is None
+
+    def test_wal_mode(self, tmp_path):
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite") as saver:
+            mode = saver._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_refuses_foreign_database(self, tmp_path):
+        db = tmp_path / "other.sqlite"
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE checkpoints (thread_id TEXT, data BLOB)")
+        conn.execute("INSERT INTO checkpoints VALUES ('t1', x'00')")
+        conn.commit()
+        conn.close()
+
+        with pytest.raises(ValueError, match="not created by this saver"):
+            SqliteCheckpointSaver(db)
+
+        conn = sqlite3.connect(db)
+        assert conn.execute("SELECT thread_id FROM checkpoints").fetchall() == [("t1",)]
+        conn.close()
+
+    def test_unrelated_tables_are_kept(self, tmp_path):
+        db = tmp_path / "cp.sqlite"
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE notes (body TEXT)")
+        conn.commit()
+        conn.close()
+
+        with SqliteCheckpointSaver(db) as saver:
+            _build_graph(saver).invoke({"items": ["a"]}, _config("t1"))
+            assert saver._conn.execute("SELECT count(*) FROM notes").fetchone()[0] == 0
+
+    def test_newer_schema_is_refused(self, tmp_path):
+        db = tmp_path / "cp.sqlite"
+        SqliteCheckpointSaver(db).close()
+        conn = sqlite3.connect(db)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION + 1}")
+        conn.close()
+
+        with pytest.raises(ValueError, match="newer than the supported version"):
+            SqliteCheckpointSaver(db)
+
+    def test_older_schema_is_rebuilt(self, tmp_path, monkeypatch):
+        db = tmp_path / "cp.sqlite"
+        with SqliteCheckpointSaver(db) as saver:
+            _build_graph(saver).invoke({"items": ["a"]}, _config("t1"))
+
+        monkeypatch.setattr(checkpoint, "SCHEMA_VERSION", SCHEMA_VERSION + 1)
+        with SqliteCheckpointSaver(db) as saver:
+            assert saver.get_tuple(_config("t1")) is None
+            assert saver._conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION + 1
+
+    def test_list_filters(self, tmp_path):
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite") as saver:
+            graph = _build_graph(saver)
+            graph.invoke({"items": ["a"]}, _config("t1"))
+            graph.invoke({"items": ["b"]}, _config("t2"))
+
+            history = list(saver.list(_config("t1")))
+            assert len(history) == 3
+            assert [c.config["configurable"]["checkpoint_id"] for c in history] == sorted(
+                (c.config["configurable"]["checkpoint_id"] for c in history), reverse=True
+            )
+            assert len(list(saver.list(_config("t1"), limit=1))) == 1
+            assert len(list(saver.list(_config("t1"), before=history[0].config))) == 2
+            assert {c.metadata["source"] for c in saver.list(_config("t1"), filter={"source": "loop"})} == {"loop"}
+            assert len(list(saver.list(None))) == 6
+
+    def test_matches_in_memory_saver(self, tmp_path):
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite") as saver:
+            sqlite_graph = _build_graph(saver)
+            memory_graph = _build_graph(InMemorySaver())
+            for graph in (sqlite_graph, memory_graph):
+                graph.invoke({"items": ["a"]}, _config("t"))
+                graph.invoke({"items": ["b"]}, _config("t"))
+
+            assert sqlite_graph.get_state(_config("t")).values == memory_graph.get_state(_config("t")).values
+
+    def test_async_roundtrip(self, tmp_path):
+        async def run(saver):
+            graph = _build_graph(saver)
+            await graph.ainvoke({"items": ["a"]}, _config("t"))
+            result = await graph.ainvoke({"items": ["b"]}, _config("t"))
+            listed = [c async for c in saver.alist(_config("t"))]
+            await saver.adelete_thread("t")
+            return result, listed, await saver.aget_tuple(_config("t"))
+
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite") as saver:
+            result, listed, after_delete = asyncio.run(run(saver))
+
+        assert result["items"] == ["a", "seen:a", "b", "seen:b"]
+        assert len(listed) == 6
+        assert after_delete is None
+
+
+class TestCheckpointLimits:
+    """测试裁剪与淘汰"""
+
+    def test_max_checkpoints_per_thread(self, tmp_path):
+        limits = CheckpointLimits(max_checkpoints_per_thread=2)
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite", limits) as saver:
+            graph = _build_graph(saver)
+            for item in "abc":
+                graph.invoke({"items": [item]}, _config("t"))
+
+            assert len(list(saver.list(_config("t")))) == 2
+            # 最新检查点仍包含完整历史
+            assert graph.get_state(_config("t")).values["items"][-2:] == ["c", "seen:c"]
+            graph.invoke({"items": ["d"]}, _config("t"))
+            assert graph.get_state(_config("t")).values["items"][-1] == "seen:d"
+
+    def test_max_thread_bytes_keeps_latest(self, tmp_path):
+        limits = CheckpointLimits(max_thread_bytes=1)
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite", limits) as saver:
+            graph = _build_graph(saver)
+            graph.invoke({"items": ["a"]}, _config("t"))
+            graph.invoke({"items": ["b"]}, _config("t"))
+
+            assert len(list(saver.list(_config("t")))) == 1
+            assert graph.get_state(_config("t")).values["items"] == ["a", "seen:a", "b", "seen:b"]
+
+    def test_ttl_eviction(self, tmp_path):
+        limits = CheckpointLimits(thread_ttl=60)
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite", limits) as saver:
+            graph = _build_graph(saver)
+            with patch("langchain_skills.checkpoint.time.time", return_value=1000.0):
+                graph.invoke({"items": ["a"]}, _config("old"))
+            with patch("langchain_skills.checkpoint.time.time", return_value=1100.0):
+                graph.invoke({"items": ["b"]}, _config("new"))
+
+            assert saver.evict(now=1130.0) == ["old"]
+            assert saver.get_tuple(_config("old")) is None
+            assert saver.thread_ids() == ["new"]
+
+    def test_lru_eviction(self, tmp_path):
+        limits = CheckpointLimits(max_threads=2)
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite", limits) as saver:
+            graph = _build_graph(saver)
+            for i, thread_id in enumerate(["t1", "t2", "t3"]):
+                with patch("langchain_skills.checkpoint.time.time", return_value=1000.0 + i):
+                    graph.invoke({"items": ["x"]}, _config(thread_id))
+            # 读取 t1 使其成为最近访问
+            with patch("langchain_skills.checkpoint.time.time", return_value=2000.0):
+                saver.get_tuple(_config("t1"))
+
+            assert saver.evict(keep="t2") == ["t3"]
+            assert set(saver.thread_ids()) == {"t1", "t2"}
+
+    def test_put_triggers_eviction(self, tmp_path):
+        limits = CheckpointLimits(max_threads=1)
+        with SqliteCheckpointSaver(tmp_path / "cp.sqlite", limits) as saver:
+            graph = _build_graph(saver)
+            graph.invoke({"items": ["x"]}, _config("t1"))
+            saver._last_eviction = 0.0
+            graph.invoke({"items": ["x"]}, _config("t2"))
+
+            assert saver.thread_ids() == ["t2"]
+
+    def test_limits_from_env(self):
+        env = {
+            "SKILLS_THREAD_TTL": "3600",
+            "SKILLS_MAX_THREADS": "100",
+            "SKILLS_MAX_CHECKPOINTS_PER_THREAD": "20",
+            "SKILLS_MAX_THREAD_MB": "0.5",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            limits = CheckpointLimits.from_env()
+        assert limits == CheckpointLimits(3600.0, 100, 20, 512 * 1024)
+
+        with patch.dict(os.environ, {}, clear=True):
+            assert CheckpointLimits.from_env() == CheckpointLimits()
+
+
+class TestCreateCheckpointer:
+    """测试检查点配置"""
+
+    def test_default_is_memory(self):
+        with patch.dict(os.environ, {}, clear=True):
+            assert isinstance(create_checkpointer(), InMemorySaver)
+
+    def test_sqlite_from_env(self, tmp_path):
+        env = {
+            "SKILLS_CHECKPOINTER": "sqlite",
+            "SKILLS_CHECKPOINT_DB": str(tmp_path / "db" / "cp.sqlite"),
+            "SKILLS_MAX_THREADS": "5",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            saver = create_checkpointer()
+        try:
+            assert isinstance(saver, SqliteCheckpointSaver)
+            assert saver.db_path == tmp_path / "db" / "cp.sqlite"
+            assert saver.limits.max_threads == 5
+        finally:
+            saver.close()
+
+    def test_unknown_kind(self):
+        with pytest.raises(ValueError):
+            create_checkpointer("redis")
+
+    def test_agent_uses_checkpointer(self, tmp_path):
+        from langchain_skills.agent import LangChainSkillsAgent
+
+        fake_loader = Mock()
+        fake_loader.build_system_prompt.return_value = "system prompt"
+        saver = InMemorySaver()
+        with patch.dict(
+            os.environ,
+            {"MODEL_PROVIDER": "anthropic", "MODEL_API_KEY": "token"},
+            clear=True,
+        ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader), patch(
+            "langchain_skills.agent.init_chat_model", return_value=object()
+        ), patch("langchain_skills.agent.create_agent", return_value=object()) as create_agent:
+            agent = LangChainSkillsAgent(checkpointer=saver)
+            agent.build_agent()
+
+        assert agent.checkpointer is saver
+        assert create_agent.call_args.kwargs["checkpointer"] is saver
@@ -1,11 +1,13 @@
 """
 CLI 模块单元测试
 
-测试 StreamState 和相关显示函数。
+测试 StreamState、相关显示函数和交互模式的后台初始化。
 """
 
 import pytest
-from langchain_skills.cli import StreamState, format_tool_result, format_tool_args
+from unittest.mock import Mock
+
+from langchain_skills.cli import StreamState, _AgentWarmup, format_tool_result, format_tool_args
 
 
 class TestStreamState:
@@ -173,3 +175,24 @@ class TestFormatFunctions:
         long_args = {"command": "x" * 1000}
         elements = format_tool_args(long_args, max_length=50)
         assert len(elements) > 0
+
+
+class TestAgentWarmup:
+    """测试交互模式的后台初始化"""
+
+    def test_error_is_kept_for_main_thread_once(self, capsys):
+        agent = Mock()
+        agent.build_agent.side_effect = ValueError("unknown provider")
+
+        warmup = _AgentWarmup(agent)
+
+        error = warmup.wait()
+        assert isinstance(error, ValueError)
+        assert warmup.wait() is None
+        # 后台线程不直接打印异常
+        assert "Traceback" not in capsys.readouterr().err
+
+    def test_success(self):
+        agent = Mock()
+        assert _AgentWarmup(agent).wait() is None
+        agent.build_agent.assert_called_once()
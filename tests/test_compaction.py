@@ -0,0 +1,186 @@
+"""
+Compaction 模块单元测试
+
+测试对话压缩：阈值判断、工具结果占位、较早轮次摘要、环境变量配置和中间件的调试记录。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from langchain_skills.compaction import (
+    COMPACTED_PREFIX,
+    CompactionPolicy,
+    CompactionStats,
+    ConversationCompactionMiddleware,
+    compact_messages,
+    messages_tokens,
+)
+
+
+def _turn(index: int, result_size: int = 4000) -> list:
+    """一轮对话：用户请求 → 工具调用 → 工具结果 → 回答"""
+    call_id = f"call_{index}"
+    return [
+        HumanMessage(content=f"request {index}"),
+        AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"path": f"f{index}.txt"}, "id": call_id}]),
+        ToolMessage(content="x" * result_size, tool_call_id=call_id, name="read_file"),
+        AIMessage(content=f"answer {index}"),
+    ]
+
+
+def _history(turns: int, result_size: int = 4000) -> list:
+    messages = []
+    for i in range(turns):
+        messages.extend(_turn(i, result_size))
+    return messages
+
+
+class TestCompactMessages:
+    """compact_messages 测试"""
+
+    def test_below_threshold_unchanged(self):
+        messages = _history(3)
+        compacted, stats = compact_messages(messages, CompactionPolicy(threshold_tokens=100_000))
+        assert compacted is messages
+        assert not stats.compacted
+
+    def test_disabled(self):
+        messages = _history(5)
+        compacted, stats = compact_messages(messages, CompactionPolicy(threshold_tokens=0))
+        assert compacted is messages
+        assert not stats.compacted
+
+    def test_stubs_old_tool_results_first(self):
+        messages = _history(4)
+        before = messages_tokens(messages)
+        policy = CompactionPolicy(threshold_tokens=before - 1500, keep_turns=2)
+
+        compacted, stats = compact_messages(messages, policy)
+
+        assert stats.stubbed_results == 2
+        assert stats.summarized_turns == 0
+        assert stats.tokens_after <= policy.threshold_tokens
+        assert len(compacted) == len(messages)
+        stubs = [m for m in compacted if isinstance(m, ToolMessage) and m.content.startswith(COMPACTED_PREFIX)]
+        assert [m.tool_call_id for m in stubs] == ["call_0", "call_1"]
+        # 最近两轮原样保留
+        assert compacted[8:] == messages[8:]
+        # 不修改原消息
+        assert messages[2].content == "x" * 4000
+
+    def test_summarizes_old_turns_when_still_over(self):
+        messages = _history(4)
+        policy = CompactionPolicy(threshold_tokens=1100, keep_turns=1)
+
+        compacted, stats = compact_messages(messages, policy)
+
+        assert stats.summarized_turns == 3
+        summary = compacted[0]
+        assert isinstance(summary, HumanMessage)
+        assert summary.content.startswith(COMPACTED_PREFIX)
+        assert "request 0" in summary.content
+        assert 'read_file({"path":"f1.txt"})' in summary.content
+        assert "answer 2" in summary.content
+        assert compacted[1:] == messages[12:]
+        assert stats.tokens_after < stats.tokens_before
+
+    def test_keeps_everything_with_too_few_turns(self):
+        messages = _history(2)
+        compacted, stats = compact_messages(messages, CompactionPolicy(threshold_tokens=10, keep_turns=2))
+        assert compacted is messages
+        assert not stats.compacted
+
+    def test_small_tool_results_not_stubbed(self):
+        messages = _history(3, result_size=40)
+        policy = CompactionPolicy(threshold_tokens=10, keep_turns=1, stub_min_tokens=200)
+        compacted, stats = compact_messages(messages, policy)
+        assert stats.stubbed_results == 0
+        # 只能通过摘要压缩
+        assert stats.summarized_turns == 2
+
+    def test_repeated_compaction_does_not_count_summary_as_turn(self):
+        messages = _history(4)
+        policy = CompactionPolicy(threshold_tokens=1100, keep_turns=1)
+        compacted, _ = compact_messages(messages, policy)
+        again, stats = compact_messages(compacted + _turn(9), policy)
+        assert stats.summarized_turns == 1
+        assert again[0].content.count(COMPACTED_PREFIX) == 1
+        # 之前摘要中的内容仍然保留
+        assert "request 0" in again[0].content
+        assert "request 3" in again[0].content
+
+
+class TestCompactionPolicy:
+    """CompactionPolicy 配置测试"""
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {
+            "SKILLS_COMPACT_THRESHOLD_TOKENS": "5000",
+            "SKILLS_COMPACT_KEEP_TURNS": "3",
+        }):
+            policy = CompactionPolicy.from_env()
+        assert policy.threshold_tokens == 5000
+        assert policy.keep_turns == 3
+        assert policy.enabled
+
+    def test_from_env_disabled(self):
+        with patch.dict(os.environ, {"SKILLS_COMPACT_THRESHOLD_TOKENS": "0"}):
+            assert not CompactionPolicy.from_env().enabled
+
+
+def test_middleware_last_stats_keeps_most_recent_threads():
+    messages = _history(4)
+    middleware = ConversationCompactionMiddleware(
+        CompactionPolicy(threshold_tokens=messages_tokens(messages) - 1500, keep_turns=2)
+    )
+
+    def compact(thread_id):
+        runtime = SimpleNamespace(execution_info=SimpleNamespace(thread_id=thread_id))
+        middleware._compact(Mock(messages=messages, runtime=runtime))
+
+    with patch("langchain_skills.compaction.MAX_STATS_THREADS", 2):
+        for thread_id in ["t1", "t2", "t1", "t3"]:
+            compact(thread_id)
+
+    assert list(middleware.last_stats) == ["t1", "t3"]
+
+
+
+def test_middleware_last_stats_is_thread_safe():
+    class SlowStats(OrderedDict):
+        """赋值后让出 GIL，放大赋值与 move_to_end 之间的竞争窗口"""
+
+        def __setitem__(self, key, value):
+            super().__setitem__(key, value)
+            time.sleep(0.001)
+
+    middleware = ConversationCompactionMiddleware(CompactionPolicy(threshold_tokens=1, keep_turns=1))
+    middleware.last_stats = SlowStats()
+    stats = CompactionStats(tokens_before=2, tokens_after=1, stubbed_results=1)
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(50):
+                runtime = SimpleNamespace(execution_info=SimpleNamespace(thread_id=f"t{n}-{i}"))
+                middleware._compact(Mock(messages=[], runtime=runtime))
+        except Exception as e:
+            errors.append(e)
+
+    with patch("langchain_skills.compaction.MAX_STATS_THREADS", 1), patch(
+        "langchain_skills.compaction.compact_messages", return_value=([], stats)
+    ):
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert errors == []
+    assert len(middleware.last_stats) == 1
@@ -0,0 +1,74 @@
+"""Numeric environment variable parsing tests."""
+
+from __future__ import annotations
+
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from langchain_skills.agent import LangChainSkillsAgent
+from langchain_skills.budget import TurnBudget
+from langchain_skills.env import env_number
+from langchain_skills.fake_model import create_fake_chat_model
+from langchain_skills.model_registry import ModelRegistry
+from langchain_skills.stream import DEFAULT_OUTPUT_TOKEN_BUDGET
+
+
+def test_env_number_parses_int_and_float():
+    with patch.dict(os.environ, {"SKILLS_N": " 12 ", "SKILLS_F": "0.5"}, clear=True):
+        assert env_number("SKILLS_N", 3) == 12
+        assert env_number("SKILLS_F", 1.0, float) == 0.5
+
+
+def test_env_number_unset_or_blank_uses_default_silently(recwarn):
+    with patch.dict(os.environ, {"SKILLS_N": "  "}, clear=True):
+        assert env_number("SKILLS_N", 3) == 3
+        assert env_number("SKILLS_MISSING", 2.5, float) == 2.5
+    assert not recwarn.list
+
+
+def test_env_number_invalid_value_warns_and_falls_back():
+    with patch.dict(os.environ, {"SKILLS_N": "12k"}, clear=True):
+        with pytest.warns(RuntimeWarning, match="SKILLS_N"):
+            assert env_number("SKILLS_N", 3) == 3
+
+
+def test_turn_budget_from_env_tolerates_typos():
+    with patch.dict(
+        os.environ,
+        {"SKILLS_MAX_TOOL_CALLS": "ten", "SKILLS_MAX_TURN_SECONDS": "1m"},
+        clear=True,
+    ):
+        with pytest.warns(RuntimeWarning):
+            budget = TurnBudget.from_env()
+    assert budget.max_tool_calls is None
+    assert budget.max_wall_time is None
+
+
+def test_fake_model_tolerates_invalid_pacing():
+    with patch.dict(
+        os.environ,
+        {"SKILLS_FAKE_TPS": "fast", "SKILLS_FAKE_LATENCY_MS": "10ms"},
+        clear=True,
+    ):
+        with pytest.warns(RuntimeWarning):
+            model = create_fake_chat_model("fake")
+    assert model.tokens_per_second == 0
+    assert model.latency == 0
+
+
+def test_agent_builds_with_invalid_tool_output_budget(tmp_path):
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+
+    with patch.dict(
+        os.environ,
+        {"MODEL_PROVIDER": "fake", "TOOL_OUTPUT_MAX_TOKENS": "2k"},
+        clear=True,
+    ), patch("langchain_skills.agent.SkillLoader", return_value=fake_loader):
+        with pytest.warns(RuntimeWarning, match="TOOL_OUTPUT_MAX_TOKENS"):
+            agent = LangChainSkillsAgent(working_directory=tmp_path, model_registry=ModelRegistry())
+        agent.build_agent()
+
+    assert agent.context.max_output_tokens == DEFAULT_OUTPUT_TOKEN_BUDGET
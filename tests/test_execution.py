@@ -0,0 +1,201 @@
+"""
+Execution 模块单元测试
+
+测试并行工具调用的执行策略：单工具并发上限、结果排序和环境变量配置。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from langchain_core.tools import tool
+
+from langchain_skills.execution import (
+    OrderedResultBuffer,
+    SharedSemaphore,
+    ToolConcurrencyLimiter,
+    ToolExecutionPolicy,
+    apply_execution_policy,
+)
+from langchain_skills.tools import ALL_TOOLS, SkillAgentContext
+
+
+class MockRuntime:
+    """模拟 ToolRuntime"""
+    def __init__(self, working_directory: Path):
+        self.context = SkillAgentContext(skill_loader=Mock(), working_directory=working_directory)
+
+
+def _tracking_tool(name: str, delay: float = 0.05, state: dict = None):
+    """记录最大并发数的工具（传入同一个 state 可统计多个工具的总并发）"""
+    state = state if state is not None else {"active": 0, "peak": 0, "lock": threading.Lock()}
+    lock = state["lock"]
+
+    def run(runtime=None) -> str:
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        return "[OK]"
+
+    run.__name__ = name
+    run.__doc__ = "测试工具"
+    return tool(run), state
+
+
+def _run_parallel(func, kwargs_list):
+    threads = [threading.Thread(target=func, kwargs=kwargs) for kwargs in kwargs_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class TestToolExecutionPolicy:
+    """测试策略配置"""
+
+    def test_defaults(self):
+        with patch.dict(os.environ, {}, clear=True):
+            policy = ToolExecutionPolicy.from_env()
+        assert policy.max_concurrency is None
+        assert policy.tool_limits == {"bash": 1}
+        assert policy.ordered_results is True
+
+    def test_from_env(self):
+        env = {
+            "SKILLS_TOOL_CONCURRENCY": "4",
+            "SKILLS_TOOL_LIMITS": "grep=2, bash=0,bad,x=y",
+            "SKILLS_ORDERED_TOOL_RESULTS": "false",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            policy = ToolExecutionPolicy.from_env()
+        assert policy.max_concurrency == 4
+        assert policy.tool_limits == {"bash": 0, "grep": 2}
+        assert policy.ordered_results is False
+
+
+class TestToolConcurrencyLimiter:
+    """测试单工具并发上限"""
+
+    def test_unlimited_tools_are_unchanged(self):
+        tools = apply_execution_policy(ALL_TOOLS, ToolExecutionPolicy())
+        for original, limited in zip(ALL_TOOLS, tools):
+            if original.name == "bash":
+                assert limited is not original
+                assert limited.args == original.args
+            else:
+                assert limited is original
+
+    def test_limit_per_working_directory(self, tmp_path):
+        slow, state = _tracking_tool("bash")
+        limited = ToolConcurrencyLimiter(ToolExecutionPolicy()).wrap(slow)
+
+        runtime = MockRuntime(tmp_path)
+        _run_parallel(limited.func, [{"runtime": runtime}] * 4)
+        assert state["peak"] == 1
+
+        state["peak"] = 0
+        other = tmp_path / "other"
+        runtimes = [MockRuntime(tmp_path), MockRuntime(other)] * 2
+        _run_parallel(limited.func, [{"runtime": r} for r in runtimes])
+        assert state["peak"] == 2
+
+    def test_shared_limit_without_working_directory_scope(self, tmp_path):
+        slow, state = _tracking_tool("grep")
+        policy = ToolExecutionPolicy(tool_limits={"grep": 2}, per_working_directory=False)
+        limited = ToolConcurrencyLimiter(policy).wrap(slow)
+
+        runtimes = [MockRuntime(tmp_path / str(i)) for i in range(6)]
+        _run_parallel(limited.func, [{"runtime": r} for r in runtimes])
+        assert state["peak"] == 2
+
+    def test_global_limit_across_tools(self, tmp_path):
+        read, state = _tracking_tool("read_file")
+        grep, _ = _tracking_tool("grep", state=state)
+        limiter = ToolConcurrencyLimiter(ToolExecutionPolicy(max_concurrency=2, tool_limits={}))
+        limited = [limiter.wrap(read), limiter.wrap(grep)] * 3
+
+        runtime = MockRuntime(tmp_path)
+        threads = [threading.Thread(target=t.func, kwargs={"runtime": runtime}) for t in limited]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert state["peak"] == 2
+
+
+class TestSharedSemaphore:
+    """测试线程 / 事件循环共用的信号量"""
+
+    def test_async_waiters_are_served_in_order(self):
+        semaphore = SharedSemaphore(1)
+        order = []
+
+        async def worker(i):
+            await semaphore.acquire_async()
+            order.append(i)
+            await asyncio.sleep(0.01)
+            semaphore.release()
+
+        async def run():
+            await asyncio.gather(*(worker(i) for i in range(5)))
+
+        asyncio.run(run())
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_cancelled_waiter_does_not_leak_permit(self):
+        semaphore = SharedSemaphore(1)
+
+        async def run():
+            await semaphore.acquire_async()
+            waiter = asyncio.ensure_future(semaphore.acquire_async())
+            await asyncio.sleep(0)
+            semaphore.release()
+            # 名额已交给 waiter，但在它运行前被取消：名额应归还
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            await asyncio.wait_for(semaphore.acquire_async(), timeout=1)
+
+        asyncio.run(run())
+
+    def test_thread_and_loop_share_permits(self):
+        semaphore = SharedSemaphore(1)
+        semaphore.acquire()
+        acquired = threading.Event()
+
+        async def run():
+            await semaphore.acquire_async()
+            acquired.set()
+            semaphore.release()
+
+        thread = threading.Thread(target=asyncio.run, args=(run(),))
+        thread.start()
+        time.sleep(0.05)
+        assert not acquired.is_set()
+        semaphore.release()
+        thread.join(timeout=5)
+        assert acquired.is_set()
+
+
+class TestOrderedResultBuffer:
+    """测试结果排序"""
+
+    def test_releases_in_call_order(self):
+        buffer = OrderedResultBuffer()
+        order = ["a", "b", "c"]
+        assert buffer.push("c", "C", order) == []
+        assert buffer.push("a", "A", order) == ["A"]
+        assert buffer.push("b", "B", order) == ["B", "C"]
+        assert buffer.flush() == []
+
+    def test_unknown_and_missing_ids(self):
+        buffer = OrderedResultBuffer()
+        assert buffer.push("", "X", ["a"]) == ["X"]
+        assert buffer.push("zzz", "Z", ["a"]) == ["Z"]
+        assert buffer.push("b", "B", ["a", "b"]) == []
+        assert buffer.flush() == ["B"]
@@ -0,0 +1,103 @@
+"""
+Fake model 单元测试
+
+测试离线脚本模型：步骤选择、流式输出、速率 / 延迟控制和脚本文件。
+"""
+
+import asyncio
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from langchain_skills.fake_model import FakeStreamingChatModel, create_fake_chat_model, load_script
+
+
+SCRIPT = [
+    {"thinking": "plan it", "text": "Checking.", "tool_calls": [{"name": "list_dir", "args": {"path": "."}}]},
+    {"text": "Answer for {input}"},
+]
+
+
+class TestFakeStreamingChatModel:
+    """FakeStreamingChatModel 测试"""
+
+    def test_first_step_streams_thinking_text_and_tool_call(self):
+        model = FakeStreamingChatModel(script=SCRIPT)
+        chunks = list(model.stream([HumanMessage(content="hi")]))
+
+        reasoning = [c for c in chunks if isinstance(c.content, list)]
+        assert "".join(b["reasoning"] for c in reasoning for b in c.content) == "plan it"
+        assert "".join(c.content for c in chunks if isinstance(c.content, str)) == "Checking."
+
+        message = model.invoke([HumanMessage(content="hi")])
+        assert message.tool_calls[0]["name"] == "list_dir"
+        assert message.tool_calls[0]["args"] == {"path": "."}
+        assert message.usage_metadata["output_tokens"] > 0
+
+    def test_step_advances_after_tool_result(self):
+        model = FakeStreamingChatModel(script=SCRIPT)
+        history = [
+            HumanMessage(content="old"),
+            AIMessage(content="x"),
+            HumanMessage(content="report"),
+            AIMessage(content="", tool_calls=[{"name": "list_dir", "args": {}, "id": "c1"}]),
+            ToolMessage(content="[OK]", tool_call_id="c1"),
+        ]
+        message = model.invoke(history)
+        assert message.content == "Answer for report"
+        assert not message.tool_calls
+
+    def test_last_step_repeats(self):
+        model = FakeStreamingChatModel(script=[{"text": "only"}])
+        history = [HumanMessage(content="a"), AIMessage(content="only"), AIMessage(content="only")]
+        assert model.invoke(history).content == "only"
+
+    def test_thinking_can_be_disabled(self):
+        model = FakeStreamingChatModel(script=SCRIPT, emit_thinking=False)
+        chunks = list(model.stream([HumanMessage(content="hi")]))
+        assert not [c for c in chunks if isinstance(c.content, list)]
+
+    def test_tokens_per_second_and_latency(self):
+        model = FakeStreamingChatModel(script=[{"text": "a b c d e f g h i j"}], tokens_per_second=200, latency=0.05)
+        started = time.perf_counter()
+        list(model.stream([HumanMessage(content="hi")]))
+        # 50ms 延迟 + 9 个 token 间隔（5ms）
+        assert time.perf_counter() - started >= 0.09
+
+    def test_async_stream_matches_sync(self):
+        model = FakeStreamingChatModel(script=SCRIPT, tokens_per_second=1000)
+
+        async def collect():
+            return [chunk async for chunk in model.astream([HumanMessage(content="hi")])]
+
+        async_chunks = asyncio.run(collect())
+        sync_chunks = list(model.stream([HumanMessage(content="hi")]))
+        assert [c.content for c in async_chunks] == [c.content for c in sync_chunks]
+
+
+class TestCreateFakeChatModel:
+    """环境变量配置测试"""
+
+    def test_from_env(self, tmp_path):
+        script = tmp_path / "script.json"
+        script.write_text(json.dumps([{"text": "scripted"}]))
+        with patch.dict(os.environ, {
+            "SKILLS_FAKE_SCRIPT": str(script),
+            "SKILLS_FAKE_TPS": "50",
+            "SKILLS_FAKE_LATENCY_MS": "20",
+        }):
+            model = create_fake_chat_model("fake-model", emit_thinking=False, temperature=1.0)
+        assert model.script == [{"text": "scripted"}]
+        assert model.tokens_per_second == 50
+        assert model.latency == pytest.approx(0.02)
+        assert model.emit_thinking is False
+
+    def test_invalid_script(self, tmp_path):
+        script = tmp_path / "script.json"
+        script.write_text("{}")
+        with pytest.raises(ValueError):
+            load_script(str(script))
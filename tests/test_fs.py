@@ -0,0 +1,589 @@
+"""
+FS 模块单元测试
+
+测试文件工具底层实现：行窗口读取、二进制嗅探、grep 搜索等。
+"""
+
+import os
+import re
+import threading
+
+import pytest
+
+from langchain_skills.fs import (
+    SNIFF_BYTES,
+    read_line_window,
+    get_line_index,
+    clear_line_index_cache,
+    sniff_bytes,
+    classify_file,
+    clear_sniff_cache,
+    iter_search_files,
+    search,
+    search_file,
+    TrigramIndex,
+    query_trigrams,
+    compile_glob,
+    parse_ignore_lines,
+    IgnoreMatcher,
+    walk,
+    split_glob,
+    iter_glob,
+    stage_write,
+    atomic_write_text,
+    FileContentCache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    clear_line_index_cache()
+    clear_sniff_cache()
+    yield
+    clear_line_index_cache()
+    clear_sniff_cache()
+
+
+class TestReadLineWindow:
+    """测试基于行索引的窗口读取"""
+
+    def test_reads_first_window(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("one\ntwo\nthree")
+
+        window = read_line_window(path, offset=1, limit=2)
+
+        assert window.lines == [b"one", b"two"]
+        assert window.start_line == 1
+        assert window.end_line == 2
+        assert window.has_more is True
+
+    def test_reads_middle_window(self, tmp_path):
+        path = tmp_path / "big.txt"
+        path.write_text("\n".join(f"line {i}" for i in range(1, 10001)))
+
+        window = read_line_window(path, offset=5000, limit=3)
+
+        assert window.lines == [b"line 5000", b"line 5001", b"line 5002"]
+        assert window.has_more is True
+        # 只扫描到窗口附近，尚不知道总行数
+        assert window.total_lines is None
+
+    def test_last_window_reports_total(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("a\nb\nc")
+
+        window = read_line_window(path, offset=2, limit=10)
+
+        assert window.lines == [b"b", b"c"]
+        assert window.has_more is False
+        assert window.total_lines == 3
+
+    def test_trailing_newline_matches_split(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("a\nb\n")
+
+        window = read_line_window(path)
+
+        assert window.lines == "a\nb\n".encode().split(b"\n")
+
+    def test_offset_beyond_end(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("a\nb")
+
+        window = read_line_window(path, offset=10, limit=5)
+
+        assert window.lines == []
+        assert window.total_lines == 2
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.txt"
+        path.write_text("")
+
+        window = read_line_window(path)
+
+        assert window.lines == [b""]
+        assert window.has_more is False
+
+    def test_index_is_cached_and_invalidated_by_mtime(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("a\nb\nc")
+        read_line_window(path)
+        index = get_line_index(path)
+        assert get_line_index(path) is index
+
+        path.write_text("x\ny")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert get_line_index(path) is not index
+        assert read_line_window(path).lines == [b"x", b"y"]
+
+    def test_scan_of_one_file_does_not_block_others(self, tmp_path):
+        busy = tmp_path / "busy.txt"
+        busy.write_text("a\nb\nc")
+        other = tmp_path / "other.txt"
+        other.write_text("x\ny")
+        result = []
+
+        # 模拟另一个线程正在扫描 busy.txt
+        with get_line_index(busy).lock:
+            reader = threading.Thread(target=lambda: result.append(read_line_window(other).lines))
+            reader.start()
+            reader.join(timeout=5)
+
+        assert result == [[b"x", b"y"]]
+
+
+class TestSniff:
+    """测试二进制嗅探与编码检测"""
+
+    def test_plain_utf8(self):
+        kind = sniff_bytes("hello 世界\n".encode("utf-8"), complete=True)
+        assert kind.is_binary is False
+        assert kind.encoding == "utf-8"
+
+    def test_nul_bytes_are_binary(self):
+        kind = sniff_bytes(b"abc\x00def")
+        assert kind.is_binary is True
+        assert kind.reason == "nul-bytes"
+
+    def test_magic_number(self):
+        kind = sniff_bytes(b"\x89PNG\r\n\x1a\n....")
+        assert kind.is_binary is True
+        assert kind.reason == "magic:png"
+
+    def test_utf16_bom_is_text(self):
+        kind = sniff_bytes("hi\n".encode("utf-16"))
+        assert kind.is_binary is False
+        assert kind.encoding == "utf-16"
+        assert kind.line_addressable is False
+
+    def test_gb18030_fallback(self):
+        kind = sniff_bytes("中文内容".encode("gb18030"), complete=True)
+        assert kind.encoding == "gb18030"
+
+    def test_truncated_multibyte_at_sample_end(self):
+        sample = ("a" * 10 + "中").encode("utf-8")[:-1]
+        assert sniff_bytes(sample, complete=False).encoding == "utf-8"
+
+    def test_classify_file_only_reads_head(self, tmp_path):
+        path = tmp_path / "blob.bin"
+        path.write_bytes(b"\x00" * 16 + b"x" * (SNIFF_BYTES * 4))
+        kind = classify_file(path)
+        assert kind.is_binary is True
+
+    def test_classify_file_is_cached_by_mtime(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("text")
+        assert classify_file(path).is_binary is False
+
+        path.write_bytes(b"\x00\x01\x02\x03\x04")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert classify_file(path).is_binary is True
+
+
+class TestSearch:
+    """测试 mmap grep 引擎"""
+
+    def test_literal_and_regex_line_numbers(self, tmp_path):
+        path = tmp_path / "a.py"
+        path.write_text("import os\ndef foo():\n    pass\ndef bar():\n")
+
+        assert search_file(path, "def", 10) == [(2, "def foo():"), (4, "def bar():")]
+        assert search_file(path, r"def \w+\(", 10) == [(2, "def foo():"), (4, "def bar():")]
+
+    def test_regex_cannot_span_lines(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("foo\nbar\nfoo bar\n")
+
+        assert search_file(path, r"foo\sbar", 10) == [(3, "foo bar")]
+
+    def test_crlf_dollar_anchor(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_bytes(b"end\r\nnot end here\r\nend\r\n")
+
+        assert search_file(path, r"end$", 10) == [(1, "end"), (3, "end")]
+
+    @pytest.mark.parametrize(
+        "pattern",
+        [r"x.y", r"x\Sy", r"x[^a]y", r"x\wy", r"(?u)x\w"],
+    )
+    def test_character_semantics_match_decoded_text(self, tmp_path, pattern):
+        path = tmp_path / "a.txt"
+        path.write_text("无关\nx中y\n", encoding="utf-8")
+
+        assert search_file(path, pattern, 10) == [(2, "x中y")]
+        assert re.search(pattern, "x中y")
+
+    def test_char_sensitive_patterns_do_not_match_across_bytes(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("x中y\n", encoding="utf-8")
+
+        # 多字节字符的单个字节不应被 . 匹配
+        assert search_file(path, r"x..y", 10) == []
+        assert search_file(path, r"x\s", 10) == []
+        # 中 是单词字符，y 前没有单词边界
+        assert search_file(path, r"\by", 10) == []
+
+    def test_ascii_regex_on_cjk_file(self, tmp_path):
+        path = tmp_path / "a.md"
+        path.write_text("# 标题\n版本 v1.2 发布\n", encoding="utf-8")
+
+        assert search_file(path, r"v[0-9]+", 10) == [(2, "版本 v1.2 发布")]
+        assert search_file(path, r"v1\.2", 10) == [(2, "版本 v1.2 发布")]
+
+    def test_gb18030_file(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_bytes("第一行\n查找目标\n".encode("gb18030"))
+
+        assert search_file(path, "目标", 10) == [(2, "查找目标")]
+
+    def test_binary_file_skipped(self, tmp_path):
+        path = tmp_path / "a.bin"
+        path.write_bytes(b"foo\x00bar")
+
+        assert search_file(path, "foo", 10) is None
+
+    def test_stops_at_max_results(self, tmp_path):
+        for i in range(5):
+            (tmp_path / f"f{i}.txt").write_text("hit\nhit\n")
+
+        result = search("hit", tmp_path, max_results=3, workers=1)
+
+        assert len(result.matches) == 3
+        assert result.truncated
+        assert result.files_searched == 2
+
+    def test_skips_hidden_and_vendor_dirs(self, tmp_path):
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".git" / "config").write_text("hit")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "x.js").write_text("hit")
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "a.py").write_text("hit")
+
+        assert list(iter_search_files(tmp_path)) == [tmp_path / "src" / "a.py"]
+
+    def test_parallel_matches_serial_order(self, tmp_path):
+        for i in range(150):
+            (tmp_path / f"f{i:03d}.txt").write_text(f"line\nneedle {i}\n")
+
+        serial = search("needle", tmp_path, max_results=100, workers=1)
+        parallel = search("needle", tmp_path, max_results=100, workers=2, serial_threshold=0)
+
+        assert [(m.path, m.line_number, m.line) for m in parallel.matches] == [
+            (m.path, m.line_number, m.line) for m in serial.matches
+        ]
+        assert parallel.truncated
+
+    def test_invalid_pattern_raises(self, tmp_path):
+        with pytest.raises(re.error):
+            search("(", tmp_path)
+
+
+class TestTrigramIndex:
+    """测试持久化 trigram 索引"""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        root = tmp_path / "repo"
+        root.mkdir()
+        index = TrigramIndex(root, db_path=tmp_path / "index.sqlite")
+        yield index
+        index.close()
+
+    def test_query_trigrams_from_literals(self):
+        assert query_trigrams("foo") == {(ord("f") << 16) | (ord("o") << 8) | ord("o")}
+        assert query_trigrams(r"def \w+\(") == query_trigrams("def ")
+
+    def test_query_trigrams_gives_up_on_alternation_and_flags(self):
+        assert query_trigrams("foo|bar") is None
+        assert query_trigrams("(?i)foobar") is None
+        assert query_trigrams("a.b") is None
+
+    def test_optional_chars_not_required(self):
+        # "colou?r" 中 u 可选，"colo" 之后的字面量不能相邻拼接
+        assert query_trigrams("colou?r") == query_trigrams("colo")
+        assert query_trigrams(r"\x41BCD") == query_trigrams("BCD")
+
+    def test_candidates_narrow_files(self, index):
+        (index.root / "a.py").write_text("def needle():\n")
+        (index.root / "b.py").write_text("def other():\n")
+
+        assert index.candidates("needle", index.root) == [index.root / "a.py"]
+
+    def test_candidates_follow_walk_order(self, index):
+        (index.root / "sub").mkdir()
+        (index.root / "sub" / "a.py").write_text("needle")
+        (index.root / "z.py").write_text("needle")
+
+        assert index.candidates("needle", index.root) == list(iter_search_files(index.root))
+
+    def test_incremental_refresh(self, index):
+        path = index.root / "a.py"
+        path.write_text("nothing")
+        assert index.candidates("needle", index.root) == []
+
+        path.write_text("needle here")
+        os.utime(path, ns=(1, 1))
+        assert index.candidates("needle", index.root) == [path]
+        assert index.refresh() == 0
+
+        path.unlink()
+        assert index.candidates("needle", index.root) == []
+
+    def test_update_file(self, index):
+        path = index.root / "a.py"
+        path.write_text("nothing")
+        index.refresh()
+
+        path.write_text("needle")
+        index.update_file(path)
+
+        assert index.candidates("needle", index.root, refresh=False) == [path]
+
+    def test_binary_files_never_candidates(self, index):
+        (index.root / "a.bin").write_bytes(b"needle\x00")
+
+        assert index.candidates("needle", index.root) == []
+
+    def test_persists_across_instances(self, index, tmp_path):
+        (index.root / "a.py").write_text("needle")
+        index.refresh()
+
+        reopened = TrigramIndex(index.root, db_path=index.db_path)
+        try:
+            assert reopened.refresh() == 0
+            assert reopened.candidates("needle", index.root) == [index.root / "a.py"]
+        finally:
+            reopened.close()
+
+
+def _make_tree(root, files):
+    for rel, content in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+class TestWalker:
+    """测试遵守忽略规则的目录遍历"""
+
+    def test_glob_translation(self):
+        assert compile_glob("**/*.py").fullmatch("a.py")
+        assert compile_glob("**/*.py").fullmatch("src/pkg/a.py")
+        assert not compile_glob("*.py").fullmatch("src/a.py")
+        assert compile_glob("src/**/*.ts").fullmatch("src/a.ts")
+        assert compile_glob("file[!0-9].txt").fullmatch("filex.txt")
+        assert not compile_glob("file[!0-9].txt").fullmatch("file1.txt")
+
+    def test_ignore_rules(self):
+        matcher = IgnoreMatcher().child("", parse_ignore_lines([
+            "# comment",
+            "*.log",
+            "!keep.log",
+            "build/",
+            "/top.txt",
+            "docs/**/*.tmp",
+        ]))
+
+        assert matcher.is_ignored("a.log", False)
+        assert matcher.is_ignored("sub/a.log", False)
+        assert not matcher.is_ignored("sub/keep.log", False)
+        assert matcher.is_ignored("sub/build", True)
+        assert not matcher.is_ignored("sub/build", False)
+        assert matcher.is_ignored("top.txt", False)
+        assert not matcher.is_ignored("sub/top.txt", False)
+        assert matcher.is_ignored("docs/a/b/x.tmp", False)
+
+    def test_walk_honours_gitignore_and_excludes(self, tmp_path):
+        _make_tree(tmp_path, {
+            ".gitignore": "*.log\nbuild/\n",
+            "a.py": "",
+            "a.log": "",
+            "build/out.py": "",
+            "node_modules/x.js": "",
+            "src/.ignore": "generated.py\n",
+            "src/generated.py": "",
+            "src/main.py": "",
+        })
+
+        paths = [e.rel_path for e in walk(tmp_path, exclude=("node_modules/",))]
+
+        assert paths == [".gitignore", "a.py", "src/.ignore", "src/main.py"]
+
+    def test_walk_is_preorder_sorted(self, tmp_path):
+        _make_tree(tmp_path, {"b.txt": "", "a/z.txt": "", "a/b/c.txt": "", "c.txt": ""})
+
+        paths = [e.rel_path for e in walk(tmp_path, include_dirs=True)]
+
+        assert paths == ["a", "a/b", "a/b/c.txt", "a/z.txt", "b.txt", "c.txt"]
+
+    def test_skip_hidden_and_max_depth(self, tmp_path):
+        _make_tree(tmp_path, {".env": "", "a.txt": "", "sub/b.txt": ""})
+
+        paths = [e.rel_path for e in walk(tmp_path, skip_hidden=True, max_depth=1, include_dirs=True)]
+
+        assert paths == ["a.txt", "sub"]
+
+    def test_base_rules_apply_to_subdirectory_walk(self, tmp_path):
+        _make_tree(tmp_path, {".gitignore": "src/skip/\n", "src/skip/a.py": "", "src/keep/a.py": ""})
+
+        paths = [e.rel_path for e in walk(tmp_path / "src", base=tmp_path)]
+
+        assert paths == ["keep/a.py"]
+
+    def test_ignored_directories_are_not_scanned(self, tmp_path, monkeypatch):
+        _make_tree(tmp_path, {".gitignore": "big/\n", "big/a.txt": "", "a.txt": ""})
+        scanned = []
+        real_scandir = os.scandir
+
+        def tracking_scandir(path):
+            scanned.append(os.fspath(path))
+            return real_scandir(path)
+
+        monkeypatch.setattr(os, "scandir", tracking_scandir)
+        list(walk(tmp_path))
+
+        assert os.fspath(tmp_path / "big") not in scanned
+
+    def test_walk_is_lazy(self, tmp_path):
+        for i in range(10):
+            (tmp_path / f"d{i}").mkdir()
+            (tmp_path / f"d{i}" / "f.txt").write_text("")
+
+        first = next(walk(tmp_path))
+
+        assert first.rel_path == "d0/f.txt"
+
+
+class TestIterGlob:
+    """测试惰性 glob"""
+
+    def test_split_literal_prefix(self):
+        assert split_glob("src/**/*.ts") == ("src", "**/*.ts")
+        assert split_glob("*.md") == ("", "*.md")
+        assert split_glob("a/b/c.txt") == ("a/b", "c.txt")
+        assert split_glob("a/*/c.txt") == ("a", "*/c.txt")
+
+    def test_matches_relative_to_root(self, tmp_path):
+        _make_tree(tmp_path, {"README.md": "", "src/a.ts": "", "src/sub/b.ts": "", "lib/c.ts": ""})
+
+        assert [p for p, _ in iter_glob("src/**/*.ts", tmp_path)] == ["src/a.ts", "src/sub/b.ts"]
+        assert [p for p, _ in iter_glob("*.md", tmp_path)] == ["README.md"]
+        assert [p for p, _ in iter_glob("./lib/*.ts", tmp_path)] == ["lib/c.ts"]
+
+    def test_depth_limited_without_double_star(self, tmp_path, monkeypatch):
+        _make_tree(tmp_path, {"a.py": "", "deep/er/b.py": ""})
+        scanned = []
+        real_scandir = os.scandir
+
+        def tracking_scandir(path):
+            scanned.append(os.fspath(path))
+            return real_scandir(path)
+
+        monkeypatch.setattr(os, "scandir", tracking_scandir)
+
+        assert [p for p, _ in iter_glob("*.py", tmp_path)] == ["a.py"]
+        assert scanned == [os.fspath(tmp_path)]
+
+    def test_missing_prefix_yields_nothing(self, tmp_path):
+        assert list(iter_glob("missing/*.py", tmp_path)) == []
+
+
+class TestAtomicWrite:
+    """测试原子写入"""
+
+    def test_replaces_content_and_keeps_mode(self, tmp_path):
+        path = tmp_path / "a.sh"
+        path.write_text("old")
+        path.chmod(0o750)
+
+        atomic_write_text(path, "new")
+
+        assert path.read_text() == "new"
+        assert path.stat().st_mode & 0o777 == 0o750
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX permission bits")
+    def test_new_file_follows_umask_without_changing_it(self, tmp_path):
+        previous = os.umask(0o027)
+        try:
+            atomic_write_text(tmp_path / "new.txt", "data")
+            assert os.umask(0o027) == 0o027
+        finally:
+            os.umask(previous)
+
+        assert (tmp_path / "new.txt").stat().st_mode & 0o777 == 0o640
+
+    def test_failed_stage_leaves_target_untouched(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+
+        def chunks():
+            yield b"partial"
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            stage_write(path, chunks())
+
+        assert path.read_text() == "old"
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.skipif(os.name == "nt", reason="symlinks need privileges on Windows")
+    def test_writes_through_symlink(self, tmp_path):
+        target = tmp_path / "target.txt"
+        target.write_text("old")
+        link = tmp_path / "link.txt"
+        link.symlink_to(target)
+
+        atomic_write_text(link, "new")
+
+        assert link.is_symlink()
+        assert target.read_text() == "new"
+        assert sorted(tmp_path.iterdir()) == [link, target]
+
+
+class TestFileContentCache:
+    """测试按 mtime 校验、按字节淘汰的内容缓存"""
+
+    def test_hit_after_first_read(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("hello")
+        cache = FileContentCache()
+
+        assert cache.read(path).text == "hello"
+        assert cache.read(path).text == "hello"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_invalidated_by_mtime(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("hello")
+        cache = FileContentCache()
+        cache.read(path)
+
+        path.write_text("hello")
+        os.utime(path, ns=(1, 1))
+
+        assert cache.peek(path) is None
+
+    def test_evicts_by_bytes(self, tmp_path):
+        cache = FileContentCache(max_bytes=10)
+        for name in ("a", "b", "c"):
+            (tmp_path / name).write_text("1234")
+            cache.read(tmp_path / name)
+
+        assert cache.peek(tmp_path / "a") is None
+        assert cache.peek(tmp_path / "c") is not None
+        assert cache.total_bytes == 8
+
+    def test_skips_large_and_binary_files(self, tmp_path):
+        cache = FileContentCache(max_file_bytes=4)
+        (tmp_path / "big.txt").write_text("12345")
+        (tmp_path / "a.bin").write_bytes(b"\x00\x01")
+
+        assert cache.read(tmp_path / "big.txt") is None
+        assert cache.read(tmp_path / "a.bin") is None
+        assert len(cache) == 0
@@ -0,0 +1,159 @@
+"""
+Metrics 模块单元测试
+
+测试工具调用指标的记录、聚合以及对原工具的包装。
+"""
+
+import asyncio
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.tools import tool
+
+from langchain_skills.metrics import (
+    ToolCallMetrics,
+    ToolMetricsRecorder,
+    instrument_tool,
+    instrument_tools,
+)
+from langchain_skills.tools import ALL_TOOLS, SkillAgentContext, list_dir
+
+
+class MockRuntime:
+    """模拟带 tool_call_id / config 的 ToolRuntime"""
+    def __init__(self, working_directory: Path, tool_call_id: str = "call_1", thread_id: str = "t1"):
+        self.context = SkillAgentContext(skill_loader=Mock(), working_directory=working_directory)
+        self.tool_call_id = tool_call_id
+        self.config = {"configurable": {"thread_id": thread_id}}
+
+
+def _metrics(tool_name: str, thread_id: str, wall_ms: float, error: str = None) -> ToolCallMetrics:
+    return ToolCallMetrics(tool_name, f"{tool_name}-{wall_ms}", thread_id, wall_ms, 1.0, 10, 20, error)
+
+
+class TestToolMetricsRecorder:
+    """测试指标记录器"""
+
+    def test_pop_call_returns_once(self):
+        recorder = ToolMetricsRecorder()
+        metrics = _metrics("grep", "t1", 5.0)
+        recorder.record(metrics)
+
+        assert recorder.pop_call(metrics.tool_call_id) is metrics
+        assert recorder.pop_call(metrics.tool_call_id) is None
+        assert recorder.pop_call("") is None
+
+    def test_summary_per_thread(self):
+        recorder = ToolMetricsRecorder()
+        recorder.record(_metrics("grep", "t1", 5.0))
+        recorder.record(_metrics("grep", "t1", 15.0, error="ValueError: x"))
+        recorder.record(_metrics("bash", "t2", 100.0))
+
+        summary = recorder.summary("t1")
+        assert set(summary) == {"grep"}
+        assert summary["grep"]["calls"] == 2
+        assert summary["grep"]["errors"] == 1
+        assert summary["grep"]["max_wall_ms"] == 15.0
+        assert summary["grep"]["mean_wall_ms"] == 10.0
+        assert summary["grep"]["bytes_out"] == 40
+
+        overall = recorder.summary()
+        assert set(overall) == {"grep", "bash"}
+        assert recorder.summary("missing") == {}
+
+    def test_clear_thread(self):
+        recorder = ToolMetricsRecorder()
+        recorder.record(_metrics("grep", "t1", 5.0))
+        recorder.record(_metrics("bash", "t2", 5.0))
+
+        recorder.clear("t1")
+        assert set(recorder.summary()) == {"bash"}
+        recorder.clear()
+        assert recorder.summary() == {}
+
+
+    def test_keeps_most_recent_threads(self):
+        recorder = ToolMetricsRecorder()
+        with patch("langchain_skills.metrics.MAX_TRACKED_THREADS", 2):
+            recorder.record(_metrics("grep", "t1", 1.0))
+            recorder.record(_metrics("grep", "t2", 2.0))
+            recorder.record(_metrics("grep", "t1", 3.0))
+            recorder.record(_metrics("grep", "t3", 4.0))
+
+        assert recorder.summary("t2") == {}
+        assert recorder.summary("t1")["grep"]["calls"] == 2
+        assert recorder.summary()["grep"]["calls"] == 3
+
+
+class TestInstrumentTool:
+    """测试工具包装"""
+
+    def test_records_sync_call(self, tmp_path):
+        (tmp_path / "a.txt").write_text("hello")
+        recorder = ToolMetricsRecorder()
+        timed = instrument_tool(list_dir, recorder)
+
+        result = timed.func(".", runtime=MockRuntime(tmp_path))
+
+        assert "a.txt" in result
+        metrics = recorder.pop_call("call_1")
+        assert metrics.tool == "list_dir"
+        assert metrics.thread_id == "t1"
+        assert metrics.wall_ms >= 0
+        assert metrics.cpu_ms >= 0
+        assert metrics.bytes_out == len(result.encode("utf-8"))
+        assert metrics.error is None
+
+    def test_bytes_in_excludes_runtime(self, tmp_path):
+        recorder = ToolMetricsRecorder()
+        timed = instrument_tool(list_dir, recorder)
+
+        timed.func(path="数据", runtime=MockRuntime(tmp_path))
+
+        assert recorder.pop_call("call_1").bytes_in == len('{"path": "数据"}'.encode("utf-8"))
+
+    def test_records_and_reraises_errors(self, tmp_path):
+        @tool
+        def broken(x: int) -> str:
+            """总是失败"""
+            raise RuntimeError("boom")
+
+        recorder = ToolMetricsRecorder()
+        timed = instrument_tool(broken, recorder)
+
+        with pytest.raises(RuntimeError):
+            timed.func(x=1)
+
+        summary = recorder.summary("")
+        assert summary["broken"]["calls"] == 1
+        assert summary["broken"]["errors"] == 1
+        assert summary["broken"]["bytes_out"] == 0
+
+    def test_records_async_call(self):
+        @tool
+        async def sleepy(x: int) -> str:
+            """异步工具"""
+            await asyncio.sleep(0.01)
+            return "z" * x
+
+        recorder = ToolMetricsRecorder()
+        timed = instrument_tool(sleepy, recorder)
+
+        assert asyncio.run(timed.coroutine(x=3)) == "zzz"
+        summary = recorder.summary("")
+        assert summary["sleepy"]["calls"] == 1
+        assert summary["sleepy"]["total_wall_ms"] >= 10
+        assert summary["sleepy"]["bytes_out"] == 3
+
+    def test_original_tools_unchanged(self):
+        recorder = ToolMetricsRecorder()
+        timed_tools = instrument_tools(ALL_TOOLS, recorder)
+
+        for original, timed in zip(ALL_TOOLS, timed_tools):
+            assert timed is not original
+            assert timed.name == original.name
+            assert timed.description == original.description
+            assert timed.args == original.args
+            assert timed.func is not original.func
+            assert timed.func.__wrapped__ is original.func
@@ -0,0 +1,127 @@
+"""
+Model registry 单元测试
+
+测试模型实例缓存、共享连接池配置和关闭。
+"""
+
+import asyncio
+import os
+from unittest.mock import patch
+
+import openai
+
+from langchain_skills.agent import ModelConfig
+from langchain_skills.model_registry import HttpPoolConfig, ModelRegistry
+
+
+def _config(provider: str = "openai", model: str = "gpt-test") -> ModelConfig:
+    return ModelConfig(provider=provider, model=model, api_key="k", base_url=None, supports_extended_thinking=False)
+
+
+def _factory(calls: list):
+    def factory(model, **kwargs):
+        calls.append((model, kwargs))
+        return object()
+    return factory
+
+
+class TestModelRegistry:
+    """ModelRegistry 测试"""
+
+    def test_same_key_reuses_model(self):
+        registry = ModelRegistry()
+        calls = []
+        first = registry.get_chat_model(_config(), {"model_provider": "x", "temperature": 0.1}, _factory(calls))
+        second = registry.get_chat_model(_config(), {"temperature": 0.1, "model_provider": "x"}, _factory(calls))
+        assert first is second
+        assert len(calls) == 1
+
+    def test_different_kwargs_create_new_model(self):
+        registry = ModelRegistry()
+        calls = []
+        first = registry.get_chat_model(_config(), {"temperature": 0.1}, _factory(calls))
+        second = registry.get_chat_model(_config(), {"temperature": 0.2}, _factory(calls))
+        assert first is not second
+        assert len(registry) == 2
+
+    def test_openai_models_share_http_clients(self):
+        registry = ModelRegistry()
+        calls = []
+
+        config = _config()
+        registry.get_chat_model(config, {"model_provider": "openai"}, _factory(calls))
+        registry.get_chat_model(config, {"model_provider": "openai", "temperature": 1}, _factory(calls))
+
+        assert calls[0][0] == "gpt-test"
+        assert calls[0][1]["http_client"] is calls[1][1]["http_client"]
+        assert calls[0][1]["http_client"] is registry.http_client("openai")
+        assert calls[0][1]["http_async_client"] is registry.async_http_client("openai")
+        registry.close()
+
+    def test_anthropic_models_reuse_sdk_cached_http_client(self):
+        """
+        注册表不为 ChatAnthropic 注入连接池，依赖 langchain-anthropic 按端点缓存的 HTTP 客户端；
+        升级后缓存方式变化时这里会失败，需要重新评估是否共享连接池
+        """
+        from langchain_anthropic import ChatAnthropic
+
+        registry = ModelRegistry()
+
+        def factory(model, model_provider, **kwargs):
+            return ChatAnthropic(model=model, **kwargs)
+
+        first = registry.get_chat_model(
+            _config("anthropic", "claude-a"), {"model_provider": "anthropic", "api_key": "k"}, factory
+        )
+        second = registry.get_chat_model(
+            _config("anthropic", "claude-b"), {"model_provider": "anthropic", "api_key": "k"}, factory
+        )
+        assert first is not second
+        assert first._client._client is second._client._client, "langchain-anthropic no longer caches HTTP clients"
+        assert first._async_client._client is second._async_client._client
+        assert registry._http_clients == {}
+
+    def test_close_releases_clients(self):
+        registry = ModelRegistry()
+        client = registry.http_client("openai")
+        registry.async_http_client("openai")
+        registry.get_chat_model(_config(), {}, _factory([]))
+
+        registry.close()
+
+        assert client.is_closed
+        assert len(registry) == 0
+        # 关闭后再次使用时重新创建
+        assert not registry.http_client("openai").is_closed
+        registry.close()
+
+    def test_aclose(self):
+        registry = ModelRegistry()
+
+        async def run():
+            client = registry.async_http_client("openai")
+            await registry.aclose()
+            return client
+
+        assert asyncio.run(run()).is_closed
+
+
+class TestHttpPoolConfig:
+    """HttpPoolConfig 配置测试"""
+
+    def test_from_env(self):
+        with patch.dict(os.environ, {
+            "SKILLS_HTTP_MAX_CONNECTIONS": "4",
+            "SKILLS_HTTP_MAX_KEEPALIVE": "2",
+            "SKILLS_HTTP_KEEPALIVE_EXPIRY": "5",
+        }):
+            pool = HttpPoolConfig.from_env()
+        assert (pool.max_connections, pool.max_keepalive_connections, pool.keepalive_expiry) == (4, 2, 5.0)
+        limits = pool.client_kwargs(openai.DefaultHttpxClient)["limits"]
+        assert limits.max_connections == 4
+        assert limits.max_keepalive_connections == 2
+
+    def test_http2_requires_h2(self):
+        pool = HttpPoolConfig(http2=True)
+        with patch("langchain_skills.model_registry.importlib.util.find_spec", return_value=None):
+            assert pool.client_kwargs(openai.DefaultHttpxClient)["http2"] is False
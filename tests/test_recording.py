@@ -0,0 +1,109 @@
+"""
+Recording 模块单元测试
+
+测试模型流录制 / 回放：文件格式、消息还原、回放节奏，以及通过 Agent 录制后回放得到相同事件。
+"""
+
+import json
+import os
+import time
+from unittest.mock import Mock, patch
+
+from langchain_core.messages import AIMessageChunk, HumanMessage, ToolMessage
+
+from langchain_skills.agent import LangChainSkillsAgent
+from langchain_skills.model_registry import ModelRegistry
+from langchain_skills.recording import StreamRecorder, load_recording, replay_messages
+
+
+def _write_sample(path):
+    with StreamRecorder(path, provider="anthropic", model="m", message="hi") as recorder:
+        recorder.write(AIMessageChunk(content=[{"type": "thinking", "thinking": "hmm", "index": 0}]))
+        recorder.write(AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": "list_dir", "args": '{"path": "."}', "id": "c1", "index": 0}],
+        ))
+        recorder.write(HumanMessage(content="ignored"))
+        recorder.write(ToolMessage(content="[OK] a.txt", tool_call_id="c1", name="list_dir"))
+        recorder.write(AIMessageChunk(content="done"))
+    return recorder
+
+
+class TestStreamRecorder:
+    """录制文件测试"""
+
+    def test_writes_header_and_compact_lines(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        recorder = _write_sample(path)
+
+        lines = path.read_text().splitlines()
+        header = json.loads(lines[0])
+        assert recorder.count == 4
+        assert len(lines) == 5
+        assert header["version"] == 1
+        assert header["provider"] == "anthropic"
+        assert header["message"] == "hi"
+        record = json.loads(lines[1])
+        assert record["type"] == "AIMessageChunk"
+        # 空字段不写入
+        assert "additional_kwargs" not in record["data"]
+        assert "tool_calls" not in json.loads(lines[2])["data"]
+
+    def test_load_round_trip(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        _write_sample(path)
+
+        recording = load_recording(path)
+
+        assert recording.header["model"] == "m"
+        messages = [m for _, m in recording.messages]
+        assert [type(m).__name__ for m in messages] == [
+            "AIMessageChunk", "AIMessageChunk", "ToolMessage", "AIMessageChunk",
+        ]
+        assert messages[1].tool_calls[0]["args"] == {"path": "."}
+        assert messages[2].tool_call_id == "c1"
+        assert messages[3].content == "done"
+        times = [t for t, _ in recording.messages]
+        assert times == sorted(times)
+
+
+class TestReplay:
+    """回放节奏测试"""
+
+    def test_speed_controls_delays(self, tmp_path):
+        path = tmp_path / "run.jsonl"
+        _write_sample(path)
+        recording = load_recording(path)
+        recording.messages = [(i * 0.05, m) for i, (_, m) in enumerate(recording.messages)]
+
+        started = time.perf_counter()
+        assert len(list(replay_messages(recording, speed=1.0))) == 4
+        original = time.perf_counter() - started
+
+        started = time.perf_counter()
+        list(replay_messages(recording, speed=0))
+        instant = time.perf_counter() - started
+
+        assert original >= 0.14
+        assert instant < 0.05
+
+
+def test_agent_replay_matches_recorded_stream(tmp_path):
+    (tmp_path / "hello.txt").write_text("hi")
+    path = tmp_path / "run.jsonl"
+    fake_loader = Mock()
+    fake_loader.build_system_prompt.return_value = "system prompt"
+
+    with patch.dict(os.environ, {"MODEL_PROVIDER": "fake"}, clear=True), patch(
+        "langchain_skills.agent.SkillLoader", return_value=fake_loader
+    ):
+        agent = LangChainSkillsAgent(working_directory=tmp_path, model_registry=ModelRegistry())
+        live = list(agent.stream_events("summarise", thread_id="rec", record=path))
+        replayed = list(agent.replay_events(path, speed=0))
+
+    def strip(events):
+        return [{k: v for k, v in e.items() if k != "metrics"} for e in events]
+
+    assert load_recording(path).header["provider"] == "fake"
+    assert strip(replayed) == strip(live)
+    assert replayed[-1]["type"] == "done"
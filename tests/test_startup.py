@@ -0,0 +1,74 @@
+"""
+启动开销测试
+
+轻量 CLI 命令（--list-skills / --show-prompt）不应导入 langchain / langgraph，
+也不应初始化模型或编译 Agent。启动耗时检查受机器负载影响，设置 SKILLS_RUN_TIMING_TESTS=1 时才运行。
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+
+HEAVY_MODULES = ("langchain", "langgraph", "langchain_core", "langchain_anthropic", "langchain_openai")
+
+# 轻量命令的启动时间上限（秒），取多次运行的最小值以排除偶发抖动
+STARTUP_BUDGET_SECONDS = 1.0
+
+
+def _run_python(args: list[str], cwd, home) -> subprocess.CompletedProcess:
+    env = {**os.environ, "HOME": str(home), "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+
+def test_cli_import_skips_heavy_modules(tmp_path):
+    code = (
+        "import json, sys\n"
+        "import langchain_skills.cli\n"
+        "from langchain_skills import LangChainSkillsAgent\n"
+        "agent = LangChainSkillsAgent(skill_paths=[])\n"
+        "agent.get_system_prompt()\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = _run_python(["-c", code], tmp_path, tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+@pytest.mark.parametrize("command", ["--list-skills", "--show-prompt"])
+def test_lightweight_cli_commands_skip_heavy_modules(tmp_path, command):
+    code = (
+        "import json, sys\n"
+        "from langchain_skills.cli import main\n"
+        f"sys.argv = ['langchain-skills', {command!r}]\n"
+        "main()\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    result = _run_python(["-c", code], tmp_path, tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+@pytest.mark.skipif(
+    os.getenv("SKILLS_RUN_TIMING_TESTS") != "1", reason="set SKILLS_RUN_TIMING_TESTS=1 to enable timing tests"
+)
+@pytest.mark.parametrize("command", ["--list-skills", "--show-prompt"])
+def test_lightweight_cli_commands_start_fast(tmp_path, command):
+    timings = []
+    for _ in range(3):
+        started = time.perf_counter()
+        result = _run_python(["-m", "langchain_skills.cli", command], tmp_path, tmp_path)
+        timings.append(time.perf_counter() - started)
+        assert result.returncode == 0, result.stderr
+    assert min(timings) < STARTUP_BUDGET_SECONDS, f"{command} took {min(timings):.2f}s"
@@ -24,6 +24,12 @@ from langchain_skills.stream import (
     format_tree_output,
     count_lines,
     truncate_with_line_hint,
+    compact_output,
+    strip_ansi,
+    collapse_carriage_returns,
+    dedupe_lines,
+    estimate_tokens,
+    truncate_to_budget,
 )
 from pathlib import Path
 
@@ -53,11 +59,23 @@ class TestStreamEventEmitter:
         assert event.type == "tool_result"
         assert event.data["name"] == "bash"
         assert event.data["success"] is True
+        assert "metrics" not in event.data
+
+    def test_tool_result_event_with_metrics(self):
+        metrics = {"tool": "bash", "wall_ms": 12.5, "bytes_out": 6}
+        event = StreamEventEmitter.tool_result("bash", "[OK]\n\noutput", True, metrics=metrics)
+        assert event.data["metrics"] == metrics
 
     def test_done_event(self):
         event = StreamEventEmitter.done("final response")
         assert event.type == "done"
         assert event.data["response"] == "final response"
+        assert "usage" not in event.data
+
+    def test_done_event_with_usage(self):
+        usage = {"input_tokens": 10, "cache_read_tokens": 2000}
+        event = StreamEventEmitter.done("final response", usage=usage)
+        assert event.data["usage"] == usage
 
     def test_error_event(self):
         event = StreamEventEmitter.error("something went wrong")
@@ -385,6 +403,15 @@ class TestFormatToolCompact:
         result = format_tool_compact("edit", {"file_path": "/path/to/file.py"})
         assert result == "Edit(/path/to/file.py)"
 
+    def test_multi_edit(self):
+        edits = [
+            {"file_path": "a.py", "old_string": "x", "new_string": "y"},
+            {"file_path": "a.py", "old_string": "y", "new_string": "z"},
+            {"file_path": "b.py", "old_string": "x", "new_string": "y"},
+        ]
+        result = format_tool_compact("multi_edit", {"edits": edits})
+        assert result == "MultiEdit(3 edits, 2 files)"
+
     def test_glob_pattern(self):
         result = format_tool_compact("glob", {"pattern": "**/*.py"})
         assert result == "Glob(**/*.py)"
@@ -476,3 +503,67 @@ class TestTruncateWithLineHint:
         content = "line1\nline2\nline3"
         truncated, remaining = truncate_with_line_hint(content, max_lines=3)
         assert remaining == 0
+
+
+class TestCompactOutput:
+    """测试工具输出压缩管线"""
+
+    def test_strip_ansi(self):
+        assert strip_ansi("\x1b[31mred\x1b[0m text") == "red text"
+
+    def test_strip_ansi_plain_text_unchanged(self):
+        assert strip_ansi("plain") == "plain"
+
+    def test_collapse_carriage_returns_keeps_last_redraw(self):
+        text = "Downloading 10%\rDownloading 50%\rDownloading 100%\ndone"
+        assert collapse_carriage_returns(text) == "Downloading 100%\ndone"
+
+    def test_collapse_carriage_returns_crlf(self):
+        assert collapse_carriage_returns("a\r\nb\r\n") == "a\nb\n"
+
+    def test_dedupe_lines_collapses_runs(self):
+        text = "start\n" + "same\n" * 5 + "end"
+        result = dedupe_lines(text)
+        assert result.split("\n") == [
+            "start",
+            "same",
+            "... (previous line repeated 4 more times)",
+            "end",
+        ]
+
+    def test_dedupe_lines_keeps_short_runs(self):
+        assert dedupe_lines("a\na\nb") == "a\na\nb"
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd" * 10) == 10
+        assert estimate_tokens("中文") == 2
+
+    def test_truncate_to_budget_within_budget(self):
+        assert truncate_to_budget("short", 100) == "short"
+
+    def test_truncate_to_budget_keeps_head_and_tail(self):
+        text = "\n".join(f"line {i}" for i in range(1000))
+        result = truncate_to_budget(text, 100)
+        assert result.startswith("line 0\n")
+        assert result.endswith("line 999")
+        assert "lines omitted" in result
+        assert estimate_tokens(result) <= 110
+
+    def test_truncate_to_budget_single_long_line(self):
+        result = truncate_to_budget("x" * 10000, 100)
+        assert "chars omitted" in result
+        assert len(result) < 1000
+
+    def test_compact_output_pipeline(self):
+        text = "[OK]\n\n\x1b[32m" + "progress\r" * 3 + "finished\x1b[0m\n" + "warn\n" * 10
+        result = compact_output(text, max_tokens=1000)
+        assert result.startswith("[OK]")
+        assert "\x1b" not in result
+        assert "progress" not in result
+        assert "finished" in result
+        assert "repeated 9 more times" in result
+
+    def test_compact_output_without_clean(self):
+        text = "\x1b[31mred\x1b[0m"
+        assert compact_output(text, clean=False, dedupe=False) == text
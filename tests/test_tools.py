@@ -7,13 +7,16 @@ Tools 模块单元测试
 这里直接测试底层实现逻辑，而不是通过 .invoke() 调用。
 """
 
+import hashlib
+import os
 import pytest
 import subprocess
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 
-from langchain_skills.tools import SkillAgentContext
+from langchain_skills.tools import SkillAgentContext, bash, read_file, write_file, grep, edit, multi_edit, glob, list_dir
 from langchain_skills.stream import SUCCESS_PREFIX, FAILURE_PREFIX, resolve_path
+from langchain_skills.fs import FileContentCache
 
 
 class MockRuntime:
@@ -155,6 +158,52 @@ class TestWriteFileTool:
         assert path.exists()
         assert path.read_text() == "Deep content"
 
+    def test_write_file_tool_is_atomic_overwrite(self, tmp_path):
+        path = tmp_path / "out.txt"
+        path.write_text("old content")
+
+        result = write_file.func(file_path="out.txt", content="new", runtime=MockRuntime(tmp_path))
+
+        assert result == f"[Success] File written: {path}"
+        assert path.read_text() == "new"
+        assert list(tmp_path.iterdir()) == [path]
+
+    @pytest.mark.skipif(os.name == "nt", reason="symlinks need privileges on Windows")
+    def test_write_file_overwrites_through_symlink(self, tmp_path):
+        target = tmp_path / "target.txt"
+        target.write_text("old content")
+        link = tmp_path / "link.txt"
+        link.symlink_to(target)
+
+        result = write_file.func(file_path="link.txt", content="new", runtime=MockRuntime(tmp_path))
+
+        assert result == f"[Success] File written: {link}"
+        assert link.is_symlink()
+        assert target.read_text() == "new"
+        assert sorted(tmp_path.iterdir()) == [link, target]
+
+    def test_write_file_append_mode(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+
+        write_file.func(file_path="out.txt", content="part1\n", runtime=runtime)
+        result = write_file.func(file_path="out.txt", content="part2\n", mode="append", runtime=runtime)
+
+        assert result.startswith("[Success] Appended 6 bytes to file:")
+        assert (tmp_path / "out.txt").read_text() == "part1\npart2\n"
+
+    def test_write_file_hash_and_skip_identical(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        expected = hashlib.sha256("same".encode()).hexdigest()
+
+        first = write_file.func(file_path="a.txt", content="same", include_hash=True, runtime=runtime)
+        mtime = (tmp_path / "a.txt").stat().st_mtime_ns
+        second = write_file.func(file_path="a.txt", content="same", include_hash=True, runtime=runtime)
+
+        assert first.endswith(f"(sha256: {expected})")
+        assert second.startswith("[Success] File unchanged (identical content)")
+        assert second.endswith(f"(sha256: {expected})")
+        assert (tmp_path / "a.txt").stat().st_mtime_ns == mtime
+
 
 class TestOutputFormatIntegration:
     """测试输出格式与 formatter 的集成"""
@@ -188,3 +237,533 @@ class TestOutputFormatIntegration:
 
         # [OK] 前缀 + JSON 内容应该检测为 JSON
         assert content_type == ContentType.JSON
+
+
+class TestToolOutputCompaction:
+    """测试工具结果进入模型前的压缩"""
+
+    def test_bash_output_is_compacted(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        command = "printf '\\033[32mgreen\\033[0m\\n'; for i in 1 2 3 4 5; do echo same; done"
+        result = bash.func(command=command, runtime=runtime)
+
+        assert result.startswith(SUCCESS_PREFIX)
+        assert "\x1b" not in result
+        assert "green" in result
+        assert "repeated 4 more times" in result
+
+    def test_bash_collapses_progress_redraws(self, tmp_path):
+        import asyncio
+
+        runtime = MockRuntime(tmp_path)
+        command = "printf 'progress 10%%\\rprogress 50%%\\rprogress 100%%\\ndone\\r\\n'"
+        expected = f"{SUCCESS_PREFIX}\n\nprogress 100%\ndone"
+
+        assert bash.func(command=command, runtime=runtime) == expected
+        assert asyncio.run(bash.coroutine(command, runtime=runtime)) == expected
+
+    def test_bash_output_respects_token_budget(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+        runtime.context.max_output_tokens = 200
+        result = bash.func(command="seq 1 5000", runtime=runtime)
+
+        assert result.startswith(SUCCESS_PREFIX)
+        assert "lines omitted" in result
+        assert result.rstrip().endswith("5000")
+
+    def test_read_file_respects_token_budget(self, tmp_path):
+        (tmp_path / "big.txt").write_text("\n".join(f"row {i}" for i in range(1500)))
+        runtime = MockRuntime(tmp_path)
+        runtime.context.max_output_tokens = 200
+        result = read_file.func(file_path="big.txt", runtime=runtime)
+
+        assert result.startswith("   1| row 0")
+        assert "lines omitted" in result
+
+
+def _uncached_runtime(tmp_path):
+    """不使用内容缓存的 runtime（模拟大文件，走 mmap 窗口读取）"""
+    runtime = MockRuntime(tmp_path)
+    runtime.context.file_cache = FileContentCache(max_file_bytes=0)
+    return runtime
+
+
+class TestReadFileWindow:
+    """测试 read_file 的 offset / limit 窗口读取"""
+
+    def test_read_window_with_offset_and_limit(self, tmp_path):
+        (tmp_path / "log.txt").write_text("\n".join(f"entry {i}" for i in range(1, 6001)))
+        runtime = _uncached_runtime(tmp_path)
+
+        result = read_file.func(file_path="log.txt", runtime=runtime, offset=5000, limit=3)
+
+        assert result.split("\n") == [
+            "5000| entry 5000",
+            "5001| entry 5001",
+            "5002| entry 5002",
+            "... (more lines, use offset=5003 to continue)",
+        ]
+
+    def test_read_default_window_points_to_next_offset(self, tmp_path):
+        (tmp_path / "a.txt").write_text("\n".join(str(i) for i in range(2500)))
+        runtime = _uncached_runtime(tmp_path)
+
+        result = read_file.func(file_path="a.txt", runtime=runtime)
+
+        assert result.startswith("   1| 0\n")
+        assert "2000| 1999" in result
+        assert result.endswith("... (more lines, use offset=2001 to continue)")
+
+    def test_read_window_reports_remaining_lines_when_known(self, tmp_path):
+        (tmp_path / "a.txt").write_text("\n".join(str(i) for i in range(10)))
+        runtime = _uncached_runtime(tmp_path)
+
+        read_file.func(file_path="a.txt", runtime=runtime)  # 扫描完整个文件
+        result = read_file.func(file_path="a.txt", runtime=runtime, limit=4)
+
+        assert result.endswith("... (6 more lines, use offset=5 to continue)")
+
+    def test_read_offset_beyond_end(self, tmp_path):
+        (tmp_path / "a.txt").write_text("a\nb")
+        runtime = MockRuntime(tmp_path)
+
+        result = read_file.func(file_path="a.txt", runtime=runtime, offset=100)
+
+        assert result.startswith("[Error]")
+        assert "beyond end of file" in result
+
+
+class TestBinaryAndEncodingHandling:
+    """测试文件工具的二进制跳过与编码检测"""
+
+    def test_read_file_rejects_binary(self, tmp_path):
+        (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n" + b"\x00" * 100)
+        result = read_file.func(file_path="image.png", runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[Error] Cannot read binary file (magic:png)")
+
+    def test_read_file_decodes_gb18030(self, tmp_path):
+        (tmp_path / "gbk.txt").write_bytes("你好\n世界".encode("gb18030"))
+        result = read_file.func(file_path="gbk.txt", runtime=MockRuntime(tmp_path))
+
+        assert result == "   1| 你好\n   2| 世界"
+
+    def test_read_file_utf16(self, tmp_path):
+        (tmp_path / "u16.txt").write_text("a\nb\nc", encoding="utf-16")
+        result = read_file.func(file_path="u16.txt", runtime=MockRuntime(tmp_path), offset=2, limit=1)
+
+        assert result.split("\n")[0] == "   2| b"
+
+    def test_grep_skips_binary_files(self, tmp_path):
+        (tmp_path / "code.py").write_text("needle = 1\n")
+        (tmp_path / "data.bin").write_bytes(b"needle\x00\x01\x02")
+        result = grep.func(pattern="needle", path=".", runtime=MockRuntime(tmp_path))
+
+        assert "code.py:1: needle = 1" in result
+        assert "data.bin" not in result
+
+    def test_grep_unicode_regex_semantics(self, tmp_path):
+        (tmp_path / "notes.md").write_text("标题\nx中y hello\n", encoding="utf-8")
+        runtime = MockRuntime(tmp_path)
+
+        assert "notes.md:2: x中y hello" in grep.func(pattern=r"x.y", path=".", runtime=runtime)
+        assert "notes.md:2: x中y hello" in grep.func(pattern=r"(?u)hello", path=".", runtime=runtime)
+
+    def test_edit_preserves_encoding(self, tmp_path):
+        path = tmp_path / "gbk.txt"
+        path.write_bytes("旧内容".encode("gb18030"))
+        result = edit.func(
+            file_path="gbk.txt",
+            old_string="旧",
+            new_string="新",
+            runtime=MockRuntime(tmp_path),
+        )
+
+        assert result.startswith(SUCCESS_PREFIX)
+        assert path.read_bytes().decode("gb18030") == "新内容"
+
+    def test_edit_rejects_binary(self, tmp_path):
+        (tmp_path / "a.bin").write_bytes(b"abc\x00def")
+        result = edit.func(file_path="a.bin", old_string="abc", new_string="x", runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[FAILED] Cannot edit binary file")
+
+    @pytest.mark.skipif(os.name == "nt", reason="symlinks need privileges on Windows")
+    def test_edit_writes_through_symlink(self, tmp_path):
+        target = tmp_path / "target.txt"
+        target.write_text("value = 1\n")
+        (tmp_path / "link.txt").symlink_to(target)
+
+        result = edit.func(file_path="link.txt", old_string="1", new_string="2", runtime=MockRuntime(tmp_path))
+
+        assert result.startswith(SUCCESS_PREFIX)
+        assert (tmp_path / "link.txt").is_symlink()
+        assert target.read_text() == "value = 2\n"
+
+
+class TestGrepTrigramIndex:
+    """测试 grep 使用 trigram 索引"""
+
+    @pytest.fixture
+    def runtime(self, tmp_path, monkeypatch):
+        from langchain_skills.fs import close_trigram_indexes
+
+        monkeypatch.setenv("SKILLS_INDEX_DIR", str(tmp_path / "index"))
+        root = tmp_path / "repo"
+        root.mkdir()
+        runtime = MockRuntime(root)
+        runtime.context.use_trigram_index = True
+        yield runtime
+        close_trigram_indexes()
+
+    def test_grep_with_index_matches_plain_grep(self, runtime):
+        root = runtime.context.working_directory
+        (root / "a.py").write_text("def needle():\n    pass\n")
+        (root / "b.py").write_text("def other():\n")
+
+        indexed = grep.func(pattern=r"def needle\(", path=".", runtime=runtime)
+        plain = grep.func(pattern=r"def needle\(", path=".", runtime=MockRuntime(root))
+
+        assert indexed.startswith("[OK]")
+        assert "a.py:1: def needle():" in indexed
+        assert indexed == plain
+
+    def test_edit_updates_index(self, runtime):
+        root = runtime.context.working_directory
+        (root / "a.py").write_text("value = 1\n")
+        assert grep.func(pattern="needle", path=".", runtime=runtime).startswith("No matches")
+
+        edit.func(file_path="a.py", old_string="value", new_string="needle", runtime=runtime)
+
+        assert "a.py:1: needle = 1" in grep.func(pattern="needle", path=".", runtime=runtime)
+
+
+class TestIgnoreAwareTools:
+    """测试 glob / grep / list_dir 共用的遍历规则"""
+
+    @pytest.fixture
+    def repo(self, tmp_path):
+        (tmp_path / ".gitignore").write_text("dist/\n*.log\n")
+        (tmp_path / "dist").mkdir()
+        (tmp_path / "dist" / "bundle.py").write_text("needle\n")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "dep.py").write_text("needle\n")
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "main.py").write_text("needle\n")
+        (tmp_path / "debug.log").write_text("needle\n")
+        return tmp_path
+
+    def test_glob_skips_ignored(self, repo):
+        result = glob.func(pattern="**/*.py", runtime=MockRuntime(repo))
+
+        assert result == "[OK]\n\nsrc/main.py"
+
+    def test_grep_skips_ignored(self, repo):
+        result = grep.func(pattern="needle", path=".", runtime=MockRuntime(repo))
+
+        assert result == "[OK]\n\nsrc/main.py:1: needle"
+
+    def test_custom_excludes(self, repo):
+        runtime = MockRuntime(repo)
+        runtime.context.walk_excludes = ("src/",)
+
+        result = glob.func(pattern="**/*.py", runtime=runtime)
+
+        assert "node_modules/dep.py" in result
+        assert "src/main.py" not in result
+
+    def test_list_dir_shows_everything(self, repo):
+        result = list_dir.func(path=".", runtime=MockRuntime(repo))
+
+        assert "📁 dist/" in result
+        assert "📁 node_modules/" in result
+        assert "debug.log" in result
+
+
+class TestGlobTool:
+    """测试流式 glob 工具"""
+
+    def test_reports_remaining_count(self, tmp_path):
+        for i in range(105):
+            (tmp_path / f"f{i:03d}.txt").write_text("")
+
+        result = glob.func(pattern="*.txt", runtime=MockRuntime(tmp_path))
+
+        lines = result.split("\n")
+        assert lines[2] == "f000.txt"
+        assert lines[-1] == "... and 5 more files"
+
+    def test_skips_count_when_expensive(self, tmp_path, monkeypatch):
+        import langchain_skills.tools as tools_module
+
+        monkeypatch.setattr(tools_module, "GLOB_COUNT_BUDGET", 3)
+        for i in range(110):
+            (tmp_path / f"f{i:03d}.txt").write_text("")
+
+        result = glob.func(pattern="*.txt", runtime=MockRuntime(tmp_path))
+
+        assert result.endswith("... and more than 3 more files (refine the pattern)")
+
+    def test_mtime_order(self, tmp_path):
+        for i, name in enumerate(["old.py", "new.py", "mid.py"]):
+            path = tmp_path / name
+            path.write_text("")
+            os.utime(path, (1000 + [0, 200, 100][i], 1000 + [0, 200, 100][i]))
+
+        result = glob.func(pattern="*.py", sort_by="mtime", runtime=MockRuntime(tmp_path))
+
+        assert result == "[OK]\n\nnew.py\nmid.py\nold.py"
+
+    def test_no_matches(self, tmp_path):
+        result = glob.func(pattern="*.nothing", runtime=MockRuntime(tmp_path))
+
+        assert result == "No files matching pattern: *.nothing"
+
+
+class TestListDirTool:
+    """测试分页与树形 list_dir"""
+
+    def test_dirs_first_with_sizes(self, tmp_path):
+        (tmp_path / "b.txt").write_text("x" * 2048)
+        (tmp_path / "A.txt").write_text("x")
+        (tmp_path / "sub").mkdir()
+
+        result = list_dir.func(path=".", runtime=MockRuntime(tmp_path))
+
+        assert result == "[OK]\n\n📁 sub/\n   A.txt (1B)\n   b.txt (2KB)"
+
+    def test_pagination_with_cursor(self, tmp_path):
+        for i in range(150):
+            (tmp_path / f"f{i:03d}.txt").write_text("")
+        runtime = MockRuntime(tmp_path)
+
+        first = list_dir.func(path=".", runtime=runtime)
+        assert first.split("\n")[-1] == '... (more entries, use cursor="f099.txt" to continue)'
+
+        second = list_dir.func(path=".", cursor="f099.txt", runtime=runtime)
+        lines = second.split("\n")
+        assert lines[2] == "   f100.txt (0B)"
+        assert lines[-1] == "   f149.txt (0B)"
+
+    def test_unknown_cursor(self, tmp_path):
+        result = list_dir.func(path=".", cursor="missing.txt", runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[FAILED] Cursor not found: missing.txt")
+
+    def test_depth_tree_does_not_expand_ignored(self, tmp_path):
+        (tmp_path / "src" / "pkg").mkdir(parents=True)
+        (tmp_path / "src" / "pkg" / "mod.py").write_text("")
+        (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+
+        result = list_dir.func(path=".", depth=3, runtime=MockRuntime(tmp_path))
+
+        assert result == (
+            "[OK]\n\n"
+            "📁 node_modules/ (ignored, not expanded)\n"
+            "📁 src/\n"
+            "  📁 pkg/\n"
+            "       mod.py (0B)"
+        )
+
+
+class TestMultiEditTool:
+    """测试事务性的 multi_edit"""
+
+    def test_applies_ordered_edits_across_files(self, tmp_path):
+        (tmp_path / "a.py").write_text("alpha = 1\nbeta = 2\n")
+        (tmp_path / "b.py").write_text("gamma = 3\n")
+
+        result = multi_edit.func(edits=[
+            {"file_path": "a.py", "old_string": "alpha", "new_string": "first"},
+            {"file_path": "a.py", "old_string": "first = 1", "new_string": "first = 10"},
+            {"file_path": "b.py", "old_string": "gamma = 3", "new_string": "gamma = 3\ndelta = 4"},
+        ], runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[OK]\n\nApplied 3 edits to 2 files")
+        assert "  3. b.py: replaced 1 lines with 2 lines" in result
+        assert (tmp_path / "a.py").read_text() == "first = 10\nbeta = 2\n"
+        assert (tmp_path / "b.py").read_text() == "gamma = 3\ndelta = 4\n"
+
+    def test_any_failure_writes_nothing(self, tmp_path):
+        (tmp_path / "a.py").write_text("alpha = 1\n")
+        (tmp_path / "b.py").write_text("x\nx\n")
+
+        result = multi_edit.func(edits=[
+            {"file_path": "a.py", "old_string": "alpha", "new_string": "first"},
+            {"file_path": "b.py", "old_string": "x", "new_string": "y"},
+            {"file_path": "c.py", "old_string": "x", "new_string": "y"},
+        ], runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[FAILED] No files were changed")
+        assert "  1. a.py: replaced 1 lines with 1 lines" in result
+        assert "  2. b.py: [FAILED] String appears 2 times" in result
+        assert "  3. c.py: [FAILED] File not found" in result
+        assert (tmp_path / "a.py").read_text() == "alpha = 1\n"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "b.py"]
+
+    def test_replace_all(self, tmp_path):
+        (tmp_path / "a.py").write_text("x\nx\n")
+
+        result = multi_edit.func(edits=[
+            {"file_path": "a.py", "old_string": "x", "new_string": "y", "replace_all": True},
+        ], runtime=MockRuntime(tmp_path))
+
+        assert "(2 occurrences)" in result
+        assert (tmp_path / "a.py").read_text() == "y\ny\n"
+
+    def test_aliased_paths_share_one_buffer(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_text("one two\n")
+
+        result = multi_edit.func(edits=[
+            {"file_path": "a.txt", "old_string": "one", "new_string": "1"},
+            {"file_path": "sub/../a.txt", "old_string": "two", "new_string": "2"},
+        ], runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[OK]\n\nApplied 2 edits to 1 files")
+        assert (tmp_path / "a.txt").read_text() == "1 2\n"
+
+    def test_commit_failure_reports_written_files(self, tmp_path):
+        (tmp_path / "a.py").write_text("alpha\n")
+        (tmp_path / "b.py").write_text("beta\n")
+        (tmp_path / "c.py").write_text("gamma\n")
+        from langchain_skills import tools
+
+        real_commit = tools.commit_staged
+        calls = []
+
+        def flaky_commit(temp_path, path):
+            calls.append(path)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            real_commit(temp_path, path)
+
+        with patch.object(tools, "commit_staged", side_effect=flaky_commit):
+            result = multi_edit.func(edits=[
+                {"file_path": "a.py", "old_string": "alpha", "new_string": "A"},
+                {"file_path": "b.py", "old_string": "beta", "new_string": "B"},
+                {"file_path": "c.py", "old_string": "gamma", "new_string": "C"},
+            ], runtime=MockRuntime(tmp_path))
+
+        assert result.startswith("[FAILED] Could not write b.py: disk full")
+        assert "Files already written:\n  - a.py\n" in result
+        assert (tmp_path / "a.py").read_text() == "A\n"
+        assert (tmp_path / "b.py").read_text() == "beta\n"
+        assert (tmp_path / "c.py").read_text() == "gamma\n"
+        # 未提交的临时文件已清理
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.py", "b.py", "c.py"]
+
+    def test_preserves_encoding_and_mode(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_bytes("中文内容\n".encode("gb18030"))
+        path.chmod(0o755)
+
+        multi_edit.func(edits=[
+            {"file_path": "a.txt", "old_string": "内容", "new_string": "文本"},
+        ], runtime=MockRuntime(tmp_path))
+
+        assert path.read_bytes() == "中文文本\n".encode("gb18030")
+        assert path.stat().st_mode & 0o777 == 0o755
+
+
+class TestFileContentCacheIntegration:
+    """测试 read_file / grep / edit 共享内容缓存"""
+
+    def test_cached_small_file_reports_exact_remaining(self, tmp_path):
+        (tmp_path / "a.txt").write_text("\n".join(str(i) for i in range(2500)))
+
+        result = read_file.func(file_path="a.txt", runtime=MockRuntime(tmp_path))
+
+        assert result.endswith("... (500 more lines, use offset=2001 to continue)")
+
+    def test_read_grep_edit_share_one_disk_read(self, tmp_path):
+        (tmp_path / "a.py").write_text("value = 1\n")
+        runtime = MockRuntime(tmp_path)
+        cache = runtime.context.file_cache
+
+        read_file.func(file_path="a.py", runtime=runtime)
+        assert "a.py:1: value = 1" in grep.func(pattern="value", path="a.py", runtime=runtime)
+        edit.func(file_path="a.py", old_string="value = 1", new_string="value = 2", runtime=runtime)
+
+        assert cache.misses == 1
+        assert cache.peek(tmp_path / "a.py").text == "value = 2\n"
+        assert "value = 2" in read_file.func(file_path="a.py", runtime=runtime)
+        assert cache.misses == 1
+
+    def test_external_modification_invalidates(self, tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_text("old")
+        runtime = MockRuntime(tmp_path)
+        read_file.func(file_path="a.txt", runtime=runtime)
+
+        path.write_text("new content")
+
+        assert "new content" in read_file.func(file_path="a.txt", runtime=runtime)
+
+    def test_write_file_updates_cache(self, tmp_path):
+        runtime = MockRuntime(tmp_path)
+
+        write_file.func(file_path="a.txt", content="written", runtime=runtime)
+
+        assert runtime.context.file_cache.peek(tmp_path / "a.txt").text == "written"
+
+
+class TestAsyncTools:
+    """测试工具的异步实现"""
+
+    def test_all_tools_have_async_implementation(self):
+        from langchain_skills.tools import ALL_TOOLS
+
+        for t in ALL_TOOLS:
+            assert t.coroutine is not None, t.name
+            assert t.func is not None, t.name
+
+    @pytest.mark.parametrize("command", ["echo hello", "exit 3", "echo error >&2", "true", "printf 'a\\r\\nb\\rc'"])
+    def test_async_bash_matches_sync(self, tmp_path, command):
+        import asyncio
+
+        runtime = MockRuntime(tmp_path)
+        expected = bash.func(command, runtime=runtime)
+        assert asyncio.run(bash.coroutine(command, runtime=runtime)) == expected
+
+    def test_async_bash_runs_concurrently(self, tmp_path):
+        import asyncio
+        import time
+
+        async def run_all():
+            runtime = MockRuntime(tmp_path)
+            return await asyncio.gather(*[bash.coroutine("sleep 0.3; echo done", runtime=runtime) for _ in range(5)])
+
+        started = time.perf_counter()
+        results = asyncio.run(run_all())
+
+        assert time.perf_counter() - started < 1.2
+        assert all(r.startswith(SUCCESS_PREFIX) and "done" in r for r in results)
+
+    def test_async_bash_timeout(self, tmp_path):
+        import asyncio
+
+        with patch("langchain_skills.tools.BASH_TIMEOUT", 0.2):
+            result = asyncio.run(bash.coroutine("sleep 5", runtime=MockRuntime(tmp_path)))
+
+        assert result.startswith(FAILURE_PREFIX)
+        assert "timed out" in result
+
+    def test_async_file_tools(self, tmp_path):
+        import asyncio
+
+        async def run():
+            runtime = MockRuntime(tmp_path)
+            written = await write_file.coroutine("notes.txt", "alpha\nbeta\n", runtime=runtime)
+            read = await read_file.coroutine("notes.txt", runtime=runtime)
+            found = await grep.coroutine("beta", ".", runtime=runtime)
+            edited = await edit.coroutine("notes.txt", "beta", "gamma", runtime=runtime)
+            return written, read, found, edited
+
+        written, read, found, edited = asyncio.run(run())
+
+        assert written.startswith("[Success]")
+        assert "alpha" in read
+        assert "notes.txt:2" in found
+        assert edited.startswith(SUCCESS_PREFIX)
+        assert (tmp_path / "notes.txt").read_text() == "alpha\ngamma\n"
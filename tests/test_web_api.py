@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Iterator
+from typing import AsyncIterator, Iterator
 
 from fastapi.testclient import TestClient
 
@@ -36,6 +37,23 @@ class FakeAgent:
         yield {"type": "done", "response": "Done."}
 
 
+class FakeAsyncAgent(FakeAgent):
+    """Test double exposing the async event stream."""
+
+    def __init__(self):
+        self.async_calls = []
+
+    def stream_events(self, message: str, thread_id: str = "default") -> Iterator[dict]:
+        raise AssertionError("sync stream_events should not be used")
+
+    async def astream_events(self, message: str, thread_id: str = "default") -> AsyncIterator[dict]:
+        self.async_calls.append((message, thread_id))
+        if message == "explode":
+            raise RuntimeError("async boom")
+        yield {"type": "text", "content": "Async."}
+        yield {"type": "done", "response": "Async."}
+
+
 def _read_sse_text(client: TestClient, url: str) -> str:
     with client.stream("GET", url) as response:
         assert response.status_code == 200
@@ -99,6 +117,22 @@ def test_chat_stream_endpoint_wraps_errors_as_error_event():
     assert "boom" in text
 
 
+def test_chat_stream_prefers_async_event_stream():
+    agent = FakeAsyncAgent()
+    app = create_app(agent_provider=lambda: agent)
+    client = TestClient(app)
+
+    text = _read_sse_text(client, "/api/chat/stream?message=hello&thread_id=t-async")
+
+    assert "event: text" in text
+    assert '"response": "Async."' in text
+    assert agent.async_calls == [("hello", "t-async")]
+
+    text = _read_sse_text(client, "/api/chat/stream?message=explode&thread_id=t-async")
+    assert "event: agent_error" in text
+    assert "async boom" in text
+
+
 def test_chat_stream_requires_message():
     app = create_app(agent_provider=FakeAgent)
     client = TestClient(app)
@@ -120,6 +154,77 @@ def test_chat_stream_frame_payload_is_valid_json():
         json.loads(line.replace("data: ", "", 1))
 
 
+def test_chat_stream_with_fake_model_provider(tmp_path, monkeypatch):
+    from langchain_skills.agent import LangChainSkillsAgent
+    from langchain_skills.model_registry import ModelRegistry
+
+    monkeypatch.setenv("MODEL_PROVIDER", "fake")
+    agent = LangChainSkillsAgent(skill_paths=[], working_directory=tmp_path, model_registry=ModelRegistry())
+    client = TestClient(create_app(agent_provider=lambda: agent))
+
+    text = _read_sse_text(client, "/api/chat/stream?message=hello&thread_id=t-fake")
+
+    assert "event: thinking" in text
+    assert "event: tool_call" in text
+    assert "event: tool_result" in text
+    assert "for the request: hello" in text
+    assert "event: done" in text
+
+
+class SlowAsyncAgent(FakeAgent):
+    """Test double whose stream hangs after the first event until cancelled."""
+
+    def __init__(self):
+        self.cancelled = []
+
+    async def astream_events(self, message: str, thread_id: str = "default") -> AsyncIterator[dict]:
+        yield {"type": "text", "content": "Working..."}
+        await asyncio.sleep(30)
+
+    def cancel(self, thread_id: str, reason: str = "cancelled") -> bool:
+        self.cancelled.append((thread_id, reason))
+        return True
+
+
+def test_chat_stream_cancels_run_on_client_disconnect():
+    agent = SlowAsyncAgent()
+    app = create_app(agent_provider=lambda: agent)
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/chat/stream",
+        "raw_path": b"/api/chat/stream",
+        "query_string": b"message=hello&thread_id=t-gone",
+        "headers": [],
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+    }
+
+    async def run() -> None:
+        first_frame = asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await first_frame.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                first_frame.set()
+
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    asyncio.run(run())
+
+    assert agent.cancelled == [("t-gone", "client disconnected")]
+
+
 # --- _parse_cors_origins tests ---
 
 